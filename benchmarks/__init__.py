@@ -0,0 +1,8 @@
+"""
+Микробенчмарки накладных расходов клиента API: построение типов, сериализация CDEKEncoder,
+разбор JSON, проверка ошибок и полный путь запроса через подменный транспорт.
+
+    python -m benchmarks                          # замер
+    python -m benchmarks --save baseline.json     # сохранить базовую линию
+    python -m benchmarks --compare baseline.json  # сравнить с базовой линией
+"""
@@ -0,0 +1,82 @@
+import argparse
+import json
+import platform
+import re
+import statistics
+import sys
+import timeit
+
+import djcdek
+
+from .suite import BENCHMARKS
+
+
+def measure(func, repeat: int, min_time: float) -> dict:
+    """ Время одного вызова в микросекундах: медиана и минимум по repeat сериям длительностью не меньше min_time """
+    timer = timeit.Timer(func)
+    number = 1
+    while timer.timeit(number) < min_time:
+        number *= 2
+    timings = [seconds / number * 1e6 for seconds in timer.repeat(repeat, number)]
+    return {'median': statistics.median(timings), 'min': min(timings), 'loops': number}
+
+
+def compare(results: dict, baseline: dict, threshold: float) -> int:
+    """ Печатает изменение медианы относительно базовой линии, возвращает количество замедлений больше threshold """
+    regressions = 0
+    print('%-36s %12s %12s %9s' % ('benchmark', 'baseline', 'current', 'change'))
+    for name, result in results.items():
+        before = baseline.get('results', {}).get(name)
+        if before is None:
+            print('%-36s %12s %9.1f us %9s' % (name, '-', result['median'], 'new'))
+            continue
+        change = result['median'] / before['median'] - 1
+        mark = ''
+        if change > threshold:
+            mark = ' slower'
+            regressions += 1
+        elif change < -threshold:
+            mark = ' faster'
+        print('%-36s %9.1f us %9.1f us %+8.1f%%%s' % (name, before['median'], result['median'], change * 100, mark))
+    return regressions
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(prog='python -m benchmarks', description='djcdek client overhead microbenchmarks')
+    parser.add_argument('-k', '--filter', default='', help='Regular expression for benchmark names')
+    parser.add_argument('--repeat', type=int, default=5, help='Timing series per benchmark')
+    parser.add_argument('--min-time', type=float, default=0.2, help='Minimal duration of one series, seconds')
+    parser.add_argument('--save', help='Save results as a baseline JSON file')
+    parser.add_argument('--compare', help='Compare with a baseline JSON file')
+    parser.add_argument('--threshold', type=float, default=0.1,
+                        help='Relative slowdown reported as a regression (exit code 1)')
+    args = parser.parse_args(argv)
+
+    results = dict()
+    for name, setup in BENCHMARKS.items():
+        if not re.search(args.filter, name):
+            continue
+        with setup() as func:
+            results[name] = measure(func, args.repeat, args.min_time)
+        if not args.compare:
+            print('%-36s %9.1f us  (min %.1f us, %s loops)' % (
+                name, results[name]['median'], results[name]['min'], results[name]['loops']))
+
+    regressions = 0
+    if args.compare:
+        with open(args.compare) as f:
+            regressions = compare(results, json.load(f), args.threshold)
+
+    if args.save:
+        with open(args.save, 'w') as f:
+            json.dump({
+                'version': djcdek.get_version(),
+                'python': platform.python_version(),
+                'results': results,
+            }, f, indent=2, sort_keys=True)
+
+    return 1 if regressions else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
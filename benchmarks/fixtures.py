@@ -0,0 +1,110 @@
+import json
+import random
+from datetime import datetime
+
+from djcdek.types import (CDEKItem, CDEKLocation, CDEKMoney, CDEKPackage, CDEKPhone, CDEKRecipient, CDEKSender,
+                          CDEKSeller, CDEKService, RegisterOrderRequest)
+
+
+ORDER_SIZES = {
+    'small': (1, 1),
+    'medium': (3, 10),
+    'huge': (20, 100),
+}
+""" Размеры заказов: (упаковок, позиций в упаковке) """
+
+PAGE_SIZE = 1000
+
+
+def build_order(packages: int, items: int, number: str = 'BENCH-1') -> RegisterOrderRequest:
+    """ Заказ интернет-магазина с packages упаковками по items позиций """
+    return RegisterOrderRequest(
+        number=number,
+        tariff_code=136,
+        comment='Позвонить за час до доставки',
+        shipment_point='MSK123',
+        delivery_point='NSK33',
+        date_invoice=datetime(2024, 1, 15),
+        shipper_name='ООО Рога и копыта',
+        shipper_address='Москва, ул. Ленина, 1',
+        delivery_recipient_cost=CDEKMoney(300, vat_sum=50, vat_rate=20),
+        sender=CDEKSender(company='ООО Рога и копыта', name='Иванов Иван', email='shop@example.com',
+                          phones=[CDEKPhone('+79990000000')]),
+        seller=CDEKSeller(name='ООО Рога и копыта', inn='7700000000', phone='+79990000000', ownership_form=249),
+        recipient=CDEKRecipient(name='Петров Петр', email='client@example.com',
+                                phones=[CDEKPhone('+79991111111', additional='123')]),
+        from_location=CDEKLocation(code=44, address='ул. Ленина, 1'),
+        to_location=CDEKLocation(code=270, postal_code='630000', address='ул. Советская, 10, кв. 5'),
+        services=[CDEKService(code='INSURANCE', parameter=15000)],
+        packages=[
+            CDEKPackage(
+                number='%s-%s' % (number, package),
+                weight=1000 + package * 100,
+                length=30, width=20, height=10,
+                comment='Упаковка %s' % package,
+                items=[
+                    CDEKItem(name='Товар %s, размер M, цвет синий' % item, ware_key='SKU-%06d' % item,
+                             payment=CDEKMoney(0), cost=1490.0, weight=250, amount=1, url='https://example.com/p/%s' % item)
+                    for item in range(items)
+                ],
+            )
+            for package in range(packages)
+        ],
+    )
+
+
+def city_item(code: int, rng: random.Random) -> dict:
+    """ Элемент ответа location/cities """
+    return {
+        'code': code,
+        'city': 'Населенный пункт %s' % code,
+        'fias_guid': '0c5b2444-70a0-4932-980c-b4dc0d3f%04x' % (code % 65536),
+        'kladr_code': '77000000000%05d' % (code % 100000),
+        'country_code': 'RU',
+        'country': 'Россия',
+        'region': 'Московская область',
+        'region_code': 81,
+        'fias_region_guid': '29251dcf-00a1-4e34-98d4-5c47484a36d4',
+        'kladr_region_code': '50',
+        'sub_region': 'Одинцовский район',
+        'postal_codes': ['%06d' % (143000 + code % 1000 + i) for i in range(rng.randint(1, 6))],
+        'longitude': 37.0 + code % 1000 / 1000,
+        'latitude': 55.0 + code % 1000 / 1000,
+        'time_zone': 'Europe/Moscow',
+        'payment_limit': -1.0,
+    }
+
+
+def cities_page(size: int = PAGE_SIZE) -> bytes:
+    """ Страница ответа location/cities в виде тела HTTP-ответа """
+    rng = random.Random(size)
+    return json.dumps([city_item(code, rng) for code in range(size)], ensure_ascii=False).encode()
+
+
+def order_response(uuid: str = '72753031-2f8d-4c6c-9c7b-6f3f2c1a1b2c', requests: int = 1) -> bytes:
+    """ Ответ API на регистрацию заказа; requests > 1 - заказ с историей запросов (как в ответе order_info) """
+    return json.dumps({
+        'entity': {'uuid': uuid},
+        'requests': [{
+            'request_uuid': '72753031-%04x-4c6c-9c7b-6f3f2c1a1b2c' % request,
+            'type': 'CREATE' if request == 0 else 'UPDATE',
+            'state': 'ACCEPTED',
+            'date_time': '2024-01-15T12:00:00+0000',
+            'errors': [],
+            'warnings': [],
+        } for request in range(requests)],
+    }).encode()
+
+
+def error_response() -> bytes:
+    """ Ответ API с ошибкой валидации заказа """
+    return json.dumps({
+        'entity': {'uuid': '72753031-2f8d-4c6c-9c7b-6f3f2c1a1b2c'},
+        'requests': [{
+            'request_uuid': '72753031-0000-4c6c-9c7b-6f3f2c1a1b2c',
+            'type': 'CREATE',
+            'state': 'INVALID',
+            'date_time': '2024-01-15T12:00:00+0000',
+            'errors': [{'code': 'v2_entity_empty', 'message': 'Поле to_location пустое'}],
+        }],
+    }).encode()
@@ -0,0 +1,91 @@
+import json
+from contextlib import contextmanager
+from typing import Callable, ContextManager, Dict
+
+from djcdek.client import CDEKClient
+from djcdek.exceptions import CDEKException
+from djcdek.serialize import CDEKEncoder
+
+from .fixtures import ORDER_SIZES, build_order, cities_page, error_response, order_response
+from .transport import FakeTransport
+
+
+BENCHMARKS: Dict[str, Callable[[], ContextManager[Callable[[], object]]]] = dict()
+""" Имя бенчмарка -> подготовка: генератор, который отдает замеряемую функцию без аргументов и затем прибирает за собой """
+
+
+def benchmark(name: str):
+    def decorator(setup):
+        BENCHMARKS[name] = contextmanager(setup)
+        return setup
+    return decorator
+
+
+def _register_size(size: str):
+    packages, items = ORDER_SIZES[size]
+
+    @benchmark('construct.order.%s' % size)
+    def construct():
+        yield lambda: build_order(packages, items)
+
+    @benchmark('encode.order.%s' % size)
+    def encode():
+        order = build_order(packages, items)
+        yield lambda: json.dumps(order, cls=CDEKEncoder)
+
+    @benchmark('request.register_order.%s' % size)
+    def register_order():
+        order = build_order(packages, items)
+        transport = FakeTransport({'orders': order_response()})
+        client = CDEKClient('bench', 'bench', test=True)
+
+        # транспорт подменяется один раз, замеряется только вызов клиента
+        with transport.installed():
+            yield lambda: client.register_order(order)
+
+
+for _size in ORDER_SIZES:
+    _register_size(_size)
+
+
+@benchmark('decode.cities.1000')
+def decode_cities():
+    body = cities_page()
+    yield lambda: json.loads(body)
+
+
+@benchmark('handle_errors.order.requests.1000')
+def handle_errors_requests():
+    # списки (страницы справочников) _handle_errors не проверяет, худший случай - ответ с множеством запросов
+    response = json.loads(order_response(requests=1000))
+    client = CDEKClient('bench', 'bench', test=True)
+    yield lambda: client._handle_errors(response)
+
+
+@benchmark('handle_errors.order.accepted')
+def handle_errors_accepted():
+    response = json.loads(order_response())
+    client = CDEKClient('bench', 'bench', test=True)
+    yield lambda: client._handle_errors(response)
+
+
+@benchmark('handle_errors.order.invalid')
+def handle_errors_invalid():
+    response = json.loads(error_response())
+    client = CDEKClient('bench', 'bench', test=True)
+
+    def run():
+        try:
+            client._handle_errors(response)
+        except CDEKException:
+            pass
+    yield run
+
+
+@benchmark('request.get_cities.1000')
+def request_cities():
+    transport = FakeTransport({'location/cities': cities_page()})
+    client = CDEKClient('bench', 'bench', test=True)
+
+    with transport.installed():
+        yield lambda: client.get_cities(country_codes=['RU'], size=1000, page=0)
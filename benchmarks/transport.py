@@ -0,0 +1,39 @@
+from contextlib import contextmanager
+from typing import Dict
+from unittest import mock
+
+import djcdek.client
+
+
+TOKEN_RESPONSE = b'{"access_token": "bench", "token_type": "bearer", "expires_in": 3600}'
+
+
+class FakeResponse:
+    def __init__(self, body: bytes):
+        self.body = body
+
+    def read(self) -> bytes:
+        return self.body
+
+
+class FakeTransport:
+    """
+    Подменяет urlopen клиента: ответ выбирается по пути запроса без сети,
+    поэтому замеряются только накладные расходы клиента
+    """
+    def __init__(self, routes: Dict[str, bytes]):
+        self.routes = dict(routes, **{djcdek.client.ACCESS_URL: TOKEN_RESPONSE})
+        self.requests = 0
+
+    def urlopen(self, request, timeout=None) -> FakeResponse:
+        self.requests += 1
+        url = request.full_url.split('?', 1)[0]
+        for path, body in self.routes.items():
+            if url.endswith('/' + path):
+                return FakeResponse(body)
+        raise AssertionError('No fake response for %s' % url)
+
+    @contextmanager
+    def installed(self):
+        with mock.patch.object(djcdek.client, 'urlopen', self.urlopen):
+            yield self
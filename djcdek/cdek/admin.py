@@ -1,8 +1,74 @@
 from django.contrib import admin
+from django.contrib.admin.views.main import PAGE_VAR
+from django.core.paginator import Paginator
+from django.db import connections
+from django.utils.functional import cached_property
 
 from djcdek.cdek.models import *
 
 
+class EstimatedCountPaginator(Paginator):
+    """
+    Пагинатор больших справочников: для выборки без условий на PostgreSQL количество строк
+    берется из статистики таблицы (pg_class.reltuples) вместо COUNT(*) по всей таблице
+    """
+    estimate_threshold = 10000
+    """ Оценка используется, только если в таблице не меньше строк """
+
+    @cached_property
+    def count(self):
+        query = getattr(self.object_list, 'query', None)
+        if query is not None and not query.where:
+            connection = connections[self.object_list.db]
+            if connection.vendor == 'postgresql':
+                with connection.cursor() as cursor:
+                    cursor.execute('SELECT reltuples FROM pg_class WHERE relname = %s', [query.model._meta.db_table])
+                    row = cursor.fetchone()
+                if row and row[0] >= self.estimate_threshold:
+                    return int(row[0])
+        return super(EstimatedCountPaginator, self).count
+
+
+class InputFilter(admin.SimpleListFilter):
+    """
+    Фильтр с полем ввода вместо списка ссылок на все значения внешнего ключа
+    (список из сотен тысяч населенных пунктов не отрисовать)
+    """
+    template = 'admin/cdek/input_filter.html'
+    lookup = None
+    """ Условие выборки, в которое подставляется введенное значение """
+
+    def lookups(self, request, model_admin):
+        # без непустого списка вариантов фильтр не выводится
+        return ((None, None),)
+
+    def queryset(self, request, queryset):
+        value = (self.value() or '').strip()
+        if value:
+            return queryset.filter(**{self.lookup: value})
+        return queryset
+
+    def choices(self, changelist):
+        all_choice = next(super(InputFilter, self).choices(changelist))
+        all_choice['query_parts'] = [
+            (name, value) for name, value in changelist.params.items()
+            if name not in (self.parameter_name, PAGE_VAR)
+        ]
+        yield all_choice
+
+
+class CityCodeFilter(InputFilter):
+    title = 'код населенного пункта'
+    parameter_name = 'city_code'
+    lookup = 'city__code'
+
+
+class RegionCodeFilter(InputFilter):
+    title = 'код региона'
+    parameter_name = 'region_code'
+    lookup = 'region__code'
+
+
 @admin.register(Country)
 class CountryAdmin(admin.ModelAdmin):
     list_display = ('id', 'title', 'code')
@@ -13,18 +79,103 @@ class CountryAdmin(admin.ModelAdmin):
 class RegionAdmin(admin.ModelAdmin):
     list_display = ('id', 'title', 'country', 'code', 'kladr_region_code', 'fias_region_guid')
     list_filter = ('country',)
+    list_select_related = ('country', )
     search_fields = ('title', )
 
 
 @admin.register(City)
 class CityAdmin(admin.ModelAdmin):
     list_display = ('id', 'title', 'code', 'region', 'postal_codes', 'timezone')
-    list_filter = ('region', )
-    search_fields = ('title', 'code', 'postal_codes')
+    list_filter = ('is_active', RegionCodeFilter)
+    list_select_related = ('region', )
+    # '^title' обслуживает индекс UPPER(title) text_pattern_ops (миграция 0021) на PostgreSQL
+    search_fields = ('=code', '^title', '=postalcodes__code')
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+
+    def get_queryset(self, request):
+        # деактивированные синхронизацией записи тоже должны быть видны
+        return City.all_objects.all()
 
 
 @admin.register(DeliveryPoint)
 class DeliveryPointAdmin(admin.ModelAdmin):
     list_display = ('id', 'title', 'code', 'city', 'type', 'postal_code', 'phones', 'email')
-    list_filter = ('type', 'take_only', 'is_dressing_room', 'have_cashless', 'have_cash', 'allowed_cod', 'city')
-    search_fields = ('title', 'code', 'postal_code', 'phones', 'email')
+    list_filter = ('is_active', 'type', 'take_only', 'is_dressing_room', 'have_cashless', 'have_cash', 'allowed_cod', CityCodeFilter)
+    list_select_related = ('city', )
+    search_fields = ('=code', 'title', '=postal_code', 'phones', 'email')
+    autocomplete_fields = ('city', )
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+
+    def get_queryset(self, request):
+        # деактивированные синхронизацией записи тоже должны быть видны
+        return DeliveryPoint.all_objects.all()
+
+
+@admin.register(DeliveryPointSearch)
+class DeliveryPointSearchAdmin(admin.ModelAdmin):
+    list_display = ('deliverypoint_id', 'title', 'code', 'type_name', 'city_title', 'region_title', 'address', 'city_points')
+    list_filter = ('type', 'have_cash', 'have_cashless', 'allowed_cod', 'is_dressing_room')
+    search_fields = ('search_text', )
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+
+    def get_search_results(self, request, queryset, search_term):
+        # поиск по началу слов нормализованного текста, без соединений с другими таблицами
+        return queryset.search(search_term), False
+
+    def has_add_permission(self, request):
+        return False
+
+
+@admin.register(PostalCode)
+class PostalCodeAdmin(admin.ModelAdmin):
+    list_display = ('id', 'code', 'city')
+    list_select_related = ('city', )
+    search_fields = ('=code', )
+    raw_id_fields = ('city', )
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+
+
+@admin.register(TariffMatrix)
+class TariffMatrixAdmin(admin.ModelAdmin):
+    list_display = ('id', 'from_city', 'to_city', 'tariff_code', 'weight', 'length', 'width', 'height',
+                    'delivery_sum', 'period_min', 'period_max', 'calculated_at')
+    list_filter = ('tariff_code', )
+    list_select_related = ('from_city', 'to_city')
+    raw_id_fields = ('from_city', 'to_city')
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+
+
+@admin.register(OrderRegistration)
+class OrderRegistrationAdmin(admin.ModelAdmin):
+    list_display = ('id', 'number', 'uuid', 'status', 'created', 'updated')
+    list_filter = ('status', )
+    search_fields = ('=number', '=uuid')
+    show_full_result_count = False
+
+
+class OrderStatusHistoryInline(admin.TabularInline):
+    model = OrderStatusHistory
+    extra = 0
+    readonly_fields = ('code', 'name', 'date_time', 'city')
+
+
+@admin.register(Order)
+class OrderAdmin(admin.ModelAdmin):
+    list_display = ('id', 'number', 'uuid', 'status', 'status_date', 'next_poll_at', 'last_polled_at')
+    list_filter = ('is_final', 'status')
+    search_fields = ('=number', '=uuid')
+    inlines = (OrderStatusHistoryInline, )
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+
+
+@admin.register(SyncRun)
+class SyncRunAdmin(admin.ModelAdmin):
+    list_display = ('id', 'name', 'status', 'started', 'duration', 'rows', 'batches', 'queries', 'peak_memory')
+    list_filter = ('name', 'status')
+    readonly_fields = ('name', 'status', 'started', 'duration', 'rows', 'batches', 'queries', 'peak_memory', 'report')
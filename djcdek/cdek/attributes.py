@@ -0,0 +1,134 @@
+from bisect import bisect_left
+from collections import defaultdict
+from typing import Iterator, List, Optional, Sequence
+
+from djcdek.cdek.catalog import CatalogIndex
+from djcdek.cdek.models import DeliveryPoint
+
+
+ATTRIBUTE_FIELDS = ('type', 'take_only', 'is_dressing_room', 'have_cashless', 'have_cash', 'allowed_cod')
+""" Булевы и категориальные атрибуты ПВЗ, для каждого значения которых строится битовая маска """
+
+
+def iter_bits(bits: int) -> Iterator[int]:
+    """ Номера установленных битов по возрастанию """
+    while bits:
+        low = bits & -bits
+        yield low.bit_length() - 1
+        bits ^= low
+
+
+class CityAttributes:
+    """
+    Атрибуты ПВЗ одного населенного пункта.
+
+    Бит N каждой маски соответствует ПВЗ ids[N]. Ограничения по весу хранятся
+    отсортированными порогами с накопленными масками: ПВЗ, принимающие вес w,
+    находятся двоичным поиском без перебора точек.
+    """
+    def __init__(self, rows: Sequence[tuple]):
+        self.ids = [row[0] for row in rows]
+        self.all = (1 << len(rows)) - 1
+        self.masks = defaultdict(int)
+        self.dimensions = []
+
+        for position, row in enumerate(rows):
+            bit = 1 << position
+            for name, value in zip(ATTRIBUTE_FIELDS, row[1:]):
+                self.masks[(name, value)] |= bit
+            self.dimensions.append(tuple(sorted(row[-3:])) if None not in row[-3:] else None)
+        self.masks = dict(self.masks)
+
+        weight_min = [row[-5] for row in rows]
+        weight_max = [row[-4] for row in rows]
+        # weight_min < w: маска ПВЗ с минимальным весом меньше порога min_thresholds[i - 1]
+        self.min_thresholds, self.min_masks = self._cumulative(weight_min, reverse=False)
+        # weight_max >= w: маска ПВЗ с максимальным весом не меньше порога max_thresholds[i]
+        self.max_thresholds, self.max_masks = self._cumulative(weight_max, reverse=True)
+
+    @staticmethod
+    def _cumulative(values: List[Optional[float]], reverse: bool):
+        """
+        Отсортированные пороги и накопленные маски.
+        Для reverse=False masks[i] - ПВЗ со значением меньше thresholds[i - 1] (или без ограничения),
+        для reverse=True masks[i] - ПВЗ со значением не меньше thresholds[i] (или без ограничения).
+        """
+        unlimited = 0
+        by_value = defaultdict(int)
+        for position, value in enumerate(values):
+            if value is None:
+                unlimited |= 1 << position
+            else:
+                by_value[value] |= 1 << position
+
+        thresholds = sorted(by_value)
+        masks = [unlimited]
+        for value in (reversed(thresholds) if reverse else thresholds):
+            masks.append(masks[-1] | by_value[value])
+        if reverse:
+            masks.reverse()
+        return thresholds, masks
+
+    def filter(self, weight: float = None, dimensions: Sequence[float] = None, **filters) -> List[int]:
+        bits = self.all
+        for name, value in filters.items():
+            bits &= self.masks.get((name, value), 0)
+            if not bits:
+                return []
+
+        if weight is not None:
+            # вес принимается, если weight_min < weight <= weight_max
+            bits &= self.min_masks[bisect_left(self.min_thresholds, weight)]
+            bits &= self.max_masks[bisect_left(self.max_thresholds, weight)]
+
+        positions = iter_bits(bits)
+        if dimensions is not None:
+            size = tuple(sorted(dimensions))
+            positions = (p for p in positions if self.dimensions[p] is None or
+                         all(a <= b for a, b in zip(size, self.dimensions[p])))
+        return [self.ids[p] for p in positions]
+
+
+class AttributeIndex(CatalogIndex):
+    """
+    Битовые индексы атрибутов ПВЗ по населенным пунктам в памяти процесса.
+    Любая комбинация фильтров вычисляется побитовым AND масок города.
+    """
+    def __init__(self):
+        super(AttributeIndex, self).__init__()
+        self.cities = dict()
+
+    def build(self):
+        rows = defaultdict(list)
+        for row in (DeliveryPoint.objects.values_list('city_id', 'id', *ATTRIBUTE_FIELDS, 'weight_min', 'weight_max',
+                                                      'max_width', 'max_height', 'max_depth')
+                    .order_by('id').iterator()):
+            rows[row[0]].append(row[1:])
+        self.cities = {city_id: CityAttributes(city_rows) for city_id, city_rows in rows.items()}
+
+    def filter(self, city, weight: float = None, dimensions: Sequence[float] = None, **filters) -> List[int]:
+        """
+        Возвращает id ПВЗ населенного пункта, подходящих под все условия, по возрастанию
+
+        city -- населенный пункт или его id
+        weight -- вес отправления, кг
+        dimensions -- габариты отправления (см), ПВЗ без ограничений по размеру подходят всегда
+        filters -- значения атрибутов из ATTRIBUTE_FIELDS (type='POSTAMAT', have_cash=True...)
+        """
+        self.ensure()
+        unknown = set(filters) - set(ATTRIBUTE_FIELDS)
+        if unknown:
+            raise ValueError('Unknown delivery point attributes: %s' % ', '.join(sorted(unknown)))
+
+        attributes = self.cities.get(getattr(city, 'id', city))
+        if attributes is None:
+            return []
+        return attributes.filter(weight=weight, dimensions=dimensions, **filters)
+
+
+attribute_index = AttributeIndex()
+
+
+def filter_deliverypoints(city, weight: float = None, dimensions: Sequence[float] = None, **filters) -> List[int]:
+    """ id ПВЗ населенного пункта по набору атрибутов (см. AttributeIndex.filter) """
+    return attribute_index.filter(city, weight=weight, dimensions=dimensions, **filters)
@@ -0,0 +1,118 @@
+import heapq
+from bisect import bisect_left
+from collections import namedtuple, defaultdict
+from typing import Callable, List
+
+from django.conf import settings
+from django.utils.module_loading import import_string
+
+from djcdek.cdek.catalog import CatalogIndex
+from djcdek.cdek.models import City
+from djcdek.cdek.utils.text import normalize
+from djcdek.cdek.utils.weight import deliverypoints_weight
+
+
+CitySuggestion = namedtuple('CitySuggestion', ['id', 'code', 'title', 'region', 'country'])
+""" Подсказка населенного пункта """
+
+Snapshot = namedtuple('Snapshot', ['entries', 'keys', 'ranks', 'precomputed'])
+""" Построенный индекс подсказок, публикуется целиком одним присваиванием """
+
+
+class CityAutocomplete(CatalogIndex):
+    """
+    Подсказки населенных пунктов по началу названия.
+
+    Индекс - отсортированный список ключей (полное название и отдельные слова названия),
+    поиск по префиксу выполняется двоичным поиском. Для коротких префиксов, которым
+    соответствуют тысячи городов, лучшие по весу результаты рассчитываются заранее.
+
+    weight -- функция, добавляющая к выборке City аннотацию weight для ранжирования
+    (по умолчанию CDEK_AUTOCOMPLETE_WEIGHT или количество ПВЗ в населенном пункте)
+    """
+    precomputed_length = 2
+    """ Для префиксов не длиннее этого значения результаты рассчитываются при построении """
+
+    max_results = 50
+    """ Максимальное количество подсказок """
+
+    def __init__(self, weight: Callable = None):
+        super(CityAutocomplete, self).__init__()
+        self.weight = weight
+        # читатели берут снимок без блокировки, поэтому части индекса не меняются по отдельности
+        self._snapshot = Snapshot([], [], [], dict())
+
+    def build(self):
+        weight = self.weight or import_string(getattr(
+            settings, 'CDEK_AUTOCOMPLETE_WEIGHT', 'djcdek.cdek.utils.weight.deliverypoints_weight'))
+        rows = weight(City.objects.all()).values_list(
+            'id', 'code', 'title', 'region__title', 'region__country__title', 'weight')
+
+        entries = []
+        keys = []
+        for pk, code, title, region, country, rank in rows.iterator():
+            entries.append((rank or 0, CitySuggestion(pk, code, title, region, country)))
+        # порядковый номер в списке по убыванию веса - ключ ранжирования
+        entries.sort(key=lambda entry: -entry[0])
+        count = len(entries)
+
+        for order, (_, suggestion) in enumerate(entries):
+            name = normalize(suggestion.title)
+            # совпадение с началом полного названия важнее совпадения со словом в середине
+            keys.append((name, order))
+            for word in name.split()[1:]:
+                keys.append((word, count + order))
+        keys.sort()
+
+        precomputed = defaultdict(list)
+        for key, rank in keys:
+            for length in range(1, min(len(key), self.precomputed_length) + 1):
+                precomputed[key[:length]].append(rank)
+
+        entries = [suggestion for _, suggestion in entries]
+        self._snapshot = Snapshot(
+            entries=entries,
+            keys=[key for key, _ in keys],
+            ranks=[rank for _, rank in keys],
+            precomputed={prefix: self._rank(entries, ranks, self.max_results) for prefix, ranks in precomputed.items()},
+        )
+
+    def suggest(self, text: str, limit: int = 10) -> List[CitySuggestion]:
+        """ Возвращает до limit населенных пунктов, название которых начинается с text """
+        self.ensure()
+        snapshot = self._snapshot
+        prefix = normalize(text)
+        if not prefix:
+            return []
+
+        if len(prefix) <= self.precomputed_length:
+            return snapshot.precomputed.get(prefix, [])[:limit]
+
+        start = bisect_left(snapshot.keys, prefix)
+        end = bisect_left(snapshot.keys, prefix + '\uffff', start)
+        return self._rank(snapshot.entries, snapshot.ranks[start:end], limit)
+
+    @staticmethod
+    def _rank(entries: list, ranks: list, limit: int) -> List[CitySuggestion]:
+        """ Первые limit разных населенных пунктов по возрастанию ранга """
+        count = len(entries)
+        result = []
+        seen = set()
+        # у города может быть сколько угодно ключей с префиксом, поэтому ранги извлекаются,
+        # пока не наберется limit разных городов
+        heap = list(ranks)
+        heapq.heapify(heap)
+        while heap and len(result) < limit:
+            order = heapq.heappop(heap) % count
+            if order not in seen:
+                seen.add(order)
+                result.append(entries[order])
+        return result
+
+
+city_autocomplete = CityAutocomplete()
+
+
+def suggest_cities(text: str, limit: int = 10) -> List[CitySuggestion]:
+    """ Подсказки населенных пунктов по началу названия (см. CityAutocomplete.suggest) """
+    return city_autocomplete.suggest(text, limit)
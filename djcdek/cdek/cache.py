@@ -0,0 +1,91 @@
+import hashlib
+import threading
+from collections import OrderedDict, namedtuple
+from typing import Callable, List
+
+from django.conf import settings
+
+from djcdek.cdek.catalog import catalog_version, get_cache
+from djcdek.cdek.models import DeliveryPoint
+
+
+DELIVERYPOINT_FIELDS = (
+    'id', 'code', 'title', 'city_id', 'postal_code', 'latitude', 'longitude', 'address', 'address_full',
+    'address_comment', 'nearest_station', 'phones', 'work_time', 'type', 'take_only', 'is_dressing_room',
+    'have_cashless', 'have_cash', 'allowed_cod', 'weight_min', 'weight_max',
+)
+
+DeliveryPointRecord = namedtuple('DeliveryPointRecord', DELIVERYPOINT_FIELDS)
+""" Компактная запись ПВЗ для чтения на оформлении заказа """
+
+
+class CatalogCache:
+    """
+    Двухуровневый кэш чтения справочников.
+
+    Первый уровень - LRU в памяти процесса, второй - общий кэш Django (CDEK_CACHE).
+    Ключи содержат версию каталога, поэтому после синхронизации старые записи
+    просто перестают запрашиваться и вытесняются, удалять их по одной не нужно.
+    """
+    def __init__(self, local_size: int = None, timeout: int = None):
+        self.local_size = local_size or getattr(settings, 'CDEK_LOCAL_CACHE_SIZE', 1024)
+        self.timeout = timeout or getattr(settings, 'CDEK_CACHE_TIMEOUT', 24 * 60 * 60)
+        self._local = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get_or_load(self, key: str, loader: Callable, wrap: Callable = None):
+        """
+        Возвращает значение по ключу key, при промахе загружает его функцией loader
+
+        loader -- функция без аргументов, значение должно сериализоваться pickle
+        wrap -- преобразование значения перед сохранением в кэше процесса
+        """
+        key = 'cdek:%s:%s' % (catalog_version(), key)
+        with self._lock:
+            if key in self._local:
+                self._local.move_to_end(key)
+                return self._local[key]
+
+        cache = get_cache()
+        value = cache.get(key)
+        if value is None:
+            value = loader()
+            cache.set(key, value, self.timeout)
+        if wrap:
+            value = wrap(value)
+
+        with self._lock:
+            self._local[key] = value
+            while len(self._local) > self.local_size:
+                self._local.popitem(last=False)
+        return value
+
+    def set(self, key: str, value):
+        """ Сохраняет значение для текущей версии каталога в общем кэше (например, при прогреве после синхронизации) """
+        get_cache().set('cdek:%s:%s' % (catalog_version(), key), value, self.timeout)
+
+    def clear(self):
+        """ Очищает кэш процесса """
+        with self._lock:
+            self._local.clear()
+
+
+catalog_cache = CatalogCache()
+
+
+def city_deliverypoints(city, **filters) -> List[DeliveryPointRecord]:
+    """
+    Возвращает ПВЗ населенного пункта из кэша
+
+    city -- населенный пункт или его id
+    filters -- дополнительные условия выборки DeliveryPoint (type='PVZ', have_cash=True...)
+    """
+    city_id = getattr(city, 'id', city)
+    # значения фильтров могут содержать символы, недопустимые в ключах memcached
+    key = 'deliverypoints:%s:%s' % (city_id, hashlib.md5(repr(sorted(filters.items())).encode()).hexdigest())
+
+    def load():
+        return list(DeliveryPoint.objects.filter(city_id=city_id, **filters)
+                    .order_by('id').values_list(*DELIVERYPOINT_FIELDS))
+
+    return catalog_cache.get_or_load(key, load, wrap=lambda rows: [DeliveryPointRecord(*row) for row in rows])
@@ -0,0 +1,93 @@
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+
+from djcdek.cdek.signals import catalog_updated
+
+
+CATALOG_VERSION_KEY = 'cdek:catalog_version'
+CATALOG_WRITTEN_KEY = 'cdek:catalog_written_at'
+
+_local = {'version': None, 'checked': 0}
+_written = {'at': None, 'checked': 0}
+
+
+def get_cache():
+    """ Общий для всех процессов кэш (алиас из CDEK_CACHE, по умолчанию default) """
+    return caches[getattr(settings, 'CDEK_CACHE', 'default')]
+
+
+def catalog_version() -> int:
+    """
+    Возвращает текущую версию справочников.
+
+    Версия хранится в общем кэше и меняется в конце каждой синхронизации.
+    Внутри процесса значение перечитывается не чаще, чем раз в CDEK_CATALOG_VERSION_TTL секунд.
+    """
+    now = time.monotonic()
+    if _local['version'] is None or now - _local['checked'] > getattr(settings, 'CDEK_CATALOG_VERSION_TTL', 5):
+        cache = get_cache()
+        version = cache.get(CATALOG_VERSION_KEY)
+        if version is None:
+            cache.add(CATALOG_VERSION_KEY, int(time.time() * 1000), None)
+            version = cache.get(CATALOG_VERSION_KEY)
+        _local['version'] = version
+        _local['checked'] = now
+    return _local['version']
+
+
+def catalog_written_at():
+    """
+    Время окончания последней синхронизации (unix time) или None, если оно неизвестно.
+
+    В отличие от версии каталога, значение пишет только bump_catalog_version: после очистки кэша
+    время неизвестно, а не равно текущему. Перечитывается не чаще, чем раз в CDEK_CATALOG_VERSION_TTL секунд.
+    """
+    now = time.monotonic()
+    if now - _written['checked'] > getattr(settings, 'CDEK_CATALOG_VERSION_TTL', 5):
+        _written['at'] = get_cache().get(CATALOG_WRITTEN_KEY)
+        _written['checked'] = now
+    return _written['at']
+
+
+def bump_catalog_version() -> int:
+    """
+    Объявляет справочники обновленными: меняет версию и отправляет сигнал catalog_updated
+    """
+    version = int(time.time() * 1000)
+    if version == _local['version']:
+        version += 1
+    written_at = time.time()
+    get_cache().set_many({CATALOG_VERSION_KEY: version, CATALOG_WRITTEN_KEY: written_at}, None)
+    _local['version'] = version
+    _local['checked'] = time.monotonic()
+    _written['at'] = written_at
+    _written['checked'] = _local['checked']
+    catalog_updated.send(sender=None, version=version)
+    return version
+
+
+class CatalogIndex:
+    """
+    Базовый класс индексов справочников в памяти процесса.
+    Индекс строится лениво и перестраивается при смене версии каталога.
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._version = None
+
+    def build(self):
+        raise NotImplementedError
+
+    def ensure(self):
+        version = catalog_version()
+        if version != self._version:
+            with self._lock:
+                if version != self._version:
+                    self.build()
+                    self._version = version
+
+    def invalidate(self):
+        self._version = None
@@ -1,4 +1,8 @@
+import os
+import threading
+
 from django.conf import settings
+from django.core.signals import setting_changed
 from djcdek.client import CDEKClient
 from djcdek.exceptions import CDEKException
 
@@ -17,4 +21,57 @@ class CDEKDjangoClient(CDEKClient):
         self.account = getattr(settings, 'CDEK_ACCOUNT', None)
         self.secure = getattr(settings, 'CDEK_SECURE', None)
 
-        
\ No newline at end of file
+
+DEFAULT_ACCOUNT = 'default'
+
+_clients = dict()
+_lock = threading.Lock()
+
+
+def _create_client(account: str) -> CDEKClient:
+    accounts = getattr(settings, 'CDEK_ACCOUNTS', None)
+    if not accounts and account == DEFAULT_ACCOUNT:
+        return CDEKDjangoClient()
+    if not accounts or account not in accounts:
+        raise CDEKException(code='notsettings', message='Account %s is not in CDEK_ACCOUNTS' % account)
+
+    config = accounts[account]
+    return CDEKClient(config['CLIENT_ID'], config['CLIENT_SECRET'], config.get('TEST', False),
+                      config.get('ACCOUNT'), config.get('SECURE'))
+
+
+def get_client(account: str = None) -> CDEKClient:
+    """
+    Клиент API учетной записи account, общий для всех потоков процесса (токен запрашивается один раз).
+
+    Учетные записи задаются в CDEK_ACCOUNTS:
+    {'default': {'CLIENT_ID': ..., 'CLIENT_SECRET': ..., 'TEST': False, 'ACCOUNT': ..., 'SECURE': ...}, ...}
+    Без CDEK_ACCOUNTS доступна только учетная запись default из CDEK_CLIENT_ID, CDEK_CLIENT_SECRET, CDEK_CLIENT_TEST.
+    """
+    account = account or DEFAULT_ACCOUNT
+    client = _clients.get(account)
+    if client is None:
+        with _lock:
+            client = _clients.get(account)
+            if client is None:
+                client = _clients[account] = _create_client(account)
+    return client
+
+
+def reset_clients():
+    """ Сбрасывает созданные клиенты, следующий get_client создаст их заново """
+    global _lock
+    # после fork блокировка могла остаться захваченной потоком родительского процесса
+    _lock = threading.Lock()
+    _clients.clear()
+
+
+def _settings_changed(setting, **kwargs):
+    if setting.startswith('CDEK_'):
+        reset_clients()
+
+
+setting_changed.connect(_settings_changed)
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=reset_clients)
@@ -0,0 +1,134 @@
+import math
+import threading
+from collections import OrderedDict
+from typing import List, Tuple
+
+from django.conf import settings
+
+from djcdek.cdek.catalog import catalog_version
+from djcdek.cdek.spatial import spatial_index
+
+
+MAX_TILES = 64
+""" Максимальное количество тайлов в одном запросе """
+
+
+def tile_position(lat: float, lon: float, zoom: int) -> Tuple[float, float]:
+    """ Дробные координаты точки в сетке тайлов Web Mercator масштаба zoom """
+    n = 2 ** zoom
+    lat = max(min(lat, 85.0511), -85.0511)
+    x = (lon + 180) / 360 * n
+    y = (1 - math.asinh(math.tan(math.radians(lat))) / math.pi) / 2 * n
+    return x, y
+
+
+def tile_number(lat: float, lon: float, zoom: int) -> Tuple[int, int]:
+    """ Номер тайла (x, y) в проекции Web Mercator, в который попадает точка """
+    n = 2 ** zoom
+    x, y = tile_position(lat, lon, zoom)
+    return min(max(int(x), 0), n - 1), min(max(int(y), 0), n - 1)
+
+
+def tile_bounds(x: float, y: float, zoom: int, size: float = 1) -> Tuple[float, float, float, float]:
+    """ Границы тайла (или квадрата со стороной size тайлов от дробных координат x, y): (south, west, north, east) """
+    n = 2 ** zoom
+    west = x / n * 360 - 180
+    east = (x + size) / n * 360 - 180
+    north = math.degrees(math.atan(math.sinh(math.pi * (1 - 2 * y / n))))
+    south = math.degrees(math.atan(math.sinh(math.pi * (1 - 2 * (y + size) / n))))
+    return south, west, north, east
+
+
+class TileClusterer:
+    """
+    Кластеризация ПВЗ для карты по тайлам Web Mercator.
+
+    Каждый тайл делится на grid x grid ячеек, точки в ячейке объединяются в кластер
+    с количеством и центром масс. Результат кэшируется в памяти процесса по тайлу,
+    набору фильтров и версии каталога, поэтому после синхронизации кэш устаревает сам.
+    """
+    def __init__(self, grid: int = None, max_zoom: int = None, cache_size: int = None):
+        self.grid = grid or getattr(settings, 'CDEK_MAP_CLUSTER_GRID', 8)
+        self.max_zoom = max_zoom or getattr(settings, 'CDEK_MAP_CLUSTER_MAX_ZOOM', 14)
+        self.cache_size = cache_size or getattr(settings, 'CDEK_MAP_TILE_CACHE_SIZE', 4096)
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+
+    def query(self, south: float, west: float, north: float, east: float, zoom: int, **filters) -> dict:
+        """
+        Возвращает содержимое видимой области карты:
+        {'clusters': [{'latitude', 'longitude', 'count', 'bounds'}], 'points': [{'id', 'code', 'latitude', 'longitude'}]}
+        bounds -- границы ячейки кластера (south, west, north, east)
+
+        На масштабе от max_zoom и крупнее возвращаются только отдельные точки.
+        Область ограничена MAX_TILES тайлами масштаба zoom на любом масштабе. Кластер возвращается,
+        если его ячейка пересекает область, даже если центр кластера за ее границей.
+        """
+        x_min, y_min, x_max, y_max = self._tile_range(south, west, north, east, zoom)
+
+        if zoom >= self.max_zoom:
+            return {
+                'clusters': [],
+                'points': [point._asdict() for point in spatial_index.points_in_bbox(south, west, north, east, **filters)],
+            }
+
+        clusters = []
+        points = []
+        for x in range(x_min, x_max + 1):
+            for y in range(y_min, y_max + 1):
+                tile_clusters, tile_points = self.tile(x, y, zoom, **filters)
+                # кластер на краю области виден частично, отбрасывать его по центру нельзя
+                clusters.extend(c for c in tile_clusters if c['bounds'][0] <= north and c['bounds'][2] >= south
+                                and c['bounds'][1] <= east and c['bounds'][3] >= west)
+                points.extend(p for p in tile_points if south <= p['latitude'] <= north and west <= p['longitude'] <= east)
+        return {'clusters': clusters, 'points': points}
+
+    @staticmethod
+    def _tile_range(south: float, west: float, north: float, east: float, zoom: int) -> Tuple[int, int, int, int]:
+        """ Номера крайних тайлов области (x_min, y_min, x_max, y_max); ValueError, если тайлов больше MAX_TILES """
+        x_min, y_min = tile_number(north, west, zoom)
+        x_max, y_max = tile_number(south, east, zoom)
+        if (x_max - x_min + 1) * (y_max - y_min + 1) > MAX_TILES:
+            raise ValueError('Too many tiles for zoom %s, use a larger zoom' % zoom)
+        return x_min, y_min, x_max, y_max
+
+    def tile(self, x: int, y: int, zoom: int, **filters) -> Tuple[List[dict], List[dict]]:
+        """ Кластеры и одиночные точки тайла (x, y) на масштабе zoom """
+        key = (catalog_version(), zoom, x, y, tuple(sorted(filters.items())))
+        with self._lock:
+            if key in self._cache:
+                self._cache.move_to_end(key)
+                return self._cache[key]
+
+        value = self._cluster(x, y, zoom, filters)
+
+        with self._lock:
+            self._cache[key] = value
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+        return value
+
+    def _cluster(self, x: int, y: int, zoom: int, filters: dict):
+        south, west, north, east = tile_bounds(x, y, zoom)
+        cells = dict()
+
+        for point in spatial_index.points_in_bbox(south, west, north, east, **dict(filters)):
+            px, py = tile_position(point.latitude, point.longitude, zoom)
+            cell_key = (min(int((px - x) * self.grid), self.grid - 1), min(int((py - y) * self.grid), self.grid - 1))
+            cell = cells.setdefault(cell_key, [0, 0.0, 0.0, point])
+            cell[0] += 1
+            cell[1] += point.latitude
+            cell[2] += point.longitude
+
+        clusters = []
+        points = []
+        for (cx, cy), (count, lat_sum, lon_sum, point) in cells.items():
+            if count == 1:
+                points.append(point._asdict())
+            else:
+                clusters.append({'latitude': lat_sum / count, 'longitude': lon_sum / count, 'count': count,
+                                 'bounds': tile_bounds(x + cx / self.grid, y + cy / self.grid, zoom, 1 / self.grid)})
+        return clusters, points
+
+
+tile_clusterer = TileClusterer()
@@ -0,0 +1,94 @@
+import random
+import statistics
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+
+from djcdek.cdek.models import City, DeliveryPoint
+
+
+class Command(BaseCommand):
+    """
+    Замеряет задержку типичных запросов к справочникам с индексами и без них.
+
+    Синтетический набор данных создается внутри транзакции, которая в конце откатывается,
+    поэтому команду можно запускать на рабочей базе. Для замера "без индексов" планировщику
+    запрещается их использовать (SET LOCAL enable_* на PostgreSQL, NOT INDEXED на SQLite).
+    """
+    help = 'Benchmark reference lookups by code and PVZ filters with and without indexes'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--cities', type=int, default=200000, help='Synthetic cities count')
+        parser.add_argument('--points', type=int, default=30000, help='Synthetic delivery points count')
+        parser.add_argument('--repeat', type=int, default=200, help='Queries per benchmark')
+
+    def handle(self, *args, **options):
+        if connection.vendor not in ('postgresql', 'sqlite'):
+            raise CommandError('Benchmark supports only PostgreSQL and SQLite')
+
+        with transaction.atomic():
+            self._generate(options['cities'], options['points'])
+            results = [
+                (name, self._measure(sql, params, indexed=False),
+                 self._measure(sql, params, indexed=True))
+                for name, sql, params in self._queries(options['cities'], options['points'], options['repeat'])
+            ]
+            transaction.set_rollback(True)
+
+        self.stdout.write('%-24s %14s %14s %14s %14s' % ('query', 'seq median', 'seq p95', 'index median', 'index p95'))
+        for name, before, after in results:
+            self.stdout.write('%-24s %11.3f ms %11.3f ms %11.3f ms %11.3f ms' % (name, *before, *after))
+
+    def _generate(self, cities: int, points: int):
+        self.stdout.write('Generate %s cities and %s delivery points' % (cities, points))
+        City.objects.bulk_create(
+            (City(title='Bench city %s' % i, code='bench-%s' % i) for i in range(cities)), batch_size=5000)
+        city_ids = list(City.objects.filter(code__startswith='bench-').values_list('id', flat=True))
+        DeliveryPoint.objects.bulk_create((DeliveryPoint(
+            title='Bench point %s' % i,
+            code='BENCH%s' % i,
+            city_id=random.choice(city_ids[:max(1, points // 20)]),
+            type=random.choice(['PVZ', 'POSTOMAT']),
+            have_cash=random.random() < 0.7,
+            have_cashless=random.random() < 0.9,
+            allowed_cod=random.random() < 0.8,
+        ) for i in range(points)), batch_size=5000)
+        self._city_ids = city_ids[:max(1, points // 20)]
+
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE')
+
+    def _queries(self, cities: int, points: int, repeat: int):
+        return [
+            ('city by code', 'SELECT id FROM {city} WHERE code = %s',
+             [['bench-%s' % random.randrange(cities)] for _ in range(repeat)]),
+            ('point by code', 'SELECT id FROM {point} WHERE code = %s',
+             [['BENCH%s' % random.randrange(points)] for _ in range(repeat)]),
+            ('points by city filter', 'SELECT id FROM {point} WHERE city_id = %s AND is_active = %s AND type = %s '
+                                      'AND have_cash = %s',
+             [[random.choice(self._city_ids), True, 'PVZ', True] for _ in range(repeat)]),
+        ]
+
+    def _measure(self, sql: str, params: list, indexed: bool):
+        hint = ' NOT INDEXED' if connection.vendor == 'sqlite' and not indexed else ''
+        sql = sql.format(
+            city=connection.ops.quote_name(City._meta.db_table) + hint,
+            point=connection.ops.quote_name(DeliveryPoint._meta.db_table) + hint,
+        )
+        timings = []
+
+        with transaction.atomic(), connection.cursor() as cursor:
+            if connection.vendor == 'postgresql':
+                value = 'on' if indexed else 'off'
+                for setting in ('enable_indexscan', 'enable_bitmapscan', 'enable_indexonlyscan'):
+                    cursor.execute('SET LOCAL %s = %s' % (setting, value))
+
+            for args in params:
+                started = time.perf_counter()
+                cursor.execute(sql, args)
+                cursor.fetchall()
+                timings.append((time.perf_counter() - started) * 1000)
+
+        timings.sort()
+        return statistics.median(timings), timings[int(len(timings) * 0.95) - 1]
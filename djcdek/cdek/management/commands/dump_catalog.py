@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand
+
+from djcdek.cdek.utils.bundle import capture_catalog, dump_catalog
+
+
+class Command(BaseCommand):
+    help = 'Dump reference catalog (countries, regions, cities, postal codes, delivery points) to a JSONL file'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='Output file, compressed with gzip if it ends with .gz')
+        parser.add_argument('--raw', action='store_true',
+                            help='Save raw CDEK API responses instead of the database tables')
+        parser.add_argument('--database', default='default')
+
+    def handle(self, *args, **options) -> None:
+        if options['raw']:
+            capture_catalog(options['path'])
+            return
+
+        counts = dump_catalog(options['path'], using=options['database'])
+        for model, count in counts.items():
+            self.stdout.write('%s: %s' % (model, count))
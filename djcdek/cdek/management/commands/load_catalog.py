@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand
+
+from djcdek.cdek.utils.bundle import load_catalog
+
+
+class Command(BaseCommand):
+    help = 'Load reference catalog from a dump_catalog file'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='Input file, compressed with gzip if it ends with .gz')
+        parser.add_argument('--raw', action='store_true',
+                            help='Input is a raw CDEK API capture (dump_catalog --raw)')
+        parser.add_argument('--replace', action='store_true',
+                            help='Delete existing catalog rows before loading (refused while other tables, '
+                                 'e.g. the tariff matrix, reference them)')
+        parser.add_argument('--batch-size', type=int, default=5000)
+        parser.add_argument('--database', default='default')
+
+    def handle(self, *args, **options) -> None:
+        counts = load_catalog(options['path'], raw=options['raw'], replace=options['replace'],
+                              using=options['database'], batch_size=options['batch_size'])
+        for model, count in counts.items():
+            self.stdout.write('%s: %s' % (model, count))
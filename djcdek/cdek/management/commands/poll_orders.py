@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+
+from djcdek.cdek.tracking import poll_orders
+
+
+class Command(BaseCommand):
+    help = 'Poll statuses of tracked orders that are due, in next_poll_at order'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--budget', type=int, default=None, help='Maximum number of API requests (CDEK_ORDER_POLL_BUDGET)')
+        parser.add_argument('--workers', type=int, default=4, help='Maximum number of concurrent API requests')
+
+    def handle(self, *args, **options) -> None:
+        changed = poll_orders(budget=options['budget'], workers=options['workers'])
+        self.stdout.write('%s orders changed status' % changed)
@@ -1,11 +1,23 @@
+from django.conf import settings
 from django.core.management.base import BaseCommand
 
+from djcdek.cdek.payloads import prerender_payloads
+from djcdek.cdek.snapshot import write_snapshot
 from djcdek.cdek.utils.update import update_regions, update_cities, update_pvz
 
 
 class Command(BaseCommand):
+    def add_arguments(self, parser):
+        parser.add_argument('--staged', action='store_true',
+                            help='Load cities and delivery points into staging tables and publish them atomically')
+
     def handle(self, *args, **options) -> None:
         update_regions()
-        update_cities()
-        update_pvz()
+        update_cities(staged=options['staged'])
+        update_pvz(staged=options['staged'])
+
+        if getattr(settings, 'CDEK_SNAPSHOT_PATH', None):
+            write_snapshot(settings.CDEK_SNAPSHOT_PATH)
 
+        if getattr(settings, 'CDEK_PRERENDER_PAYLOADS', False):
+            prerender_payloads()
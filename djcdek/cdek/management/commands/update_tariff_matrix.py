@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from djcdek.cdek.tariffs import update_tariff_matrix
+
+
+class Command(BaseCommand):
+    help = 'Precalculate delivery tariffs for the routes and package sizes from CDEK_TARIFF_MATRIX'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=4, help='Maximum number of concurrent API requests')
+
+    def handle(self, *args, **options) -> None:
+        calculated = update_tariff_matrix(workers=options['workers'])
+        self.stdout.write('Calculated %s routes' % calculated)
@@ -0,0 +1,33 @@
+# Generated by Django 3.2.25 on 2026-10-19 17:19
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cdek', '0005_auto_20200426_1439'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='city',
+            name='generation',
+            field=models.PositiveIntegerField(default=0, verbose_name='Поколение синхронизации'),
+        ),
+        migrations.AddField(
+            model_name='city',
+            name='is_active',
+            field=models.BooleanField(default=True, verbose_name='Активен'),
+        ),
+        migrations.AddField(
+            model_name='deliverypoint',
+            name='generation',
+            field=models.PositiveIntegerField(default=0, verbose_name='Поколение синхронизации'),
+        ),
+        migrations.AddField(
+            model_name='deliverypoint',
+            name='is_active',
+            field=models.BooleanField(default=True, verbose_name='Активен'),
+        ),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 3.2.25 on 2026-10-19 17:22
+
+from django.db import migrations
+from django.db.models import Count, Min
+
+
+def remove_duplicate_codes(apps, schema_editor):
+    """
+    Перед добавлением уникальности оставляет по одной (первой) записи на каждый код
+    """
+    City = apps.get_model('cdek', 'City')
+    DeliveryPoint = apps.get_model('cdek', 'DeliveryPoint')
+
+    for model in (City, DeliveryPoint):
+        duplicates = model.objects.values('code').annotate(total=Count('id'), keep=Min('id')).filter(total__gt=1)
+        for duplicate in duplicates:
+            others = model.objects.filter(code=duplicate['code']).exclude(id=duplicate['keep'])
+            if model is City:
+                DeliveryPoint.objects.filter(city__in=others).update(city_id=duplicate['keep'])
+            others.delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cdek', '0006_generation'),
+    ]
+
+    operations = [
+        migrations.RunPython(remove_duplicate_codes, migrations.RunPython.noop),
+    ]
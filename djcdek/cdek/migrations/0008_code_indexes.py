@@ -0,0 +1,27 @@
+# Generated by Django 3.2.25 on 2026-10-19 17:22
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cdek', '0007_remove_duplicate_codes'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='city',
+            name='code',
+            field=models.CharField(max_length=100, unique=True, verbose_name='Код населенного пункта'),
+        ),
+        migrations.AlterField(
+            model_name='deliverypoint',
+            name='code',
+            field=models.CharField(max_length=100, unique=True, verbose_name='Код'),
+        ),
+        migrations.AddIndex(
+            model_name='deliverypoint',
+            index=models.Index(fields=['city', 'is_active', 'type', 'have_cash', 'have_cashless', 'allowed_cod'], name='cdek_dp_city_filter_idx'),
+        ),
+    ]
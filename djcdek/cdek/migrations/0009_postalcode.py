@@ -0,0 +1,42 @@
+# Generated by Django 3.2.25 on 2026-10-19 17:23
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def fill_postal_codes(apps, schema_editor):
+    City = apps.get_model('cdek', 'City')
+    PostalCode = apps.get_model('cdek', 'PostalCode')
+
+    batch = []
+    for city_id, postal_codes in City.objects.exclude(postal_codes__isnull=True).exclude(postal_codes='') \
+            .values_list('id', 'postal_codes').iterator():
+        batch.extend(PostalCode(code=code, city_id=city_id) for code in set(postal_codes.split(';')) if code)
+        if len(batch) >= 5000:
+            PostalCode.objects.bulk_create(batch)
+            batch = []
+    PostalCode.objects.bulk_create(batch)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cdek', '0008_code_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PostalCode',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('code', models.CharField(max_length=10, verbose_name='Почтовый индекс')),
+                ('city', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='postalcodes', to='cdek.city', verbose_name='Населенный пункт')),
+            ],
+            options={
+                'verbose_name': 'Почтовый индекс',
+                'verbose_name_plural': 'Почтовые индексы',
+                'unique_together': {('code', 'city')},
+            },
+        ),
+        migrations.RunPython(fill_postal_codes, migrations.RunPython.noop),
+    ]
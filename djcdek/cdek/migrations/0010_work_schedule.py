@@ -0,0 +1,18 @@
+# Generated by Django 3.2.25 on 2026-10-19 17:37
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cdek', '0009_postalcode'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='deliverypoint',
+            name='work_schedule',
+            field=models.CharField(blank=True, default=None, max_length=672, null=True, verbose_name='Недельное расписание по 15 минут'),
+        ),
+    ]
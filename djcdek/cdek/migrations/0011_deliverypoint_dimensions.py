@@ -0,0 +1,28 @@
+# Generated by Django 3.2.25 on 2026-10-19 17:38
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cdek', '0010_work_schedule'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='deliverypoint',
+            name='max_depth',
+            field=models.FloatField(blank=True, default=None, null=True, verbose_name='Глубина наибольшей ячейки постамата (в см.)'),
+        ),
+        migrations.AddField(
+            model_name='deliverypoint',
+            name='max_height',
+            field=models.FloatField(blank=True, default=None, null=True, verbose_name='Высота наибольшей ячейки постамата (в см.)'),
+        ),
+        migrations.AddField(
+            model_name='deliverypoint',
+            name='max_width',
+            field=models.FloatField(blank=True, default=None, null=True, verbose_name='Ширина наибольшей ячейки постамата (в см.)'),
+        ),
+    ]
@@ -0,0 +1,36 @@
+# Generated by Django 3.2.25 on 2026-10-19 17:42
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cdek', '0011_deliverypoint_dimensions'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TariffMatrix',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('weight', models.PositiveIntegerField(verbose_name='Вес упаковки (в граммах)')),
+                ('length', models.PositiveIntegerField(default=0, verbose_name='Длина упаковки (в сантиметрах)')),
+                ('width', models.PositiveIntegerField(default=0, verbose_name='Ширина упаковки (в сантиметрах)')),
+                ('height', models.PositiveIntegerField(default=0, verbose_name='Высота упаковки (в сантиметрах)')),
+                ('tariff_code', models.PositiveIntegerField(verbose_name='Код тарифа')),
+                ('delivery_sum', models.FloatField(verbose_name='Стоимость доставки')),
+                ('period_min', models.PositiveIntegerField(blank=True, default=None, null=True, verbose_name='Минимальное время доставки (в рабочих днях)')),
+                ('period_max', models.PositiveIntegerField(blank=True, default=None, null=True, verbose_name='Максимальное время доставки (в рабочих днях)')),
+                ('calculated_at', models.DateTimeField(verbose_name='Дата расчета')),
+                ('from_city', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='cdek.city', verbose_name='Откуда')),
+                ('to_city', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='cdek.city', verbose_name='Куда')),
+            ],
+            options={
+                'verbose_name': 'Тариф по направлению',
+                'verbose_name_plural': 'Матрица тарифов',
+                'unique_together': {('from_city', 'to_city', 'tariff_code', 'weight', 'length', 'width', 'height')},
+            },
+        ),
+    ]
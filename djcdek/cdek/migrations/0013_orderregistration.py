@@ -0,0 +1,29 @@
+# Generated by Django 3.2.25 on 2026-10-19 17:44
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cdek', '0012_tariffmatrix'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='OrderRegistration',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('number', models.CharField(max_length=100, unique=True, verbose_name='Номер заказа')),
+                ('uuid', models.CharField(blank=True, db_index=True, default=None, max_length=100, null=True, verbose_name='Идентификатор заказа CDEK')),
+                ('status', models.CharField(choices=[('pending', 'Отправляется'), ('registered', 'Зарегистрирован'), ('failed', 'Ошибка'), ('deleted', 'Удален')], default='pending', max_length=20, verbose_name='Статус')),
+                ('error', models.TextField(blank=True, default='', verbose_name='Ошибка')),
+                ('created', models.DateTimeField(auto_now_add=True, verbose_name='Создан')),
+                ('updated', models.DateTimeField(auto_now=True, verbose_name='Изменен')),
+            ],
+            options={
+                'verbose_name': 'Регистрация заказа',
+                'verbose_name_plural': 'Регистрация заказов',
+            },
+        ),
+    ]
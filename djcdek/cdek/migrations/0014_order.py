@@ -0,0 +1,57 @@
+# Generated by Django 3.2.25 on 2026-10-19 17:45
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cdek', '0013_orderregistration'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Order',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('uuid', models.CharField(max_length=100, unique=True, verbose_name='Идентификатор заказа CDEK')),
+                ('number', models.CharField(blank=True, db_index=True, default=None, max_length=100, null=True, verbose_name='Номер заказа')),
+                ('status', models.CharField(blank=True, default=None, max_length=100, null=True, verbose_name='Статус')),
+                ('status_date', models.DateTimeField(blank=True, default=None, null=True, verbose_name='Дата статуса')),
+                ('is_final', models.BooleanField(default=False, verbose_name='Конечный статус')),
+                ('next_poll_at', models.DateTimeField(blank=True, default=None, null=True, verbose_name='Следующий опрос')),
+                ('last_polled_at', models.DateTimeField(blank=True, default=None, null=True, verbose_name='Последний опрос')),
+                ('unchanged_polls', models.PositiveIntegerField(default=0, verbose_name='Опросов без изменений')),
+                ('created', models.DateTimeField(auto_now_add=True, verbose_name='Создан')),
+            ],
+            options={
+                'verbose_name': 'Заказ',
+                'verbose_name_plural': 'Заказы',
+            },
+        ),
+        migrations.CreateModel(
+            name='OrderStatusHistory',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('code', models.CharField(max_length=100, verbose_name='Код статуса')),
+                ('name', models.CharField(blank=True, default='', max_length=300, verbose_name='Название статуса')),
+                ('date_time', models.DateTimeField(verbose_name='Дата и время')),
+                ('city', models.CharField(blank=True, default=None, max_length=300, null=True, verbose_name='Место возникновения статуса')),
+                ('order', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='statuses', to='cdek.order', verbose_name='Заказ')),
+            ],
+            options={
+                'verbose_name': 'Статус заказа',
+                'verbose_name_plural': 'История статусов заказов',
+                'ordering': ('date_time', 'id'),
+            },
+        ),
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(fields=['is_final', 'next_poll_at'], name='cdek_order_poll_idx'),
+        ),
+        migrations.AlterUniqueTogether(
+            name='orderstatushistory',
+            unique_together={('order', 'code', 'date_time')},
+        ),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 3.2.25 on 2026-10-19 17:49
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cdek', '0014_order'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='order',
+            name='account',
+            field=models.CharField(default='default', max_length=50, verbose_name='Учетная запись CDEK'),
+        ),
+        migrations.AddField(
+            model_name='orderregistration',
+            name='account',
+            field=models.CharField(default='default', max_length=50, verbose_name='Учетная запись CDEK'),
+        ),
+        migrations.AlterField(
+            model_name='orderregistration',
+            name='number',
+            field=models.CharField(max_length=100, verbose_name='Номер заказа'),
+        ),
+        migrations.AlterUniqueTogether(
+            name='orderregistration',
+            unique_together={('account', 'number')},
+        ),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 3.2.25 on 2026-10-19 17:52
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cdek', '0015_account'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SyncRun',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(db_index=True, max_length=50, verbose_name='Синхронизация')),
+                ('status', models.CharField(choices=[('success', 'Выполнен'), ('failed', 'Ошибка')], default='success', max_length=20, verbose_name='Статус')),
+                ('started', models.DateTimeField(db_index=True, verbose_name='Начало')),
+                ('duration', models.FloatField(verbose_name='Длительность, с')),
+                ('rows', models.PositiveIntegerField(default=0, verbose_name='Записей')),
+                ('batches', models.PositiveIntegerField(default=0, verbose_name='Пакетов записи')),
+                ('queries', models.PositiveIntegerField(default=0, verbose_name='Запросов к базе')),
+                ('peak_memory', models.BigIntegerField(blank=True, default=None, null=True, verbose_name='Пик памяти, байт')),
+                ('report', models.TextField(blank=True, default='', verbose_name='Отчет (JSON)')),
+            ],
+            options={
+                'verbose_name': 'Запуск синхронизации',
+                'verbose_name_plural': 'Запуски синхронизации',
+                'ordering': ('-started',),
+            },
+        ),
+    ]
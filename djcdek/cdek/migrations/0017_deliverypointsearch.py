@@ -0,0 +1,52 @@
+# Generated by Django 3.2.25 on 2026-10-19 17:57
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cdek', '0016_syncrun'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DeliveryPointSearch',
+            fields=[
+                ('deliverypoint', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='search', serialize=False, to='cdek.deliverypoint', verbose_name='ПВЗ')),
+                ('code', models.CharField(max_length=100, unique=True, verbose_name='Код')),
+                ('title', models.CharField(max_length=300, verbose_name='Название')),
+                ('type', models.CharField(max_length=10, verbose_name='Тип ПВЗ')),
+                ('type_name', models.CharField(blank=True, default='', max_length=50, verbose_name='Название типа ПВЗ')),
+                ('address', models.CharField(blank=True, default='', max_length=500, verbose_name='Адрес')),
+                ('address_full', models.CharField(blank=True, default='', max_length=500, verbose_name='Полный адрес')),
+                ('nearest_station', models.TextField(blank=True, default='', verbose_name='Ближайшая станция/остановка транспорта')),
+                ('postal_code', models.CharField(blank=True, db_index=True, default='', max_length=10, verbose_name='Почтовый индекс')),
+                ('work_time', models.TextField(blank=True, default='', verbose_name='Режим работы')),
+                ('longitude', models.FloatField(blank=True, default=None, null=True, verbose_name='Долгота')),
+                ('latitude', models.FloatField(blank=True, default=None, null=True, verbose_name='Широта')),
+                ('have_cash', models.BooleanField(default=False, verbose_name='Есть приём наличных')),
+                ('have_cashless', models.BooleanField(default=False, verbose_name='Есть безналичный расчет')),
+                ('allowed_cod', models.BooleanField(default=False, verbose_name='Разрешен наложенный платеж в ПВЗ')),
+                ('is_dressing_room', models.BooleanField(default=False, verbose_name='Есть ли примерочная')),
+                ('take_only', models.BooleanField(default=False, verbose_name='Только выдача')),
+                ('city_id', models.IntegerField(blank=True, default=None, null=True, verbose_name='Населенный пункт')),
+                ('city_code', models.CharField(blank=True, default='', max_length=100, verbose_name='Код населенного пункта')),
+                ('city_title', models.CharField(blank=True, default='', max_length=300, verbose_name='Населенный пункт')),
+                ('city_points', models.PositiveIntegerField(default=0, verbose_name='ПВЗ в населенном пункте')),
+                ('region_title', models.CharField(blank=True, default='', max_length=300, verbose_name='Регион')),
+                ('country_code', models.CharField(blank=True, default='', max_length=2, verbose_name='Код страны')),
+                ('country_title', models.CharField(blank=True, default='', max_length=300, verbose_name='Страна')),
+                ('search_text', models.TextField(blank=True, default='', verbose_name='Текст для поиска')),
+            ],
+            options={
+                'verbose_name': 'Поиск ПВЗ',
+                'verbose_name_plural': 'Поиск ПВЗ',
+            },
+        ),
+        migrations.AddIndex(
+            model_name='deliverypointsearch',
+            index=models.Index(fields=['city_code', 'type', 'have_cash', 'have_cashless', 'allowed_cod'], name='cdek_dps_city_filter_idx'),
+        ),
+    ]
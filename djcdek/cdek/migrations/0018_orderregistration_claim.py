@@ -0,0 +1,23 @@
+# Generated by Django 3.2.25 on 2026-10-19 18:02
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cdek', '0017_deliverypointsearch'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='orderregistration',
+            name='claim',
+            field=models.CharField(blank=True, db_index=True, default='', max_length=32, verbose_name='Метка отправляющего пакета'),
+        ),
+        migrations.AlterField(
+            model_name='orderregistration',
+            name='status',
+            field=models.CharField(choices=[('new', 'Не отправлялся'), ('sending', 'Отправляется'), ('pending', 'Результат неизвестен'), ('registered', 'Зарегистрирован'), ('failed', 'Ошибка'), ('deleted', 'Удален')], default='new', max_length=20, verbose_name='Статус'),
+        ),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 3.2.25 on 2026-10-19 18:03
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cdek', '0018_orderregistration_claim'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TariffRoute',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('weight', models.PositiveIntegerField(verbose_name='Вес упаковки (в граммах)')),
+                ('length', models.PositiveIntegerField(default=0, verbose_name='Длина упаковки (в сантиметрах)')),
+                ('width', models.PositiveIntegerField(default=0, verbose_name='Ширина упаковки (в сантиметрах)')),
+                ('height', models.PositiveIntegerField(default=0, verbose_name='Высота упаковки (в сантиметрах)')),
+                ('tariffs', models.PositiveIntegerField(default=0, verbose_name='Количество тарифов')),
+                ('calculated_at', models.DateTimeField(verbose_name='Дата расчета')),
+                ('from_city', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='cdek.city', verbose_name='Откуда')),
+                ('to_city', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='cdek.city', verbose_name='Куда')),
+            ],
+            options={
+                'verbose_name': 'Рассчитанное направление',
+                'verbose_name_plural': 'Рассчитанные направления',
+                'unique_together': {('from_city', 'to_city', 'weight', 'length', 'width', 'height')},
+            },
+        ),
+    ]
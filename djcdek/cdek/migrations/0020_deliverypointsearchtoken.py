@@ -0,0 +1,26 @@
+# Generated by Django 3.2.25 on 2026-10-19 18:14
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cdek', '0019_tariffroute'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DeliveryPointSearchToken',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('token', models.CharField(db_index=True, max_length=100, verbose_name='Слово')),
+                ('search', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='tokens', to='cdek.deliverypointsearch', verbose_name='ПВЗ')),
+            ],
+            options={
+                'verbose_name': 'Слово поиска ПВЗ',
+                'verbose_name_plural': 'Слова поиска ПВЗ',
+            },
+        ),
+    ]
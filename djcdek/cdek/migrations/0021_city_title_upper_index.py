@@ -0,0 +1,27 @@
+from django.db import migrations
+
+
+# поиск в админке по началу названия ('^title') - UPPER("title"::text) LIKE UPPER('...%'):
+# на PostgreSQL его обслуживает только индекс по тому же выражению с text_pattern_ops
+INDEX_NAME = 'cdek_city_title_upper_like'
+
+
+def create_index(apps, schema_editor):
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.execute('CREATE INDEX IF NOT EXISTS %s ON cdek_city (UPPER(title::text) text_pattern_ops)' % INDEX_NAME)
+
+
+def drop_index(apps, schema_editor):
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.execute('DROP INDEX IF EXISTS %s' % INDEX_NAME)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cdek', '0020_deliverypointsearchtoken'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_index, drop_index),
+    ]
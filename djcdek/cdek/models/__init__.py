@@ -1,4 +1,13 @@
 from .country import Country
 from .region import Region
 from .city import City
-from .deliverypoint import DeliveryPoint
\ No newline at end of file
+from .deliverypoint import DeliveryPoint
+from .postalcode import PostalCode
+from .tariffmatrix import TariffMatrix
+from .tariffroute import TariffRoute
+from .orderregistration import OrderRegistration
+from .order import Order
+from .orderstatushistory import OrderStatusHistory
+from .syncrun import SyncRun
+from .deliverypointsearch import DeliveryPointSearch
+from .deliverypointsearchtoken import DeliveryPointSearchToken
@@ -1,6 +1,13 @@
 from django.db import models
 
 from .region import Region
+from .managers import CatalogQuerySet, CatalogManager, AllCatalogManager
+
+
+class CityQuerySet(CatalogQuerySet):
+    def by_postal_code(self, code: str):
+        """ Населенные пункты с почтовым индексом code (поиск по индексу таблицы PostalCode) """
+        return self.filter(postalcodes__code=code)
 
 
 class City(models.Model):
@@ -8,7 +15,7 @@ class City(models.Model):
     Населенный пункт доставки
     """
     title = models.CharField('Название', max_length=300)
-    code = models.CharField('Код населенного пункта', max_length=100)
+    code = models.CharField('Код населенного пункта', max_length=100, unique=True)
     fias_guid = models.CharField('Уникальный идентификатор ФИАС населенного пункта', max_length=100,
                     default=None, blank=True, null=True)
     kladr_code = models.CharField('Код КЛАДР населенного пункта', max_length=100,
@@ -19,6 +26,11 @@ class City(models.Model):
     payment_limit = models.IntegerField('Платежные ограничения', default=None, blank=True, null=True)
     postal_codes = models.TextField('Почтовые индексы (через ;)', default=None, blank=True, null=True)
     region = models.ForeignKey(Region, verbose_name='Регион', default=None, blank=True, null=True, on_delete=models.SET_DEFAULT)
+    generation = models.PositiveIntegerField('Поколение синхронизации', default=0)
+    is_active = models.BooleanField('Активен', default=True)
+
+    objects = CatalogManager.from_queryset(CityQuerySet)()
+    all_objects = AllCatalogManager.from_queryset(CityQuerySet)()
 
     class Meta:
         verbose_name = 'Населенный пункт'
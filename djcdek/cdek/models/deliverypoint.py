@@ -1,15 +1,51 @@
+from datetime import datetime
+
 from django.db import models
+from django.db.models import Q
+from django.db.models.functions import Substr
+from django.utils import timezone
 
 from .city import City
+from .managers import CatalogQuerySet, CatalogManager, AllCatalogManager
+from djcdek.cdek.utils.worktime import SLOTS_PER_DAY, local_slot
 from djcdek.types import DeliveryPointType
 
 
+class DeliveryPointQuerySet(CatalogQuerySet):
+    def open_at(self, dt: datetime):
+        """
+        ПВЗ, открытые в момент dt по недельному расписанию work_schedule.
+        Время с временной зоной переводится в зону населенного пункта каждого ПВЗ,
+        время без зоны считается местным временем ПВЗ.
+        """
+        if timezone.is_naive(dt):
+            return self.annotate(_work_slot=Substr('work_schedule', local_slot(dt) + 1, 1)).filter(_work_slot='1')
+
+        # интервал расписания зависит от зоны - условие строится для каждой зоны выборки
+        zones = self.order_by().values_list('city__timezone', flat=True).distinct()
+        annotations = dict()
+        condition = Q(pk__in=[])
+        for zone in zones:
+            slot = local_slot(dt, zone)
+            name = '_work_slot_%s' % slot
+            annotations[name] = Substr('work_schedule', slot + 1, 1)
+            in_zone = Q(city__timezone=zone) if zone is not None else Q(city__timezone__isnull=True)
+            condition |= Q(**{name: '1'}) & in_zone
+        return self.annotate(**annotations).filter(condition)
+
+    def open_on(self, weekday: int):
+        """ ПВЗ, работающие в день недели weekday (0 - понедельник, как datetime.weekday()) """
+        return self.annotate(
+            _work_day=Substr('work_schedule', weekday * SLOTS_PER_DAY + 1, SLOTS_PER_DAY)
+        ).filter(_work_day__contains='1')
+
+
 class DeliveryPoint(models.Model):
     """
     Точка доставки
     """
     title = models.CharField('Название', max_length=300)
-    code = models.CharField('Код', max_length=100)
+    code = models.CharField('Код', max_length=100, unique=True)
     city = models.ForeignKey(City, verbose_name='Населенный пункт', default=None, blank=True, null=True, 
                     on_delete=models.CASCADE, related_name='deliverypoints')
     postal_code = models.CharField('Почтовый индекс', max_length=10, default=None, blank=True, null=True)
@@ -23,6 +59,7 @@ class DeliveryPoint(models.Model):
     email = models.EmailField(default=None, blank=True, null=True)
     note = models.TextField('Примечание по ПВЗ', default='', blank=True, null=True)
     work_time = models.TextField('Режим работы', default='', blank=True, null=True)
+    work_schedule = models.CharField('Недельное расписание по 15 минут', max_length=672, default=None, blank=True, null=True)
     type = models.CharField('Тип ПВЗ', max_length=10, choices=list(DeliveryPointType.to_dict().items()), default=DeliveryPointType.PVZ.value)
     owner_code = models.CharField('Принадлежность ПВЗ компании', max_length=10, default=None, blank=True, null=True)
     take_only = models.BooleanField('Является ли ПВЗ только пунктом выдачи или также осуществляет приём грузов', default=False, blank=True)
@@ -33,10 +70,23 @@ class DeliveryPoint(models.Model):
     site = models.CharField('Ссылка на страницу ПВЗ', max_length=300, default=None, blank=True, null=True)
     weight_min = models.FloatField('Минимальный вес (в кг.), принимаемый в ПВЗ (> WeightMin)', default=None, blank=True, null=True)
     weight_max = models.FloatField('Максимальный вес (в кг.), принимаемый в ПВЗ (<=WeightMax)', default=None, blank=True, null=True)
+    max_width = models.FloatField('Ширина наибольшей ячейки постамата (в см.)', default=None, blank=True, null=True)
+    max_height = models.FloatField('Высота наибольшей ячейки постамата (в см.)', default=None, blank=True, null=True)
+    max_depth = models.FloatField('Глубина наибольшей ячейки постамата (в см.)', default=None, blank=True, null=True)
+    generation = models.PositiveIntegerField('Поколение синхронизации', default=0)
+    is_active = models.BooleanField('Активен', default=True)
+
+    objects = CatalogManager.from_queryset(DeliveryPointQuerySet)()
+    all_objects = AllCatalogManager.from_queryset(DeliveryPointQuerySet)()
 
     class Meta:
         verbose_name = 'ПВЗ'
         verbose_name_plural = 'ПВЗ'
+        indexes = [
+            # типичный фильтр ПВЗ на оформлении заказа: город + тип + способы оплаты
+            models.Index(fields=['city', 'is_active', 'type', 'have_cash', 'have_cashless', 'allowed_cod'],
+                         name='cdek_dp_city_filter_idx'),
+        ]
 
     def __str__(self):
         return self.title
@@ -0,0 +1,78 @@
+from django.db import models
+
+from .deliverypoint import DeliveryPoint
+from djcdek.cdek.utils.text import normalize
+
+
+class DeliveryPointSearchQuerySet(models.QuerySet):
+    def in_city(self, city):
+        """ ПВЗ населенного пункта (объект City или код CDEK) """
+        return self.filter(city_code=str(getattr(city, 'code', city)))
+
+    def of_type(self, type):
+        return self.filter(type=getattr(type, 'value', type))
+
+    def search(self, text: str):
+        """ ПВЗ, в названии, адресе, станции, индексе или населенном пункте которых есть слова, начинающиеся на слова text """
+        from .deliverypointsearchtoken import DeliveryPointSearchToken, TOKEN_LENGTH
+
+        queryset = self
+        for token in normalize(text).split():
+            # поиск по индексу слов, а не по подстроке search_text
+            tokens = DeliveryPointSearchToken.objects.filter(token__startswith=token[:TOKEN_LENGTH])
+            queryset = queryset.filter(pk__in=tokens.values('search_id'))
+        return queryset
+
+    def deliverypoints(self):
+        """ Соответствующие записи DeliveryPoint """
+        return DeliveryPoint.objects.filter(pk__in=self.values('deliverypoint_id'))
+
+
+class DeliveryPointSearch(models.Model):
+    """
+    Плоская таблица поиска ПВЗ: одна строка на активный ПВЗ с названиями населенного пункта, региона и страны,
+    нормализованным текстом для поиска и количеством ПВЗ в населенном пункте.
+    Перестраивается синхронизацией (djcdek.cdek.search.rebuild_deliverypoint_search).
+    """
+    deliverypoint = models.OneToOneField(DeliveryPoint, verbose_name='ПВЗ', primary_key=True,
+                                         on_delete=models.CASCADE, related_name='search')
+    code = models.CharField('Код', max_length=100, unique=True)
+    title = models.CharField('Название', max_length=300)
+    type = models.CharField('Тип ПВЗ', max_length=10)
+    type_name = models.CharField('Название типа ПВЗ', max_length=50, default='', blank=True)
+    address = models.CharField('Адрес', max_length=500, default='', blank=True)
+    address_full = models.CharField('Полный адрес', max_length=500, default='', blank=True)
+    nearest_station = models.TextField('Ближайшая станция/остановка транспорта', default='', blank=True)
+    postal_code = models.CharField('Почтовый индекс', max_length=10, default='', blank=True, db_index=True)
+    work_time = models.TextField('Режим работы', default='', blank=True)
+    longitude = models.FloatField('Долгота', default=None, blank=True, null=True)
+    latitude = models.FloatField('Широта', default=None, blank=True, null=True)
+    have_cash = models.BooleanField('Есть приём наличных', default=False)
+    have_cashless = models.BooleanField('Есть безналичный расчет', default=False)
+    allowed_cod = models.BooleanField('Разрешен наложенный платеж в ПВЗ', default=False)
+    is_dressing_room = models.BooleanField('Есть ли примерочная', default=False)
+    take_only = models.BooleanField('Только выдача', default=False)
+    city_id = models.IntegerField('Населенный пункт', default=None, blank=True, null=True)
+    city_code = models.CharField('Код населенного пункта', max_length=100, default='', blank=True)
+    city_title = models.CharField('Населенный пункт', max_length=300, default='', blank=True)
+    city_points = models.PositiveIntegerField('ПВЗ в населенном пункте', default=0)
+    region_title = models.CharField('Регион', max_length=300, default='', blank=True)
+    country_code = models.CharField('Код страны', max_length=2, default='', blank=True)
+    country_title = models.CharField('Страна', max_length=300, default='', blank=True)
+    search_text = models.TextField('Текст для поиска', default='', blank=True)
+
+    objects = DeliveryPointSearchQuerySet.as_manager()
+
+    class Meta:
+        verbose_name = 'Поиск ПВЗ'
+        verbose_name_plural = 'Поиск ПВЗ'
+        indexes = [
+            models.Index(fields=['city_code', 'type', 'have_cash', 'have_cashless', 'allowed_cod'],
+                         name='cdek_dps_city_filter_idx'),
+        ]
+
+    def __str__(self):
+        return self.title
+
+    def __repr__(self):
+        return str(self.deliverypoint_id)
@@ -0,0 +1,27 @@
+from django.db import models
+
+from .deliverypointsearch import DeliveryPointSearch
+
+
+TOKEN_LENGTH = 100
+""" Слова длиннее обрезаются: для поиска по началу слова этого достаточно """
+
+
+class DeliveryPointSearchToken(models.Model):
+    """
+    Слово текста для поиска ПВЗ (одна строка на уникальное слово ПВЗ).
+    Поиск по началу слова - диапазон по индексу token (на PostgreSQL - индекс varchar_pattern_ops для LIKE).
+    Перестраивается вместе с DeliveryPointSearch.
+    """
+    search = models.ForeignKey(DeliveryPointSearch, verbose_name='ПВЗ', on_delete=models.CASCADE, related_name='tokens')
+    token = models.CharField('Слово', max_length=TOKEN_LENGTH, db_index=True)
+
+    class Meta:
+        verbose_name = 'Слово поиска ПВЗ'
+        verbose_name_plural = 'Слова поиска ПВЗ'
+
+    def __str__(self):
+        return self.token
+
+    def __repr__(self):
+        return str(self.id)
@@ -0,0 +1,24 @@
+from django.db import models
+
+
+class CatalogQuerySet(models.QuerySet):
+    """
+    Выборка записей справочника, обновляемого синхронизацией с CDEK
+    """
+    def active(self):
+        return self.filter(is_active=True)
+
+    def stale(self, generation: int):
+        """ Записи, не затронутые синхронизацией с номером generation """
+        return self.filter(generation__lt=generation)
+
+
+class CatalogManager(models.Manager.from_queryset(CatalogQuerySet)):
+    """
+    Менеджер по умолчанию: скрывает деактивированные записи справочника
+    """
+    def get_queryset(self):
+        return super(CatalogManager, self).get_queryset().filter(is_active=True)
+
+
+AllCatalogManager = models.Manager.from_queryset(CatalogQuerySet)
@@ -0,0 +1,31 @@
+from django.db import models
+
+
+class Order(models.Model):
+    """
+    Заказ, зарегистрированный в CDEK
+    """
+    uuid = models.CharField('Идентификатор заказа CDEK', max_length=100, unique=True)
+    account = models.CharField('Учетная запись CDEK', max_length=50, default='default')
+    number = models.CharField('Номер заказа', max_length=100, default=None, blank=True, null=True, db_index=True)
+    status = models.CharField('Статус', max_length=100, default=None, blank=True, null=True)
+    status_date = models.DateTimeField('Дата статуса', default=None, blank=True, null=True)
+    is_final = models.BooleanField('Конечный статус', default=False)
+    next_poll_at = models.DateTimeField('Следующий опрос', default=None, blank=True, null=True)
+    last_polled_at = models.DateTimeField('Последний опрос', default=None, blank=True, null=True)
+    unchanged_polls = models.PositiveIntegerField('Опросов без изменений', default=0)
+    created = models.DateTimeField('Создан', auto_now_add=True)
+
+    class Meta:
+        verbose_name = 'Заказ'
+        verbose_name_plural = 'Заказы'
+        indexes = [
+            # очередь опроса: незавершенные заказы по времени следующего опроса
+            models.Index(fields=['is_final', 'next_poll_at'], name='cdek_order_poll_idx'),
+        ]
+
+    def __str__(self):
+        return self.number or self.uuid
+
+    def __repr__(self):
+        return str(self.id)
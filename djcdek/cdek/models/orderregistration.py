@@ -0,0 +1,41 @@
+from django.db import models
+
+
+class OrderRegistration(models.Model):
+    """
+    Журнал регистрации заказов в CDEK: номер заказа ИС Клиента - ключ идемпотентности в пределах учетной записи
+    """
+    NEW = 'new'
+    SENDING = 'sending'
+    PENDING = 'pending'
+    REGISTERED = 'registered'
+    FAILED = 'failed'
+    DELETED = 'deleted'
+    STATUSES = (
+        (NEW, 'Не отправлялся'),
+        (SENDING, 'Отправляется'),
+        (PENDING, 'Результат неизвестен'),
+        (REGISTERED, 'Зарегистрирован'),
+        (FAILED, 'Ошибка'),
+        (DELETED, 'Удален'),
+    )
+
+    account = models.CharField('Учетная запись CDEK', max_length=50, default='default')
+    number = models.CharField('Номер заказа', max_length=100)
+    uuid = models.CharField('Идентификатор заказа CDEK', max_length=100, default=None, blank=True, null=True, db_index=True)
+    status = models.CharField('Статус', max_length=20, choices=STATUSES, default=NEW)
+    claim = models.CharField('Метка отправляющего пакета', max_length=32, default='', blank=True, db_index=True)
+    error = models.TextField('Ошибка', default='', blank=True)
+    created = models.DateTimeField('Создан', auto_now_add=True)
+    updated = models.DateTimeField('Изменен', auto_now=True)
+
+    class Meta:
+        verbose_name = 'Регистрация заказа'
+        verbose_name_plural = 'Регистрация заказов'
+        unique_together = ('account', 'number')
+
+    def __str__(self):
+        return self.number
+
+    def __repr__(self):
+        return str(self.id)
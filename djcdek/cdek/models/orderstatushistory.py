@@ -0,0 +1,26 @@
+from django.db import models
+
+from .order import Order
+
+
+class OrderStatusHistory(models.Model):
+    """
+    Статус заказа в истории доставки
+    """
+    order = models.ForeignKey(Order, verbose_name='Заказ', on_delete=models.CASCADE, related_name='statuses')
+    code = models.CharField('Код статуса', max_length=100)
+    name = models.CharField('Название статуса', max_length=300, default='', blank=True)
+    date_time = models.DateTimeField('Дата и время')
+    city = models.CharField('Место возникновения статуса', max_length=300, default=None, blank=True, null=True)
+
+    class Meta:
+        verbose_name = 'Статус заказа'
+        verbose_name_plural = 'История статусов заказов'
+        unique_together = ('order', 'code', 'date_time')
+        ordering = ('date_time', 'id')
+
+    def __str__(self):
+        return self.code
+
+    def __repr__(self):
+        return str(self.id)
@@ -0,0 +1,22 @@
+from django.db import models
+
+from .city import City
+
+
+class PostalCode(models.Model):
+    """
+    Почтовый индекс населенного пункта
+    """
+    code = models.CharField('Почтовый индекс', max_length=10)
+    city = models.ForeignKey(City, verbose_name='Населенный пункт', on_delete=models.CASCADE, related_name='postalcodes')
+
+    class Meta:
+        verbose_name = 'Почтовый индекс'
+        verbose_name_plural = 'Почтовые индексы'
+        unique_together = ('code', 'city')
+
+    def __str__(self):
+        return self.code
+
+    def __repr__(self):
+        return str(self.id)
@@ -0,0 +1,34 @@
+from django.db import models
+
+
+class SyncRun(models.Model):
+    """
+    Отчет о запуске синхронизации справочника: время по этапам, запросы к базе, скорость и память
+    """
+    SUCCESS = 'success'
+    FAILED = 'failed'
+    STATUSES = (
+        (SUCCESS, 'Выполнен'),
+        (FAILED, 'Ошибка'),
+    )
+
+    name = models.CharField('Синхронизация', max_length=50, db_index=True)
+    status = models.CharField('Статус', max_length=20, choices=STATUSES, default=SUCCESS)
+    started = models.DateTimeField('Начало', db_index=True)
+    duration = models.FloatField('Длительность, с')
+    rows = models.PositiveIntegerField('Записей', default=0)
+    batches = models.PositiveIntegerField('Пакетов записи', default=0)
+    queries = models.PositiveIntegerField('Запросов к базе', default=0)
+    peak_memory = models.BigIntegerField('Пик памяти, байт', default=None, blank=True, null=True)
+    report = models.TextField('Отчет (JSON)', default='', blank=True)
+
+    class Meta:
+        verbose_name = 'Запуск синхронизации'
+        verbose_name_plural = 'Запуски синхронизации'
+        ordering = ('-started',)
+
+    def __str__(self):
+        return '%s %s' % (self.name, self.started)
+
+    def __repr__(self):
+        return str(self.id)
@@ -0,0 +1,31 @@
+from django.db import models
+
+from .city import City
+
+
+class TariffMatrix(models.Model):
+    """
+    Заранее рассчитанная стоимость доставки между населенными пунктами для упаковки типового размера
+    """
+    from_city = models.ForeignKey(City, verbose_name='Откуда', on_delete=models.CASCADE, related_name='+')
+    to_city = models.ForeignKey(City, verbose_name='Куда', on_delete=models.CASCADE, related_name='+')
+    weight = models.PositiveIntegerField('Вес упаковки (в граммах)')
+    length = models.PositiveIntegerField('Длина упаковки (в сантиметрах)', default=0)
+    width = models.PositiveIntegerField('Ширина упаковки (в сантиметрах)', default=0)
+    height = models.PositiveIntegerField('Высота упаковки (в сантиметрах)', default=0)
+    tariff_code = models.PositiveIntegerField('Код тарифа')
+    delivery_sum = models.FloatField('Стоимость доставки')
+    period_min = models.PositiveIntegerField('Минимальное время доставки (в рабочих днях)', default=None, blank=True, null=True)
+    period_max = models.PositiveIntegerField('Максимальное время доставки (в рабочих днях)', default=None, blank=True, null=True)
+    calculated_at = models.DateTimeField('Дата расчета')
+
+    class Meta:
+        verbose_name = 'Тариф по направлению'
+        verbose_name_plural = 'Матрица тарифов'
+        unique_together = ('from_city', 'to_city', 'tariff_code', 'weight', 'length', 'width', 'height')
+
+    def __str__(self):
+        return '%s -> %s (%s)' % (self.from_city_id, self.to_city_id, self.tariff_code)
+
+    def __repr__(self):
+        return str(self.id)
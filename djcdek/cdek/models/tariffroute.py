@@ -0,0 +1,29 @@
+from django.db import models
+
+from .city import City
+
+
+class TariffRoute(models.Model):
+    """
+    Отметка о расчете направления матрицы тарифов для категории упаковки,
+    в том числе направления, по которому CDEK не вернул ни одного тарифа
+    """
+    from_city = models.ForeignKey(City, verbose_name='Откуда', on_delete=models.CASCADE, related_name='+')
+    to_city = models.ForeignKey(City, verbose_name='Куда', on_delete=models.CASCADE, related_name='+')
+    weight = models.PositiveIntegerField('Вес упаковки (в граммах)')
+    length = models.PositiveIntegerField('Длина упаковки (в сантиметрах)', default=0)
+    width = models.PositiveIntegerField('Ширина упаковки (в сантиметрах)', default=0)
+    height = models.PositiveIntegerField('Высота упаковки (в сантиметрах)', default=0)
+    tariffs = models.PositiveIntegerField('Количество тарифов', default=0)
+    calculated_at = models.DateTimeField('Дата расчета')
+
+    class Meta:
+        verbose_name = 'Рассчитанное направление'
+        verbose_name_plural = 'Рассчитанные направления'
+        unique_together = ('from_city', 'to_city', 'weight', 'length', 'width', 'height')
+
+    def __str__(self):
+        return '%s -> %s' % (self.from_city_id, self.to_city_id)
+
+    def __repr__(self):
+        return str(self.id)
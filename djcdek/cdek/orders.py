@@ -0,0 +1,166 @@
+import logging
+from collections import namedtuple
+from datetime import timedelta
+from typing import Dict, List, Optional
+from uuid import uuid4
+
+from django.conf import settings
+from django.db.models import Q
+from django.utils import timezone
+
+from djcdek.cdek.client import DEFAULT_ACCOUNT, get_client
+from djcdek.cdek.models import OrderRegistration
+from djcdek.cdek.tracking import track_order
+from djcdek.cdek.utils.concurrency import bounded_map
+from djcdek.cdek.validation import OrderError, validate_orders
+from djcdek.exceptions import CDEKException
+from djcdek.types import RegisterOrderRequest
+
+
+OrderResult = namedtuple('OrderResult', ['number', 'uuid', 'errors'])
+""" Результат регистрации заказа: uuid заказа CDEK или список OrderError """
+
+LEDGER_CHUNK = 900
+
+
+def _api_error(error: BaseException) -> OrderError:
+    if isinstance(error, CDEKException):
+        return OrderError('', error.code, error.message)
+    return OrderError('', 'request', str(error))
+
+
+def _concurrency(max_concurrency: Optional[int]) -> int:
+    return max_concurrency or getattr(settings, 'CDEK_ORDER_CONCURRENCY', 8)
+
+
+def _claim(journal, numbers: List[str], statuses: tuple, claim: str, stale):
+    """ Условным UPDATE отмечает записи журнала меткой claim: запись получает только один пакет """
+    condition = Q(status__in=statuses)
+    if OrderRegistration.PENDING in statuses:
+        # пакет, захвативший запись, завершился аварийно
+        condition |= Q(status=OrderRegistration.SENDING, updated__lt=stale)
+    for start in range(0, len(numbers), LEDGER_CHUNK):
+        journal.filter(condition, number__in=numbers[start:start + LEDGER_CHUNK]).update(
+            status=OrderRegistration.SENDING, claim=claim, error='', updated=timezone.now())
+
+
+def register_orders(requests: List[RegisterOrderRequest], max_concurrency: int = None,
+                    validate: bool = True, account: str = None) -> List[OrderResult]:
+    """
+    Регистрирует пакет заказов, выполняя до max_concurrency запросов к API одновременно
+    (по умолчанию CDEK_ORDER_CONCURRENCY).
+
+    Номер заказа - ключ идемпотентности: заказы, уже зарегистрированные по журналу OrderRegistration,
+    повторно не отправляются, поэтому прерванный пакет можно отправить еще раз целиком.
+    Перед повторной отправкой заказ ищется в CDEK по номеру: прошлая попытка могла создать его.
+    Одновременные пакеты не отправляют один номер дважды: номер отправляет пакет, захвативший запись журнала,
+    запись другого пакета считается зависшей через CDEK_ORDER_CLAIM_TIMEOUT секунд (по умолчанию 600).
+    validate -- предварительно проверить заказы (см. validation.validate_orders)
+    account -- учетная запись CDEK из CDEK_ACCOUNTS, от имени которой регистрируются заказы
+    return результаты в порядке заказов
+    """
+    logger = logging.getLogger('cdek')
+    account = account or DEFAULT_ACCOUNT
+    journal = OrderRegistration.objects.filter(account=account)
+    results = [None] * len(requests)
+    invalid = validate_orders(requests) if validate else dict()
+
+    numbers = sorted({request.number for request in requests if request.number})
+    ledger = dict()
+    for start in range(0, len(numbers), LEDGER_CHUNK):
+        ledger.update((entry.number, entry) for entry in
+                      journal.filter(number__in=numbers[start:start + LEDGER_CHUNK]))
+
+    candidates = []
+    seen = set()
+    for index, request in enumerate(requests):
+        if not request.number:
+            results[index] = OrderResult(None, None, [OrderError('number', 'required', 'Order number is required')])
+        elif index in invalid:
+            results[index] = OrderResult(request.number, None, invalid[index])
+        elif request.number in seen:
+            results[index] = OrderResult(request.number, None, [
+                OrderError('number', 'duplicate', 'Order number %s is repeated in the batch' % request.number)])
+        else:
+            seen.add(request.number)
+            entry = ledger.get(request.number)
+            if entry is not None and entry.status == OrderRegistration.REGISTERED:
+                results[index] = OrderResult(request.number, entry.uuid, [])
+            else:
+                candidates.append((index, request))
+
+    OrderRegistration.objects.bulk_create(
+        [OrderRegistration(account=account, number=request.number) for _, request in candidates
+         if request.number not in ledger],
+        ignore_conflicts=True)
+
+    # заказы, которые еще не отправлялись, и заказы, прошлая попытка которых могла создать заказ в CDEK
+    fresh = uuid4().hex
+    retry = uuid4().hex
+    stale = timezone.now() - timedelta(seconds=getattr(settings, 'CDEK_ORDER_CLAIM_TIMEOUT', 600))
+    pending = [request.number for _, request in candidates]
+    _claim(journal, pending, (OrderRegistration.NEW, OrderRegistration.DELETED), fresh, stale)
+    _claim(journal, pending, (OrderRegistration.PENDING, OrderRegistration.FAILED), retry, stale)
+    claimed = dict(journal.filter(claim__in=[fresh, retry]).values_list('number', 'claim'))
+
+    tasks = []
+    others = dict()
+    unclaimed = [request.number for _, request in candidates if request.number not in claimed]
+    for start in range(0, len(unclaimed), LEDGER_CHUNK):
+        others.update((entry.number, entry) for entry in
+                      journal.filter(number__in=unclaimed[start:start + LEDGER_CHUNK]))
+    for index, request in candidates:
+        if request.number in claimed:
+            tasks.append((index, request, claimed[request.number] == retry))
+            continue
+        entry = others.get(request.number)
+        if entry is not None and entry.status == OrderRegistration.REGISTERED:
+            results[index] = OrderResult(request.number, entry.uuid, [])
+        else:
+            results[index] = OrderResult(request.number, None, [OrderError(
+                'number', 'inprogress', 'Order %s is being registered by another batch' % request.number)])
+
+    client = get_client(account)
+
+    def register(task) -> str:
+        _, request, check = task
+        if check:
+            try:
+                return client.order_info_by_number(request.number)['entity']['uuid']
+            except (CDEKException, KeyError, TypeError):
+                pass
+        return client.register_order(request)
+
+    for (index, request, _), uuid, error in bounded_map(register, tasks, _concurrency(max_concurrency)):
+        entry = journal.filter(number=request.number, claim__in=[fresh, retry])
+        if error is None:
+            entry.update(uuid=uuid, status=OrderRegistration.REGISTERED, claim='', error='')
+            track_order(uuid, request.number, account)
+            results[index] = OrderResult(request.number, uuid, [])
+        else:
+            logger.warning('Order %s registration failed: %s' % (request.number, error))
+            # ошибка API - заказ отклонен; ошибка соединения - заказ мог быть создан, проверяется при повторе
+            status = OrderRegistration.FAILED if isinstance(error, CDEKException) else OrderRegistration.PENDING
+            entry.update(status=status, claim='', error=str(error))
+            results[index] = OrderResult(request.number, None, [_api_error(error)])
+
+    return results
+
+
+def delete_orders(uuids: List[str], max_concurrency: int = None, account: str = None) -> Dict[str, Optional[OrderError]]:
+    """
+    Удаляет заказы в CDEK, выполняя до max_concurrency запросов одновременно
+
+    account -- учетная запись CDEK, в которой зарегистрированы заказы
+    return ошибка удаления по uuid заказа (None - заказ удален)
+    """
+    client = get_client(account)
+    results = dict()
+    for uuid, _, error in bounded_map(client.delete_order, uuids, _concurrency(max_concurrency)):
+        results[uuid] = _api_error(error) if error is not None else None
+
+    deleted = [uuid for uuid, error in results.items() if error is None]
+    for start in range(0, len(deleted), LEDGER_CHUNK):
+        OrderRegistration.objects.filter(uuid__in=deleted[start:start + LEDGER_CHUNK]).update(
+            status=OrderRegistration.DELETED)
+    return results
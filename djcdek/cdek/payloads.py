@@ -0,0 +1,76 @@
+import gzip
+import hashlib
+import json
+from collections import defaultdict
+
+from django.core.serializers.json import DjangoJSONEncoder
+
+from djcdek.cdek.cache import DELIVERYPOINT_FIELDS, catalog_cache
+from djcdek.cdek.models import City, DeliveryPoint, Region
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+
+CITY_FIELDS = ('id', 'code', 'title', 'region_id', 'latitude', 'longitude', 'timezone', 'postal_codes')
+
+
+def render_payload(data) -> dict:
+    """
+    Сериализует данные в JSON один раз и сразу сжимает: {'etag', 'identity', 'gzip', 'br'}.
+    Сжатие brotli выполняется, только если установлен пакет brotli.
+    """
+    content = json.dumps(data, cls=DjangoJSONEncoder, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+    return {
+        'etag': '"%s"' % hashlib.md5(content).hexdigest(),
+        'identity': content,
+        'gzip': gzip.compress(content, 6),
+        'br': brotli.compress(content) if brotli else None,
+    }
+
+
+def _region_cities(rows) -> list:
+    return [dict(zip(CITY_FIELDS, row)) for row in rows]
+
+
+def _city_deliverypoints(rows) -> list:
+    return [dict(zip(DELIVERYPOINT_FIELDS, row)) for row in rows]
+
+
+def region_cities_payload(region_id: int) -> dict:
+    """ Населенные пункты региона """
+    def load():
+        return render_payload(_region_cities(
+            City.objects.filter(region_id=region_id).order_by('title', 'id').values_list(*CITY_FIELDS)))
+
+    return catalog_cache.get_or_load('payload:region:%s' % region_id, load)
+
+
+def city_deliverypoints_payload(city_id: int) -> dict:
+    """ ПВЗ населенного пункта """
+    def load():
+        return render_payload(_city_deliverypoints(
+            DeliveryPoint.objects.filter(city_id=city_id).order_by('id').values_list(*DELIVERYPOINT_FIELDS)))
+
+    return catalog_cache.get_or_load('payload:city:%s' % city_id, load)
+
+
+def prerender_payloads():
+    """
+    Заранее формирует ответы для всех регионов и населенных пунктов с ПВЗ
+    и сохраняет их в общем кэше текущей версии каталога.
+    Вызывается после синхронизации, чтобы первые запросы не строили ответы сами.
+    """
+    cities = defaultdict(list)
+    for row in City.objects.order_by('title', 'id').values_list(*CITY_FIELDS).iterator():
+        cities[row[CITY_FIELDS.index('region_id')]].append(row)
+    for region_id in Region.objects.values_list('id', flat=True):
+        catalog_cache.set('payload:region:%s' % region_id, render_payload(_region_cities(cities.get(region_id, []))))
+
+    points = defaultdict(list)
+    for row in DeliveryPoint.objects.order_by('id').values_list(*DELIVERYPOINT_FIELDS).iterator():
+        points[row[DELIVERYPOINT_FIELDS.index('city_id')]].append(row)
+    for city_id, rows in points.items():
+        catalog_cache.set('payload:city:%s' % city_id, render_payload(_city_deliverypoints(rows)))
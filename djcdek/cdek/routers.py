@@ -0,0 +1,87 @@
+import random
+import threading
+import time
+from contextlib import ContextDecorator
+
+from django.conf import settings
+
+from djcdek.cdek.catalog import catalog_written_at
+
+
+CATALOG_MODELS = ('country', 'region', 'city', 'deliverypoint', 'postalcode', 'deliverypointsearch',
+                  'deliverypointsearchtoken')
+""" Справочники, которые изменяет только синхронизация """
+
+_local = threading.local()
+
+
+class PrimaryPin(ContextDecorator):
+    def __enter__(self):
+        _local.depth = getattr(_local, 'depth', 0) + 1
+        return self
+
+    def __exit__(self, *exc):
+        _local.depth -= 1
+        return False
+
+
+def pin_primary() -> PrimaryPin:
+    """
+    Направляет чтение справочников текущего потока в основную базу (контекстный менеджер или декоратор).
+    Используется синхронизацией: она читает только что записанные ею данные.
+    """
+    return PrimaryPin()
+
+
+def is_pinned() -> bool:
+    return getattr(_local, 'depth', 0) > 0
+
+
+class CatalogReplicaRouter:
+    """
+    Роутер чтения справочников с реплик:
+
+        DATABASE_ROUTERS = ['djcdek.cdek.routers.CatalogReplicaRouter']
+        CDEK_REPLICA_DATABASES = ['replica1', 'replica2']   # алиасы реплик
+        CDEK_PRIMARY_DATABASE = 'default'                   # алиас основной базы
+        CDEK_READ_YOUR_WRITES = 30                          # секунды
+
+    Чтение справочников (CDEK_REPLICA_MODELS) идет на случайную реплику, запись - в основную базу.
+    Чтение идет в основную базу внутри pin_primary и в течение CDEK_READ_YOUR_WRITES секунд после
+    окончания синхронизации (catalog.catalog_written_at), пока реплики догоняют основную базу.
+    Остальные модели роутер не направляет.
+    """
+    def _is_catalog(self, model) -> bool:
+        return model._meta.app_label == 'cdek' and \
+            model._meta.model_name in getattr(settings, 'CDEK_REPLICA_MODELS', CATALOG_MODELS)
+
+    def _primary(self) -> str:
+        return getattr(settings, 'CDEK_PRIMARY_DATABASE', 'default')
+
+    def _recently_written(self) -> bool:
+        window = getattr(settings, 'CDEK_READ_YOUR_WRITES', 30)
+        if not window:
+            return False
+        # время неизвестно (кэш очищен или пуст) - синхронизации в окне не было
+        written_at = catalog_written_at()
+        return written_at is not None and time.time() - written_at < window
+
+    def db_for_read(self, model, **hints):
+        if not self._is_catalog(model):
+            return None
+        replicas = getattr(settings, 'CDEK_REPLICA_DATABASES', [])
+        if not replicas or is_pinned() or self._recently_written():
+            return self._primary()
+        return random.choice(replicas)
+
+    def db_for_write(self, model, **hints):
+        if self._is_catalog(model):
+            return self._primary()
+        return None
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # реплики содержат те же данные, что и основная база
+        databases = {self._primary(), *getattr(settings, 'CDEK_REPLICA_DATABASES', [])}
+        if obj1._state.db in databases and obj2._state.db in databases:
+            return True
+        return None
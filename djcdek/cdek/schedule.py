@@ -0,0 +1,73 @@
+from collections import defaultdict
+from datetime import datetime
+from typing import Set
+
+from django.utils import timezone
+
+from djcdek.cdek.catalog import CatalogIndex
+from djcdek.cdek.models import DeliveryPoint
+from djcdek.cdek.utils.worktime import DAY_MASK, SLOTS_PER_DAY, local_slot, schedule_mask
+
+
+class WorkTimeIndex(CatalogIndex):
+    """
+    Недельные расписания ПВЗ в памяти процесса.
+
+    Расписание хранится целым числом (бит на 15-минутный интервал), поэтому проверка
+    "открыт ли ПВЗ" - один сдвиг и AND. ПВЗ сгруппированы по населенным пунктам и
+    временным зонам, перевод времени выполняется один раз на зону, а не на точку.
+    """
+    def __init__(self):
+        super(WorkTimeIndex, self).__init__()
+        # (by_city, by_zone, zones) - публикуются вместе: читатели обращаются к ним без блокировки
+        self._state = (dict(), dict(), dict())
+
+    def build(self):
+        by_city = defaultdict(list)
+        by_zone = defaultdict(list)
+        zones = dict()
+        rows = DeliveryPoint.objects.exclude(work_schedule=None).values_list(
+            'id', 'city_id', 'city__timezone', 'work_schedule')
+        for pk, city_id, zone, schedule in rows.iterator():
+            entry = (pk, schedule_mask(schedule))
+            by_city[city_id].append(entry)
+            by_zone[zone].append(entry)
+            zones[city_id] = zone
+
+        self._state = (dict(by_city), dict(by_zone), zones)
+
+    def open_at(self, dt: datetime, city=None) -> Set[int]:
+        """
+        id ПВЗ, открытых в момент dt (время без зоны - местное время ПВЗ)
+
+        city -- населенный пункт или его id, по умолчанию все ПВЗ
+        """
+        self.ensure()
+        by_city, by_zone, zones = self._state
+        if city is not None:
+            city_id = getattr(city, 'id', city)
+            groups = [(zones.get(city_id), by_city.get(city_id, []))]
+        elif timezone.is_naive(dt):
+            groups = [(None, [entry for entries in by_zone.values() for entry in entries])]
+        else:
+            groups = by_zone.items()
+
+        result = set()
+        for zone, entries in groups:
+            bit = 1 << local_slot(dt, zone)
+            result.update(pk for pk, mask in entries if mask & bit)
+        return result
+
+    def open_on(self, weekday: int, city=None) -> Set[int]:
+        """ id ПВЗ, работающих в день недели weekday (0 - понедельник) """
+        self.ensure()
+        by_city, by_zone, _ = self._state
+        day = DAY_MASK << (weekday * SLOTS_PER_DAY)
+        if city is not None:
+            entries = by_city.get(getattr(city, 'id', city), [])
+        else:
+            entries = (entry for entries in by_zone.values() for entry in entries)
+        return {pk for pk, mask in entries if mask & day}
+
+
+worktime_index = WorkTimeIndex()
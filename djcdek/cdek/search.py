@@ -0,0 +1,90 @@
+import logging
+
+from django.db import router, transaction
+from django.db.models import Count
+
+from djcdek.cdek.models import DeliveryPoint, DeliveryPointSearch, DeliveryPointSearchToken
+from djcdek.cdek.models.deliverypointsearchtoken import TOKEN_LENGTH
+from djcdek.cdek.utils.text import normalize
+from djcdek.types import DeliveryPointType
+
+
+SEARCH_FIELDS = ('title', 'address', 'address_full', 'nearest_station', 'postal_code', 'city__title')
+""" Поля, слова которых попадают в текст для поиска """
+
+TYPE_NAMES = {member.value: name for member, name in DeliveryPointType.to_dict().items()}
+
+
+def search_tokens(values) -> list:
+    """ Уникальные нормализованные слова значений (не длиннее TOKEN_LENGTH) в порядке появления """
+    return list(dict.fromkeys(token[:TOKEN_LENGTH] for value in values for token in normalize(value).split()))
+
+
+def rebuild_deliverypoint_search(using: str = None, batch_size: int = 2000) -> int:
+    """
+    Перестраивает таблицы DeliveryPointSearch и DeliveryPointSearchToken по активным ПВЗ одной транзакцией:
+    читатели видят старые таблицы до конца перестроения.
+
+    using -- алиас базы данных (по умолчанию - база для записи DeliveryPointSearch по роутерам)
+    return количество ПВЗ в таблице
+    """
+    using = using or router.db_for_write(DeliveryPointSearch)
+    counts = dict(DeliveryPoint.objects.using(using).filter(city__isnull=False).order_by()
+                  .values_list('city_id').annotate(total=Count('id')))
+    rows = (DeliveryPoint.objects.using(using).order_by('id').values(
+        'id', 'code', 'title', 'type', 'address', 'address_full', 'nearest_station', 'postal_code', 'work_time',
+        'longitude', 'latitude', 'have_cash', 'have_cashless', 'allowed_cod', 'is_dressing_room', 'take_only',
+        'city_id', 'city__code', 'city__title', 'city__region__title', 'city__region__country__code',
+        'city__region__country__title'))
+
+    count = 0
+    manager = DeliveryPointSearch.objects.using(using)
+    token_manager = DeliveryPointSearchToken.objects.using(using)
+    with transaction.atomic(using=using):
+        token_manager.all().delete()
+        manager.all().delete()
+        batch = []
+        tokens = []
+        for row in rows.iterator(chunk_size=batch_size):
+            words = search_tokens(row[field] for field in SEARCH_FIELDS)
+            tokens.extend(DeliveryPointSearchToken(search_id=row['id'], token=word) for word in words)
+            batch.append(DeliveryPointSearch(
+                deliverypoint_id=row['id'],
+                code=row['code'],
+                title=row['title'],
+                type=row['type'],
+                type_name=TYPE_NAMES.get(row['type'], ''),
+                address=row['address'] or '',
+                address_full=row['address_full'] or '',
+                nearest_station=row['nearest_station'] or '',
+                postal_code=row['postal_code'] or '',
+                work_time=row['work_time'] or '',
+                longitude=row['longitude'],
+                latitude=row['latitude'],
+                have_cash=row['have_cash'],
+                have_cashless=row['have_cashless'],
+                allowed_cod=row['allowed_cod'],
+                is_dressing_room=row['is_dressing_room'],
+                take_only=row['take_only'],
+                city_id=row['city_id'],
+                city_code=row['city__code'] or '',
+                city_title=row['city__title'] or '',
+                city_points=counts.get(row['city_id'], 0),
+                region_title=row['city__region__title'] or '',
+                country_code=row['city__region__country__code'] or '',
+                country_title=row['city__region__country__title'] or '',
+                search_text=' '.join(words),
+            ))
+            if len(batch) >= batch_size:
+                manager.bulk_create(batch)
+                token_manager.bulk_create(tokens, batch_size=batch_size)
+                count += len(batch)
+                batch = []
+                tokens = []
+        if batch:
+            manager.bulk_create(batch)
+            token_manager.bulk_create(tokens, batch_size=batch_size)
+            count += len(batch)
+
+    logging.getLogger('cdek').info('Rebuild %s delivery point search records' % count)
+    return count
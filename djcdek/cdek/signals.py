@@ -0,0 +1,11 @@
+from django.dispatch import Signal
+
+
+catalog_updated = Signal()
+""" Справочники обновлены синхронизацией с CDEK (аргумент version - новая версия каталога) """
+
+order_status_changed = Signal()
+""" У заказа появились новые статусы (аргументы order - заказ, statuses - новые записи OrderStatusHistory) """
+
+print_form_ready = Signal()
+""" Печатная форма готова (аргументы uuid - идентификатор печатной формы, type - тип формы, url - ссылка на файл) """
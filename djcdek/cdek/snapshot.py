@@ -0,0 +1,303 @@
+import json
+import math
+import mmap
+import os
+import struct
+import sys
+import tempfile
+import threading
+from array import array
+from collections import namedtuple
+from typing import List, Optional
+
+from django.conf import settings
+
+from djcdek.cdek.catalog import catalog_version
+from djcdek.cdek.models import Country, Region, City, DeliveryPoint
+from djcdek.exceptions import CDEKException
+
+
+MAGIC = b'CDEKSNAP'
+FORMAT_VERSION = 1
+NONE = 0xFFFFFFFF
+""" Ссылка на отсутствующую строку или запись """
+
+SnapshotCity = namedtuple('SnapshotCity', [
+    'id', 'code', 'title', 'region', 'country_code', 'postal_codes', 'latitude', 'longitude', 'timezone',
+])
+
+SnapshotDeliveryPoint = namedtuple('SnapshotDeliveryPoint', [
+    'id', 'code', 'title', 'city_code', 'postal_code', 'latitude', 'longitude', 'address', 'address_full',
+    'work_time', 'phones', 'type', 'take_only', 'is_dressing_room', 'have_cashless', 'have_cash', 'allowed_cod',
+    'weight_min', 'weight_max',
+])
+
+DELIVERYPOINT_FLAGS = ('take_only', 'is_dressing_room', 'have_cashless', 'have_cash', 'allowed_cod')
+
+
+class StringTable:
+    """ Таблица строк: каждая уникальная строка хранится один раз, в колонках - ее номер """
+    def __init__(self):
+        self.index = dict()
+        self.offsets = array('I', [0])
+        self.blob = bytearray()
+
+    def add(self, value: Optional[str]) -> int:
+        if value is None:
+            return NONE
+        number = self.index.get(value)
+        if number is None:
+            number = len(self.offsets) - 1
+            self.index[value] = number
+            self.blob += value.encode()
+            self.offsets.append(len(self.blob))
+        return number
+
+
+def _float(value) -> float:
+    return math.nan if value is None else value
+
+
+def write_snapshot(path: str) -> str:
+    """
+    Сохраняет справочники стран, регионов, населенных пунктов и ПВЗ в бинарный файл path.
+
+    Файл записывается во временный и атомарно подменяет старый, поэтому процессы,
+    уже отобразившие прежний файл в память, продолжают читать его без ошибок.
+    """
+    strings = StringTable()
+    sections = dict()
+
+    countries = list(Country.objects.order_by('id').values_list('id', 'code'))
+    country_codes = {pk: code for pk, code in countries}
+    regions = {pk: (title, country_codes.get(country_id))
+               for pk, title, country_id in Region.objects.values_list('id', 'title', 'country_id')}
+
+    cities = list(City.objects.order_by('id').values_list(
+        'id', 'code', 'title', 'region_id', 'postal_codes', 'latitude', 'longitude', 'timezone'))
+    city_rows = {city[0]: row for row, city in enumerate(cities)}
+    region = [regions.get(city[3], (None, None)) for city in cities]
+
+    sections['city.id'] = array('q', (city[0] for city in cities))
+    sections['city.code'] = array('I', (strings.add(city[1]) for city in cities))
+    sections['city.title'] = array('I', (strings.add(city[2]) for city in cities))
+    sections['city.region'] = array('I', (strings.add(title) for title, _ in region))
+    sections['city.country_code'] = array('I', (strings.add(code) for _, code in region))
+    sections['city.postal_codes'] = array('I', (strings.add(city[4] or None) for city in cities))
+    sections['city.latitude'] = array('d', (_float(city[5]) for city in cities))
+    sections['city.longitude'] = array('d', (_float(city[6]) for city in cities))
+    sections['city.timezone'] = array('I', (strings.add(city[7]) for city in cities))
+
+    # ПВЗ упорядочены по городу, чтобы ПВЗ одного города занимали непрерывный диапазон строк
+    points = sorted(DeliveryPoint.objects.values_list(
+        'id', 'code', 'title', 'city_id', 'postal_code', 'latitude', 'longitude', 'address', 'address_full',
+        'work_time', 'phones', 'type', *DELIVERYPOINT_FLAGS, 'weight_min', 'weight_max',
+    ), key=lambda point: (city_rows.get(point[3], len(cities)), point[0]))
+
+    sections['point.id'] = array('q', (point[0] for point in points))
+    sections['point.code'] = array('I', (strings.add(point[1]) for point in points))
+    sections['point.title'] = array('I', (strings.add(point[2]) for point in points))
+    sections['point.city'] = array('I', (city_rows.get(point[3], NONE) for point in points))
+    sections['point.postal_code'] = array('I', (strings.add(point[4]) for point in points))
+    sections['point.latitude'] = array('d', (_float(point[5]) for point in points))
+    sections['point.longitude'] = array('d', (_float(point[6]) for point in points))
+    for column, name in enumerate(('address', 'address_full', 'work_time', 'phones', 'type'), start=7):
+        sections['point.' + name] = array('I', (strings.add(point[column]) for point in points))
+    sections['point.flags'] = array('B', (
+        sum(1 << bit for bit, value in enumerate(point[12:17]) if value) for point in points))
+    sections['point.weight_min'] = array('d', (_float(point[17]) for point in points))
+    sections['point.weight_max'] = array('d', (_float(point[18]) for point in points))
+
+    city_starts = array('I', [0] * (len(cities) + 1))
+    for point in points:
+        row = city_rows.get(point[3])
+        if row is not None:
+            city_starts[row + 1] += 1
+    for row in range(len(cities)):
+        city_starts[row + 1] += city_starts[row]
+    sections['city.points_start'] = city_starts
+
+    sections['index.city_code'] = array('I', sorted(range(len(cities)), key=lambda row: cities[row][1]))
+    sections['index.point_code'] = array('I', sorted(range(len(points)), key=lambda row: points[row][1]))
+    postal = sorted((code, row) for row, city in enumerate(cities) for code in set((city[4] or '').split(';')) if code)
+    sections['index.postal_code'] = array('I', (strings.add(code) for code, _ in postal))
+    sections['index.postal_city'] = array('I', (row for _, row in postal))
+
+    sections['strings.offsets'] = strings.offsets
+    sections['strings.blob'] = array('B', bytes(strings.blob))
+
+    directory = dict()
+    offset = 0
+    for name, values in sections.items():
+        directory[name] = [offset, values.typecode, len(values)]
+        offset += len(values) * values.itemsize
+        offset += -offset % 8
+    header = json.dumps({
+        'format': FORMAT_VERSION,
+        'catalog_version': catalog_version(),
+        'byteorder': sys.byteorder,
+        'sections': directory,
+    }).encode()
+    base = len(MAGIC) + 4 + len(header)
+    base += -base % 8
+
+    descriptor, temp_path = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(path)), prefix='.cdek-snapshot-')
+    try:
+        with os.fdopen(descriptor, 'wb') as stream:
+            stream.write(MAGIC)
+            stream.write(struct.pack('<I', len(header)))
+            stream.write(header)
+            stream.write(b'\0' * (base - len(MAGIC) - 4 - len(header)))
+            for name, values in sections.items():
+                position = stream.tell() - base
+                stream.write(b'\0' * (directory[name][0] - position))
+                stream.write(values.tobytes())
+        os.chmod(temp_path, 0o644)
+        os.replace(temp_path, path)
+    except BaseException:
+        os.unlink(temp_path)
+        raise
+    return path
+
+
+class CatalogSnapshot:
+    """
+    Справочник, отображенный в память из файла write_snapshot.
+
+    Колонки читаются напрямую из страниц файла, поэтому все процессы,
+    открывшие один и тот же файл, разделяют одну копию данных в кэше ОС.
+    """
+    def __init__(self, path: str):
+        self.path = path
+        with open(path, 'rb') as stream:
+            self.inode = os.fstat(stream.fileno()).st_ino
+            self._mmap = mmap.mmap(stream.fileno(), 0, access=mmap.ACCESS_READ)
+
+        if self._mmap[:len(MAGIC)] != MAGIC:
+            raise CDEKException(code='snapshot', message='%s is not a catalog snapshot' % path)
+        header_length, = struct.unpack_from('<I', self._mmap, len(MAGIC))
+        header = json.loads(self._mmap[len(MAGIC) + 4:len(MAGIC) + 4 + header_length].decode())
+        if header['format'] != FORMAT_VERSION or header['byteorder'] != sys.byteorder:
+            raise CDEKException(code='snapshot', message='Unsupported snapshot format')
+
+        self.catalog_version = header['catalog_version']
+        base = len(MAGIC) + 4 + header_length
+        base += -base % 8
+        view = memoryview(self._mmap)
+        self.sections = dict()
+        for name, (offset, typecode, length) in header['sections'].items():
+            size = array(typecode).itemsize
+            self.sections[name] = view[base + offset:base + offset + length * size].cast(typecode)
+
+        self._offsets = self.sections['strings.offsets']
+        self._blob = self.sections['strings.blob']
+
+    def close(self):
+        self.sections.clear()
+        self._offsets = self._blob = None
+        self._mmap.close()
+
+    def string(self, number: int) -> Optional[str]:
+        if number == NONE:
+            return None
+        return bytes(self._blob[self._offsets[number]:self._offsets[number + 1]]).decode()
+
+    def _search(self, index: str, column: str, value: str) -> int:
+        """ Двоичный поиск первой строки со значением value по отсортированному индексу """
+        rows = self.sections[index]
+        strings = self.sections[column]
+        low, high = 0, len(rows)
+        while low < high:
+            middle = (low + high) // 2
+            if self.string(strings[rows[middle]]) < value:
+                low = middle + 1
+            else:
+                high = middle
+        return low
+
+    def _city(self, row: int) -> SnapshotCity:
+        s = self.sections
+        postal_codes = self.string(s['city.postal_codes'][row])
+        return SnapshotCity(
+            s['city.id'][row], self.string(s['city.code'][row]), self.string(s['city.title'][row]),
+            self.string(s['city.region'][row]), self.string(s['city.country_code'][row]),
+            postal_codes.split(';') if postal_codes else [],
+            _none(s['city.latitude'][row]), _none(s['city.longitude'][row]), self.string(s['city.timezone'][row]),
+        )
+
+    def _point(self, row: int) -> SnapshotDeliveryPoint:
+        s = self.sections
+        city = s['point.city'][row]
+        flags = s['point.flags'][row]
+        return SnapshotDeliveryPoint(
+            s['point.id'][row], self.string(s['point.code'][row]), self.string(s['point.title'][row]),
+            self.string(s['city.code'][city]) if city != NONE else None,
+            self.string(s['point.postal_code'][row]),
+            _none(s['point.latitude'][row]), _none(s['point.longitude'][row]),
+            *(self.string(s['point.' + name][row]) for name in ('address', 'address_full', 'work_time', 'phones', 'type')),
+            *(bool(flags & (1 << bit)) for bit in range(len(DELIVERYPOINT_FLAGS))),
+            _none(s['point.weight_min'][row]), _none(s['point.weight_max'][row]),
+        )
+
+    def city_by_code(self, code: str) -> Optional[SnapshotCity]:
+        rows = self.sections['index.city_code']
+        position = self._search('index.city_code', 'city.code', code)
+        if position < len(rows) and self.string(self.sections['city.code'][rows[position]]) == code:
+            return self._city(rows[position])
+        return None
+
+    def deliverypoint_by_code(self, code: str) -> Optional[SnapshotDeliveryPoint]:
+        rows = self.sections['index.point_code']
+        position = self._search('index.point_code', 'point.code', code)
+        if position < len(rows) and self.string(self.sections['point.code'][rows[position]]) == code:
+            return self._point(rows[position])
+        return None
+
+    def cities_by_postal_code(self, code: str) -> List[SnapshotCity]:
+        codes = self.sections['index.postal_code']
+        cities = self.sections['index.postal_city']
+        low, high = 0, len(codes)
+        while low < high:
+            middle = (low + high) // 2
+            if self.string(codes[middle]) < code:
+                low = middle + 1
+            else:
+                high = middle
+        result = []
+        while low < len(codes) and self.string(codes[low]) == code:
+            result.append(self._city(cities[low]))
+            low += 1
+        return result
+
+    def city_deliverypoints(self, city_code: str) -> List[SnapshotDeliveryPoint]:
+        rows = self.sections['index.city_code']
+        position = self._search('index.city_code', 'city.code', city_code)
+        if position >= len(rows) or self.string(self.sections['city.code'][rows[position]]) != city_code:
+            return []
+        row = rows[position]
+        starts = self.sections['city.points_start']
+        return [self._point(point) for point in range(starts[row], starts[row + 1])]
+
+
+def _none(value: float) -> Optional[float]:
+    return None if math.isnan(value) else value
+
+
+_snapshot = {'instance': None}
+_snapshot_lock = threading.Lock()
+
+
+def get_snapshot(path: str = None) -> CatalogSnapshot:
+    """
+    Возвращает отображенный в память справочник из файла path (по умолчанию CDEK_SNAPSHOT_PATH).
+    Если файл был заменен новой выгрузкой, он открывается заново.
+    """
+    path = path or settings.CDEK_SNAPSHOT_PATH
+    snapshot = _snapshot['instance']
+    if snapshot is None or snapshot.path != path or os.stat(path).st_ino != snapshot.inode:
+        with _snapshot_lock:
+            snapshot = _snapshot['instance']
+            if snapshot is None or snapshot.path != path or os.stat(path).st_ino != snapshot.inode:
+                snapshot = CatalogSnapshot(path)
+                _snapshot['instance'] = snapshot
+    return snapshot
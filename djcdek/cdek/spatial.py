@@ -0,0 +1,229 @@
+import heapq
+import math
+import operator
+from collections import namedtuple, defaultdict
+from typing import List
+
+from djcdek.cdek.catalog import CatalogIndex
+from djcdek.cdek.models import DeliveryPoint
+
+
+EARTH_RADIUS = 6371.0
+""" Радиус Земли, км """
+
+KM_PER_DEGREE = math.pi * EARTH_RADIUS / 180
+
+NearPoint = namedtuple('NearPoint', ['id', 'code', 'latitude', 'longitude', 'distance'])
+""" ПВЗ и расстояние до него в километрах """
+
+MapPoint = namedtuple('MapPoint', ['id', 'code', 'latitude', 'longitude'])
+""" ПВЗ на карте """
+
+FILTER_FIELDS = (
+    'city_id', 'type', 'take_only', 'is_dressing_room', 'have_cashless', 'have_cash', 'allowed_cod',
+)
+""" Атрибуты ПВЗ, по которым можно фильтровать выдачу """
+
+
+def distance(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
+    """ Расстояние между точками по формуле гаверсинусов, км """
+    phi1 = math.radians(lat1)
+    phi2 = math.radians(lat2)
+    a = math.sin((phi2 - phi1) / 2) ** 2 + \
+        math.cos(phi1) * math.cos(phi2) * math.sin(math.radians(lon2 - lon1) / 2) ** 2
+    return 2 * EARTH_RADIUS * math.asin(min(1.0, math.sqrt(a)))
+
+
+class SpatialIndex(CatalogIndex):
+    """
+    Индекс ПВЗ по координатам в памяти процесса.
+
+    Точки раскладываются по ячейкам нескольких регулярных сеток (от мелкой к крупной).
+    Поиск ближайших обходит кольца ячеек вокруг точки запроса в мелкой сетке
+    и переходит на более крупную, если рядом нет подходящих ПВЗ.
+
+    Точки и сетки публикуются одним присваиванием (_state): запрос читает их без блокировки
+    и не должен видеть точки нового построения с сетками старого.
+    """
+    cell_sizes = (0.01, 0.04, 0.16, 0.64, 2.56)
+    """ Размеры ячеек сеток в градусах """
+
+    max_rings = 12
+    """ Сколько колец обходить в сетке, прежде чем перейти к более крупной """
+
+    def __init__(self):
+        super(SpatialIndex, self).__init__()
+        self._state = ([], [])
+
+    def build(self):
+        points = list(DeliveryPoint.objects
+                      .filter(latitude__isnull=False, longitude__isnull=False)
+                      .values_list('id', 'code', 'latitude', 'longitude', *FILTER_FIELDS)
+                      .order_by('id'))
+        grids = []
+        for size in self.cell_sizes:
+            grid = defaultdict(list)
+            for position, point in enumerate(points):
+                grid[self._cell(point[2], point[3], size)].append(position)
+            grids.append(dict(grid))
+        self._state = (points, grids)
+
+    def nearest_points(self, lat: float, lon: float, k: int = 10, **filters) -> List[NearPoint]:
+        """
+        Возвращает k ближайших к точке ПВЗ, отсортированных по расстоянию
+
+        filters -- значения атрибутов ПВЗ (city_id, type, have_cash и т.д.)
+        """
+        self.ensure()
+        points, grids = self._state
+        match = self._matcher(filters)
+        found = []
+
+        for level, size in enumerate(self.cell_sizes):
+            last = level == len(self.cell_sizes) - 1
+            if not last and self._nearby_count(grids[level], size, lat, lon) < k:
+                # вокруг мало точек: обход колец мелкой сетки почти ничего не найдет
+                continue
+            cx, cy = self._cell(lat, lon, size)
+            ring = 0
+            max_ring = int(360 / size) if last else self.max_rings
+            grid = grids[level]
+            # на новой сетке обход начинается заново, найденное на предыдущей будет найдено снова
+            found = []
+
+            while ring <= max_ring:
+                for cell in self._ring(cx, cy, ring):
+                    for position in grid.get(cell, ()):
+                        point = points[position]
+                        if match(point):
+                            item = (-distance(lat, lon, point[2], point[3]), position)
+                            if len(found) < k:
+                                heapq.heappush(found, item)
+                            elif item > found[0]:
+                                heapq.heapreplace(found, item)
+
+                # все непросмотренные точки дальше, чем ring ячеек от точки запроса
+                if len(found) >= k and -found[0][0] <= self._ring_distance(lat, lon, cx, cy, ring, size):
+                    return self._result(points, found)
+                ring += 1
+
+        return self._result(points, found)
+
+    def points_within(self, lat: float, lon: float, radius_km: float, **filters) -> List[NearPoint]:
+        """
+        Возвращает ПВЗ в радиусе radius_km от точки, отсортированные по расстоянию
+
+        filters -- значения атрибутов ПВЗ (city_id, type, have_cash и т.д.)
+        """
+        self.ensure()
+        points, grids = self._state
+        match = self._matcher(filters)
+        dlat = radius_km / KM_PER_DEGREE
+        dlon = radius_km / (KM_PER_DEGREE * max(math.cos(math.radians(min(abs(lat) + dlat, 89.9))), 0.01))
+
+        found = []
+        for position in self._bbox_positions(grids, lat - dlat, lon - dlon, lat + dlat, lon + dlon):
+            point = points[position]
+            if match(point):
+                d = distance(lat, lon, point[2], point[3])
+                if d <= radius_km:
+                    found.append((-d, position))
+        return self._result(points, found)
+
+    def _nearby_count(self, grid: dict, size: float, lat: float, lon: float) -> int:
+        """ Количество точек в квадрате 3x3 ячейки вокруг точки запроса """
+        cx, cy = self._cell(lat, lon, size)
+        return sum(len(grid.get((x, y), ())) for x in (cx - 1, cx, cx + 1) for y in (cy - 1, cy, cy + 1))
+
+    def points_in_bbox(self, south: float, west: float, north: float, east: float, **filters) -> List[MapPoint]:
+        """
+        Возвращает ПВЗ внутри прямоугольника координат
+
+        filters -- значения атрибутов ПВЗ (city_id, type, have_cash и т.д.)
+        """
+        self.ensure()
+        points, grids = self._state
+        match = self._matcher(filters)
+        result = []
+        for position in self._bbox_positions(grids, south, west, north, east):
+            point = points[position]
+            if south <= point[2] <= north and west <= point[3] <= east and match(point):
+                result.append(MapPoint(point[0], point[1], point[2], point[3]))
+        return result
+
+    def _bbox_positions(self, grids: list, lat_min: float, lon_min: float, lat_max: float, lon_max: float):
+        # самая мелкая сетка, в которой прямоугольник покрывается не более чем 400 ячейками
+        level = len(self.cell_sizes) - 1
+        for i, size in enumerate(self.cell_sizes):
+            if ((lat_max - lat_min) / size + 2) * ((lon_max - lon_min) / size + 2) <= 400:
+                level = i
+                break
+
+        size = self.cell_sizes[level]
+        x_min, y_min = self._cell(lat_min, lon_min, size)
+        x_max, y_max = self._cell(lat_max, lon_max, size)
+        grid = grids[level]
+        for x in range(x_min, x_max + 1):
+            for y in range(y_min, y_max + 1):
+                yield from grid.get((x, y), ())
+
+    def _result(self, points: list, found: list) -> List[NearPoint]:
+        result = []
+        for negative_distance, position in sorted(found, reverse=True):
+            point = points[position]
+            result.append(NearPoint(point[0], point[1], point[2], point[3], -negative_distance))
+        return result
+
+    def _matcher(self, filters: dict):
+        if 'city' in filters:
+            city = filters.pop('city')
+            filters['city_id'] = getattr(city, 'id', city)
+        checks = []
+        for name, value in filters.items():
+            if name not in FILTER_FIELDS:
+                raise TypeError('Unknown delivery point filter %s' % name)
+            if name == 'type' and hasattr(value, 'value'):
+                value = value.value
+            checks.append((4 + FILTER_FIELDS.index(name), value))
+        if not checks:
+            return lambda point: True
+        getter = operator.itemgetter(*[i for i, _ in checks])
+        values = tuple(value for _, value in checks) if len(checks) > 1 else checks[0][1]
+        return lambda point: getter(point) == values
+
+    @staticmethod
+    def _cell(lat: float, lon: float, size: float):
+        return int(math.floor(lat / size)), int(math.floor(lon / size))
+
+    @staticmethod
+    def _ring(cx: int, cy: int, ring: int):
+        if ring == 0:
+            yield cx, cy
+            return
+        for x in range(cx - ring, cx + ring + 1):
+            yield x, cy - ring
+            yield x, cy + ring
+        for y in range(cy - ring + 1, cy + ring):
+            yield cx - ring, y
+            yield cx + ring, y
+
+    @staticmethod
+    def _ring_distance(lat: float, lon: float, cx: int, cy: int, ring: int, size: float) -> float:
+        """ Нижняя граница расстояния от точки запроса до точек за пределами ring колец ячеек, км """
+        dlat = min(lat - (cx - ring) * size, (cx + ring + 1) * size - lat)
+        dlon = min(lon - (cy - ring) * size, (cy + ring + 1) * size - lon)
+        edge = min(abs(lat) + dlat, 90)
+        return min(dlat, dlon * math.cos(math.radians(edge))) * KM_PER_DEGREE
+
+
+spatial_index = SpatialIndex()
+
+
+def nearest_points(lat: float, lon: float, k: int = 10, **filters) -> List[NearPoint]:
+    """ k ближайших к точке ПВЗ (см. SpatialIndex.nearest_points) """
+    return spatial_index.nearest_points(lat, lon, k, **filters)
+
+
+def points_within(lat: float, lon: float, radius_km: float, **filters) -> List[NearPoint]:
+    """ ПВЗ в радиусе radius_km от точки (см. SpatialIndex.points_within) """
+    return spatial_index.points_within(lat, lon, radius_km, **filters)
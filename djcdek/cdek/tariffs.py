@@ -0,0 +1,151 @@
+import logging
+from collections import namedtuple
+from datetime import timedelta
+from typing import List, Optional
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from djcdek.cdek.client import get_client
+from djcdek.cdek.models import City, TariffMatrix, TariffRoute
+from djcdek.cdek.utils.concurrency import bounded_map
+from djcdek.cdek.utils.weight import deliverypoints_weight
+from djcdek.types import CDEKLocation, CDEKPackage
+
+
+TariffQuote = namedtuple('TariffQuote', ['tariff_code', 'delivery_sum', 'period_min', 'period_max', 'calculated_at', 'live'])
+""" Стоимость доставки; live - получена запросом к API, а не из матрицы """
+
+MatrixTask = namedtuple('MatrixTask', ['from_city_id', 'from_code', 'to_city_id', 'to_code', 'band'])
+
+
+def max_age() -> timedelta:
+    """ Срок, в течение которого рассчитанный тариф считается актуальным (CDEK_TARIFF_MATRIX_MAX_AGE, секунды) """
+    return timedelta(seconds=getattr(settings, 'CDEK_TARIFF_MATRIX_MAX_AGE', 7 * 24 * 60 * 60))
+
+
+def package_band(weight: int, length: int = 0, width: int = 0, height: int = 0) -> tuple:
+    """ Весовая и габаритная категория: (вес, габариты по убыванию) """
+    return (weight, *sorted((length or 0, width or 0, height or 0), reverse=True))
+
+
+def matrix_tasks(config: dict = None) -> List[MatrixTask]:
+    """
+    Направления и категории упаковок из CDEK_TARIFF_MATRIX, для которых нет актуального расчета:
+
+    {
+        'origins': ['44', '137'],           # коды населенных пунктов отправки
+        'destinations': [...],              # коды населенных пунктов назначения или
+        'top_destinations': 3000,           # N населенных пунктов с наибольшим количеством ПВЗ
+        'packages': [{'weight': 1000, 'length': 20, 'width': 20, 'height': 10}],
+        'tariff_codes': [136, 137],         # пусто - все тарифы из ответа API
+    }
+    """
+    config = config or getattr(settings, 'CDEK_TARIFF_MATRIX', {})
+    origins = list(City.objects.filter(code__in=config.get('origins', [])).values_list('id', 'code'))
+    if config.get('destinations'):
+        destinations = list(City.objects.filter(code__in=config['destinations']).values_list('id', 'code'))
+    else:
+        destinations = list(deliverypoints_weight(City.objects.all())
+                            .order_by('-weight', 'id').values_list('id', 'code')[:config.get('top_destinations', 1000)])
+    bands = sorted(set(package_band(**package) for package in config.get('packages', [])))
+
+    # уже рассчитанные направления (в том числе без тарифов) пропускаются -
+    # прерванный расчет продолжается с места остановки
+    done = set(TariffRoute.objects
+               .filter(calculated_at__gte=timezone.now() - max_age(), from_city_id__in=[pk for pk, _ in origins])
+               .values_list('from_city_id', 'to_city_id', 'weight', 'length', 'width', 'height'))
+
+    return [
+        MatrixTask(from_id, from_code, to_id, to_code, band)
+        for from_id, from_code in origins
+        for to_id, to_code in destinations
+        for band in bands
+        if (from_id, to_id, *band) not in done
+    ]
+
+
+def _calculate(client, task: MatrixTask) -> list:
+    weight, length, width, height = task.band
+    response = client.get_tarifflist(
+        CDEKLocation(code=int(task.from_code)), CDEKLocation(code=int(task.to_code)),
+        [CDEKPackage(weight=weight, length=length or None, width=width or None, height=height or None)])
+    return response.get('tariff_codes', [])
+
+
+def _save(task: MatrixTask, tariffs: list, tariff_codes: list):
+    weight, length, width, height = task.band
+    now = timezone.now()
+    rows = [
+        TariffMatrix(from_city_id=task.from_city_id, to_city_id=task.to_city_id, weight=weight, length=length,
+                     width=width, height=height, tariff_code=tariff['tariff_code'], delivery_sum=tariff['delivery_sum'],
+                     period_min=tariff.get('period_min'), period_max=tariff.get('period_max'), calculated_at=now)
+        for tariff in tariffs
+        if tariff.get('delivery_sum') is not None and (not tariff_codes or tariff['tariff_code'] in tariff_codes)
+    ]
+    route = dict(from_city_id=task.from_city_id, to_city_id=task.to_city_id, weight=weight,
+                 length=length, width=width, height=height)
+    with transaction.atomic():
+        TariffMatrix.objects.filter(**route).delete()
+        TariffMatrix.objects.bulk_create(rows)
+        TariffRoute.objects.update_or_create(**route, defaults={'tariffs': len(rows), 'calculated_at': now})
+
+
+def update_tariff_matrix(workers: int = 4, config: dict = None, account: str = None) -> int:
+    """
+    Рассчитывает матрицу тарифов по CDEK_TARIFF_MATRIX, выполняя не более workers запросов к API одновременно.
+    Результат каждого направления сохраняется сразу, поэтому после прерывания расчет можно запустить повторно.
+
+    account -- учетная запись CDEK из CDEK_ACCOUNTS
+    return количество рассчитанных направлений
+    """
+    logger = logging.getLogger('cdek')
+    config = config or getattr(settings, 'CDEK_TARIFF_MATRIX', {})
+    tariff_codes = config.get('tariff_codes', [])
+    tasks = matrix_tasks(config)
+    logger.info('Calculate %s tariff matrix routes' % len(tasks))
+
+    client = get_client(account)
+    calculated = 0
+    for task, tariffs, error in bounded_map(lambda task: _calculate(client, task), tasks, workers):
+        if error is not None:
+            logger.warning('Tariff %s -> %s failed: %s' % (task.from_code, task.to_code, error))
+            continue
+        _save(task, tariffs, tariff_codes)
+        calculated += 1
+
+    return calculated
+
+
+def tariff_quote(from_city, to_city, tariff_code: int, weight: int, length: int = 0, width: int = 0, height: int = 0,
+                 live: bool = True, account: str = None) -> Optional[TariffQuote]:
+    """
+    Стоимость доставки из матрицы тарифов: берется наименьшая категория, в которую помещается упаковка.
+    Если актуального расчета нет, выполняется запрос к API (при live=False возвращается None).
+
+    from_city, to_city -- населенные пункты или их коды CDEK
+    weight -- вес в граммах, length, width, height -- габариты в сантиметрах
+    account -- учетная запись CDEK для запроса к API
+    """
+    from_code = getattr(from_city, 'code', from_city)
+    to_code = getattr(to_city, 'code', to_city)
+    weight, length, width, height = package_band(weight, length, width, height)
+
+    row = (TariffMatrix.objects
+           .filter(from_city__code=from_code, to_city__code=to_code, tariff_code=tariff_code,
+                   weight__gte=weight, length__gte=length, width__gte=width, height__gte=height,
+                   calculated_at__gte=timezone.now() - max_age())
+           .order_by('weight', 'length', 'width', 'height')
+           .values_list('delivery_sum', 'period_min', 'period_max', 'calculated_at')
+           .first())
+    if row:
+        return TariffQuote(tariff_code, *row, live=False)
+    if not live:
+        return None
+
+    response = get_client(account).get_tariff(
+        tariff_code, CDEKLocation(code=int(from_code)), CDEKLocation(code=int(to_code)),
+        [CDEKPackage(weight=weight, length=length or None, width=width or None, height=height or None)])
+    return TariffQuote(tariff_code, response.get('delivery_sum'), response.get('period_min'),
+                       response.get('period_max'), timezone.now(), live=True)
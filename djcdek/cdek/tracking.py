@@ -0,0 +1,150 @@
+import logging
+from datetime import timedelta
+from typing import Iterable, List, Tuple
+
+from django.conf import settings
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from djcdek.cdek.client import DEFAULT_ACCOUNT, get_client
+from djcdek.cdek.models import Order, OrderStatusHistory
+from djcdek.cdek.signals import order_status_changed
+from djcdek.cdek.utils.concurrency import bounded_map
+
+
+POLL_INTERVALS = {
+    'ACCEPTED': 10,
+    'CREATED': 60,
+    'RECEIVED_AT_SHIPMENT_WAREHOUSE': 240,
+    'READY_TO_SHIP_AT_SENDING_OFFICE': 240,
+    'ACCEPTED_AT_RECIPIENT_CITY_WAREHOUSE': 120,
+    'ACCEPTED_AT_PICK_UP_POINT': 720,
+    'POSTOMAT_POSTED': 720,
+    'TAKEN_BY_COURIER': 60,
+    'NOT_DELIVERED': 240,
+}
+""" Через сколько минут после смены статуса заказ вероятно сменит его снова """
+
+DEFAULT_POLL_INTERVAL = 360
+
+FINAL_STATUSES = ('DELIVERED', 'INVALID', 'REMOVED')
+""" Статусы, после которых заказ больше не опрашивается """
+
+ORDER_CHUNK = 900
+
+
+def poll_interval(order: Order) -> timedelta:
+    """
+    Интервал до следующего опроса: базовый для текущего статуса (CDEK_ORDER_POLL_INTERVALS, минуты),
+    удваивается после каждого опроса без изменений, но не больше CDEK_ORDER_POLL_MAX_INTERVAL
+    """
+    intervals = dict(POLL_INTERVALS, **getattr(settings, 'CDEK_ORDER_POLL_INTERVALS', {}))
+    base = intervals.get(order.status, DEFAULT_POLL_INTERVAL)
+    limit = getattr(settings, 'CDEK_ORDER_POLL_MAX_INTERVAL', 24 * 60)
+    return timedelta(minutes=min(base * 2 ** min(order.unchanged_polls, 10), limit))
+
+
+def track_order(uuid: str, number: str = None, account: str = None) -> Order:
+    """ Добавляет заказ учетной записи account в отслеживание статусов """
+    order, created = Order.objects.get_or_create(uuid=uuid, defaults={
+        'number': number, 'status': 'ACCEPTED', 'account': account or DEFAULT_ACCOUNT})
+    if created:
+        order.next_poll_at = timezone.now() + poll_interval(order)
+        order.save(update_fields=['next_poll_at'])
+    return order
+
+
+def _status_date(value):
+    date_time = parse_datetime(value or '')
+    if date_time is not None and not settings.USE_TZ:
+        date_time = timezone.make_naive(date_time)
+    return date_time
+
+
+def apply_statuses(updates: Iterable[Tuple[Order, List[dict]]], polled: bool = True) -> List[Order]:
+    """
+    Сохраняет статусы заказов пакетом: новые записи истории одним INSERT, заказы одним UPDATE,
+    затем отправляет сигнал order_status_changed по каждому изменившемуся заказу.
+
+    updates -- пары (заказ, статусы в формате API: {'code', 'name', 'date_time', 'city'})
+    polled -- статусы получены опросом (учитывается в расписании опроса)
+    return заказы, у которых появились новые статусы
+    """
+    updates = list(updates)
+    orders = {order.id: order for order, _ in updates}
+    ids = sorted(orders)
+    known = set()
+    for start in range(0, len(ids), ORDER_CHUNK):
+        known.update(OrderStatusHistory.objects.filter(order_id__in=ids[start:start + ORDER_CHUNK])
+                     .values_list('order_id', 'code', 'date_time'))
+
+    now = timezone.now()
+    history = []
+    changed = dict()
+    for order, statuses in updates:
+        fresh = []
+        for status in statuses:
+            date_time = _status_date(status.get('date_time'))
+            key = (order.id, status.get('code'), date_time)
+            if not status.get('code') or date_time is None or key in known:
+                continue
+            known.add(key)
+            fresh.append(OrderStatusHistory(order=order, code=status['code'], name=status.get('name') or '',
+                                            date_time=date_time, city=status.get('city')))
+
+        if fresh:
+            latest = max(fresh, key=lambda entry: entry.date_time)
+            if order.status_date is None or latest.date_time >= order.status_date:
+                order.status = latest.code
+                order.status_date = latest.date_time
+            order.unchanged_polls = 0
+            history.extend(fresh)
+            changed.setdefault(order.id, []).extend(fresh)
+        elif polled:
+            order.unchanged_polls += 1
+
+        if polled:
+            order.last_polled_at = now
+        order.is_final = order.status in getattr(settings, 'CDEK_ORDER_FINAL_STATUSES', FINAL_STATUSES)
+        order.next_poll_at = None if order.is_final else now + poll_interval(order)
+
+    OrderStatusHistory.objects.bulk_create(history, ignore_conflicts=True)
+    Order.objects.bulk_update(list(orders.values()), ['status', 'status_date', 'is_final', 'next_poll_at',
+                                                      'last_polled_at', 'unchanged_polls'], batch_size=500)
+
+    for order_id, statuses in changed.items():
+        order_status_changed.send(sender=Order, order=orders[order_id], statuses=statuses)
+    return [orders[order_id] for order_id in changed]
+
+
+def poll_orders(budget: int = None, workers: int = 4) -> int:
+    """
+    Опрашивает статусы заказов, время следующего опроса которых наступило, в порядке очереди (next_poll_at).
+    За один запуск выполняется не больше budget запросов (CDEK_ORDER_POLL_BUDGET).
+
+    return количество заказов с новыми статусами
+    """
+    logger = logging.getLogger('cdek')
+    budget = budget or getattr(settings, 'CDEK_ORDER_POLL_BUDGET', 1000)
+    orders = list(Order.objects.filter(is_final=False, next_poll_at__lte=timezone.now()).order_by('next_poll_at')[:budget])
+    logger.info('Poll %s orders' % len(orders))
+
+    updates = []
+    failed = []
+    # заказ опрашивается от имени учетной записи, в которой он зарегистрирован
+    for order, response, error in bounded_map(lambda order: get_client(order.account).order_info(order.uuid), orders, workers):
+        if error is not None:
+            logger.warning('Order %s info failed: %s' % (order.uuid, error))
+            failed.append(order)
+        else:
+            updates.append((order, (response.get('entity') or {}).get('statuses') or []))
+
+    changed = apply_statuses(updates)
+    # ошибка запроса не должна ставить заказ в начало очереди
+    now = timezone.now()
+    for order in failed:
+        order.unchanged_polls += 1
+        order.last_polled_at = now
+        order.next_poll_at = now + poll_interval(order)
+    Order.objects.bulk_update(failed, ['unchanged_polls', 'last_polled_at', 'next_poll_at'], batch_size=500)
+    return len(changed)
@@ -0,0 +1,13 @@
+from django.urls import path
+
+from djcdek.cdek import views
+
+
+app_name = 'cdek'
+
+urlpatterns = [
+    path('deliverypoints/map/', views.deliverypoints_map, name='deliverypoints_map'),
+    path('regions/<int:region_id>/cities/', views.region_cities, name='region_cities'),
+    path('cities/<int:city_id>/deliverypoints/', views.city_deliverypoints, name='city_deliverypoints'),
+    path('webhook/', views.webhook, name='webhook'),
+]
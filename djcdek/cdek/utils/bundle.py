@@ -0,0 +1,258 @@
+import csv
+import gzip
+import io
+import json
+import logging
+from itertools import islice
+from typing import Iterator, List
+
+from django.conf import settings
+from django.core.management.color import no_style
+from django.db import connections, transaction
+
+from djcdek.cdek.models import *
+from djcdek.cdek.catalog import bump_catalog_version
+from djcdek.cdek.client import get_client
+from djcdek.cdek.search import rebuild_deliverypoint_search
+from djcdek.cdek.utils.update import city_fields, deliverypoint_fields, iter_city_pages
+from djcdek.exceptions import CDEKException
+
+
+BUNDLE_FORMAT = 'djcdek-catalog'
+BUNDLE_VERSION = 1
+
+CATALOG_MODELS = (Country, Region, City, PostalCode, DeliveryPoint)
+""" Модели справочников в порядке зависимостей """
+
+DERIVED_MODELS = (DeliveryPointSearch, DeliveryPointSearchToken)
+""" Таблицы, которые пересобираются из справочников после загрузки """
+
+
+def open_bundle(path: str, mode: str = 'rt'):
+    """ Открывает файл выгрузки, сжатый gzip (по расширению .gz) или обычный """
+    if path.endswith('.gz'):
+        return gzip.open(path, mode, encoding='utf-8')
+    return open(path, mode, encoding='utf-8')
+
+
+def dump_catalog(path: str, using: str = 'default') -> dict:
+    """
+    Выгружает справочники в файл JSONL: строка заголовка, затем для каждой модели
+    строка с именами полей и по строке-массиву значений на запись
+
+    return количество выгруженных записей по моделям
+    """
+    counts = dict()
+    with open_bundle(path, 'wt') as stream:
+        stream.write(json.dumps({'format': BUNDLE_FORMAT, 'version': BUNDLE_VERSION}) + '\n')
+        for model in CATALOG_MODELS:
+            fields = [field.attname for field in model._meta.concrete_fields]
+            queryset = model._base_manager.using(using).order_by('pk')
+            stream.write(json.dumps({'model': model._meta.model_name, 'fields': fields,
+                                     'count': queryset.count()}, ensure_ascii=False) + '\n')
+            counts[model._meta.model_name] = 0
+            for row in queryset.values_list(*fields).iterator():
+                stream.write(json.dumps(row, ensure_ascii=False) + '\n')
+                counts[model._meta.model_name] += 1
+    return counts
+
+
+def capture_catalog(path: str):
+    """
+    Сохраняет ответы API CDEK (регионы, населенные пункты, ПВЗ) в файл сырой выгрузки,
+    который можно загрузить командой load_catalog --raw без обращения к API
+    """
+    client = get_client()
+    with open_bundle(path, 'wt') as stream:
+        page = 0
+        while True:
+            response = client.get_regions(size=1000, page=page)
+            if not response:
+                break
+            for item in response:
+                stream.write(json.dumps({'regions': item}, ensure_ascii=False) + '\n')
+            page += 1
+
+        for response in iter_city_pages(client):
+            for item in response:
+                stream.write(json.dumps({'cities': item}, ensure_ascii=False) + '\n')
+
+        for item in client.get_deliverypoints():
+            stream.write(json.dumps({'deliverypoints': item}, ensure_ascii=False) + '\n')
+
+
+def load_catalog(path: str, raw: bool = False, replace: bool = False, using: str = 'default',
+                 batch_size: int = 5000) -> dict:
+    """
+    Загружает справочники из файла dump_catalog (или сырой выгрузки API при raw=True)
+    одной транзакцией с отложенной проверкой ограничений.
+    На PostgreSQL данные передаются через COPY, на остальных СУБД - пакетными INSERT.
+
+    replace -- предварительно очистить справочники, иначе они должны быть пустыми.
+    Замена отклоняется, если на справочники ссылаются другие данные (например, матрица тарифов):
+    удаление каскадом стерло бы их незаметно, такие таблицы нужно очистить явно.
+    return количество загруженных записей по моделям
+    """
+    logger = logging.getLogger('cdek')
+    connection = connections[using]
+    counts = dict()
+
+    with transaction.atomic(using=using):
+        if replace:
+            _check_dependents(using)
+        for model in reversed(CATALOG_MODELS):
+            if replace:
+                model._base_manager.using(using).all().delete()
+            elif model._base_manager.using(using).exists():
+                raise CDEKException(code='notempty', message='Table %s is not empty, use replace' % model._meta.db_table)
+
+        with connection.constraint_checks_disabled():
+            if connection.vendor == 'postgresql':
+                with connection.cursor() as cursor:
+                    cursor.execute('SET CONSTRAINTS ALL DEFERRED')
+
+            sections = _read_raw(path) if raw else _read_bundle(path)
+            for model, fields, rows in sections:
+                count = 0
+                while True:
+                    batch = list(islice(rows, batch_size))
+                    if not batch:
+                        break
+                    _insert(connection, model, fields, batch)
+                    count += len(batch)
+                counts[model._meta.model_name] = count
+                logger.info('Load %s %s records' % (count, model._meta.model_name))
+
+        connection.check_constraints(table_names=[model._meta.db_table for model in CATALOG_MODELS])
+        with connection.cursor() as cursor:
+            for sql in connection.ops.sequence_reset_sql(no_style(), CATALOG_MODELS):
+                cursor.execute(sql)
+
+        if getattr(settings, 'CDEK_DELIVERYPOINT_SEARCH', True):
+            rebuild_deliverypoint_search(using=using)
+
+    bump_catalog_version()
+    return counts
+
+
+def _check_dependents(using: str):
+    """ Запрещает замену справочников, пока на них ссылаются записи других моделей """
+    for model in CATALOG_MODELS:
+        # include_hidden - у матрицы тарифов обратная связь скрыта (related_name='+')
+        relations = [field for field in model._meta.get_fields(include_hidden=True)
+                     if field.auto_created and not field.concrete and (field.one_to_many or field.one_to_one)]
+        for relation in relations:
+            related = relation.related_model
+            if related in CATALOG_MODELS or related in DERIVED_MODELS:
+                continue
+            if related._base_manager.using(using).exists():
+                raise CDEKException(code='dependent', message='Table %s references %s, clear it before replace' % (
+                    related._meta.db_table, model._meta.db_table))
+
+
+def _read_bundle(path: str) -> Iterator:
+    with open_bundle(path) as stream:
+        header = json.loads(stream.readline())
+        if header.get('format') != BUNDLE_FORMAT or header.get('version') != BUNDLE_VERSION:
+            raise CDEKException(code='bundle', message='%s is not a catalog bundle' % path)
+
+        models = {model._meta.model_name: model for model in CATALOG_MODELS}
+        for line in stream:
+            section = json.loads(line)
+            model = models[section['model']]
+            # поля, которых уже нет в модели, пропускаются; новые получают значения по умолчанию
+            attnames = {field.attname for field in model._meta.concrete_fields}
+            columns = [i for i, name in enumerate(section['fields']) if name in attnames]
+            fields = [section['fields'][i] for i in columns]
+            rows = ([row[i] for i in columns] for row in (json.loads(stream.readline()) for _ in range(section['count'])))
+            yield model, fields, rows
+            # дочитать записи, если вызывающий код остановился раньше
+            for _ in rows:
+                pass
+
+
+def _read_raw(path: str) -> Iterator:
+    """
+    Преобразует сырую выгрузку API (строки {"regions"|"cities"|"deliverypoints": элемент ответа})
+    в записи справочников с заранее назначенными идентификаторами
+    """
+    items = {'regions': [], 'cities': [], 'deliverypoints': []}
+    with open_bundle(path) as stream:
+        for line in stream:
+            for kind, item in json.loads(line).items():
+                items[kind].append(item)
+
+    countries = dict()
+    regions = dict()
+    for item in items['regions'] + items['cities']:
+        code = item.get('country_code')
+        if code and code not in countries:
+            countries[code] = (len(countries) + 1, item.get('country') or code)
+        key = (item.get('region'), code)
+        if item.get('region') and code and key not in regions:
+            regions[key] = [len(regions) + 1, item.get('region'), countries[code][0], None, None, None]
+        if key in regions:
+            # уже известные значения не перезаписываются: у городов региона они бывают пустыми
+            region = regions[key]
+            for index, name in enumerate(('region_code', 'kladr_region_code', 'fias_region_guid'), 3):
+                if region[index] is None:
+                    region[index] = item.get(name)
+
+    yield Country, ['id', 'code', 'title'], iter([[pk, code, title] for code, (pk, title) in countries.items()])
+    yield Region, ['id', 'title', 'country_id', 'code', 'kladr_region_code', 'fias_region_guid'], iter(regions.values())
+
+    cities = dict()
+    city_rows = []
+    for item in items['cities']:
+        if item.get('city') and item.get('code') not in cities:
+            row = city_fields(item)
+            row['id'] = cities[item['code']] = len(cities) + 1
+            region = regions.get((item.get('region'), item.get('country_code')))
+            row['region_id'] = region[0] if region else None
+            row['generation'] = 1
+            city_rows.append(row)
+    yield _rows(City, city_rows)
+
+    postal_codes = []
+    for row in city_rows:
+        for code in set((row['postal_codes'] or '').split(';')):
+            if code:
+                postal_codes.append({'id': len(postal_codes) + 1, 'code': code, 'city_id': row['id']})
+    yield _rows(PostalCode, postal_codes)
+
+    points = []
+    codes = set()
+    for item in items['deliverypoints']:
+        if item.get('name') and item.get('code') and item['code'] not in codes:
+            codes.add(item['code'])
+            row = deliverypoint_fields(item)
+            row['id'] = len(points) + 1
+            row['city_id'] = cities.get((item.get('location') or {}).get('city_code'))
+            row['generation'] = 1
+            points.append(row)
+    yield _rows(DeliveryPoint, points)
+
+
+def _rows(model, rows: List[dict]):
+    """ Записи-словари в виде (model, fields, rows) со значениями по умолчанию для пропущенных полей """
+    fields = [field for field in model._meta.concrete_fields]
+    defaults = {field.attname: field.get_default() for field in fields}
+    names = [field.attname for field in fields]
+    return model, names, iter([[row.get(name, defaults[name]) for name in names] for row in rows])
+
+
+def _insert(connection, model, fields: List[str], rows: List[list]):
+    with connection.cursor() as cursor:
+        if connection.vendor == 'postgresql' and hasattr(cursor.cursor, 'copy_expert'):
+            buffer = io.StringIO()
+            writer = csv.writer(buffer)
+            for row in rows:
+                writer.writerow(['\\N' if value is None else value for value in row])
+            buffer.seek(0)
+            qn = connection.ops.quote_name
+            cursor.cursor.copy_expert("COPY %s (%s) FROM STDIN WITH (FORMAT csv, NULL '\\N')" % (
+                qn(model._meta.db_table), ', '.join(qn(model._meta.get_field(name).column) for name in fields)), buffer)
+            return
+
+    model._base_manager.using(connection.alias).bulk_create(
+        [model(**dict(zip(fields, row))) for row in rows])
@@ -0,0 +1,25 @@
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from itertools import islice
+from typing import Callable, Iterable, Iterator, Tuple
+
+
+def bounded_map(func: Callable, items: Iterable, workers: int = 4) -> Iterator[Tuple[object, object, BaseException]]:
+    """
+    Выполняет func для каждого элемента в пуле из workers потоков и возвращает (элемент, результат, ошибка)
+    по мере завершения. В очереди держится не больше двух задач на поток, поэтому items может быть
+    длинным генератором. Результаты обрабатываются в вызывающем потоке (в нем же выполняется запись в базу).
+    """
+    items = iter(items)
+    pending = dict()
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        while True:
+            for item in islice(items, workers * 2 - len(pending)):
+                pending[executor.submit(func, item)] = item
+            if not pending:
+                break
+
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                item = pending.pop(future)
+                error = future.exception()
+                yield item, None if error else future.result(), error
@@ -0,0 +1,213 @@
+import json
+import logging
+import threading
+import tracemalloc
+from collections import defaultdict
+from contextlib import ExitStack, contextmanager, nullcontext
+from functools import wraps
+from time import perf_counter
+from typing import Iterable, Iterator, Optional
+
+from django.conf import settings
+from django.db import DatabaseError, connections
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from djcdek.client import request_timing
+
+
+STAGES = ('fetch', 'decode', 'transform', 'write')
+""" Этапы синхронизации: ожидание API, разбор JSON, преобразование в поля моделей, запись в базу """
+
+OTHER = 'other'
+
+_local = threading.local()
+
+
+class SyncProfiler:
+    """
+    Замер одного запуска синхронизации в текущем потоке.
+
+    Время считается исключительно: вложенный этап приостанавливает внешний, поэтому сумма этапов
+    равна длительности запуска. fetch и decode сообщает клиент API (djcdek.client.request_timing),
+    запросы к базе подсчитываются через execute_wrapper соединений всех алиасов (реплики, промежуточные
+    таблицы на другой базе) и относятся к текущему этапу.
+    Пакет - единица записи в базу (bulk_create или сохранение одной записи).
+    """
+    def __init__(self, name: str, trace_memory: bool = True):
+        self.name = name
+        self.trace_memory = trace_memory
+        self.seconds = defaultdict(float)
+        self.queries = defaultdict(int)
+        self.rows = 0
+        self.batches = 0
+        self.status = None
+        self.started = None
+        self.duration = None
+        self.peak_memory = None
+        self._stack = []
+        self._mark = None
+        self._begin = None
+        self._tracing = False
+        self._wrappers = None
+
+    @property
+    def _current(self) -> str:
+        return self._stack[-1] if self._stack else OTHER
+
+    def _switch(self):
+        now = perf_counter()
+        self.seconds[self._current] += now - self._mark
+        self._mark = now
+
+    @contextmanager
+    def stage(self, name: str):
+        self._switch()
+        self._stack.append(name)
+        try:
+            yield
+        finally:
+            self._switch()
+            self._stack.pop()
+
+    def iterate(self, items: Iterable, name: str = 'transform') -> Iterator:
+        """ Относит к этапу name время получения каждого элемента items (например, генератора строк) """
+        items = iter(items)
+        while True:
+            with self.stage(name):
+                try:
+                    item = next(items)
+                except StopIteration:
+                    return
+            yield item
+
+    def batch(self, rows: int):
+        self.batches += 1
+        self.rows += rows
+
+    def _request(self, stage: str, seconds: float):
+        # запрос выполнялся внутри текущего этапа - его время переносится в fetch/decode
+        self.seconds[stage] += seconds
+        self.seconds[self._current] -= seconds
+
+    def _execute(self, execute, sql, params, many, context):
+        self.queries[self._current] += 1
+        return execute(sql, params, many, context)
+
+    def __enter__(self):
+        self.started = timezone.now()
+        if self.trace_memory:
+            self._tracing = not tracemalloc.is_tracing()
+            if self._tracing:
+                tracemalloc.start()
+            elif hasattr(tracemalloc, 'reset_peak'):
+                tracemalloc.reset_peak()
+        self._wrappers = ExitStack()
+        for alias in connections:
+            self._wrappers.enter_context(connections[alias].execute_wrapper(self._execute))
+        self._wrappers.enter_context(request_timing(self._request))
+        self._mark = perf_counter()
+        self._begin = self._mark
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self._switch()
+        self.duration = self._mark - self._begin
+        self._wrappers.close()
+        if self.trace_memory and tracemalloc.is_tracing():
+            self.peak_memory = tracemalloc.get_traced_memory()[1]
+            if self._tracing:
+                tracemalloc.stop()
+        self.status = 'failed' if exc_type is not None else 'success'
+
+    def report(self) -> dict:
+        queries = sum(self.queries.values())
+        return {
+            'name': self.name,
+            'status': self.status,
+            'duration': round(self.duration or 0, 3),
+            'rows': self.rows,
+            'batches': self.batches,
+            'rows_per_second': round(self.rows / self.duration, 1) if self.duration else None,
+            'queries': queries,
+            'queries_per_batch': round(queries / self.batches, 2) if self.batches else None,
+            'peak_memory': self.peak_memory,
+            'stages': {
+                stage: {'seconds': round(self.seconds.get(stage, 0), 3), 'queries': self.queries.get(stage, 0)}
+                for stage in STAGES + (OTHER,)
+            },
+        }
+
+    def save(self):
+        """ Пишет отчет в лог и в модель SyncRun """
+        from djcdek.cdek.models import SyncRun
+
+        report = self.report()
+        logging.getLogger('cdek').info('Sync %s report: %s' % (self.name, json.dumps(report)))
+        try:
+            SyncRun.objects.create(name=self.name, status=self.status, started=self.started, duration=self.duration,
+                                   rows=self.rows, batches=self.batches, queries=report['queries'],
+                                   peak_memory=self.peak_memory, report=json.dumps(report))
+        except DatabaseError:
+            logging.getLogger('cdek').exception('Sync %s report was not saved' % self.name)
+
+
+def current() -> Optional[SyncProfiler]:
+    """ Профилировщик синхронизации, выполняемой в текущем потоке """
+    return getattr(_local, 'profiler', None)
+
+
+@contextmanager
+def profile_sync(name: str):
+    """
+    Замеряет синхронизацию name и сохраняет отчет (SyncRun).
+
+    CDEK_SYNC_TRACE_MEMORY -- считать пик памяти через tracemalloc (по умолчанию True, замедляет выделение памяти)
+    CDEK_SYNC_PROFILER -- путь к фабрике контекстного менеджера f(name) для семплирующего профилировщика,
+    которым оборачивается запуск, например обертка над pyinstrument.Profiler
+    """
+    if current() is not None:
+        # вложенная синхронизация входит в отчет внешней
+        yield current()
+        return
+
+    profiler = SyncProfiler(name, trace_memory=getattr(settings, 'CDEK_SYNC_TRACE_MEMORY', True))
+    hook = getattr(settings, 'CDEK_SYNC_PROFILER', None)
+    try:
+        with ExitStack() as stack:
+            if hook:
+                stack.enter_context(import_string(hook)(name))
+            _local.profiler = stack.enter_context(profiler)
+            yield profiler
+    finally:
+        _local.profiler = None
+        if profiler.duration is not None:
+            profiler.save()
+
+
+def profiled(name: str):
+    """ Декоратор: функция синхронизации выполняется внутри profile_sync(name) """
+    def decorator(func):
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            with profile_sync(name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def stage(name: str):
+    """ Этап текущей синхронизации; без активного профилировщика ничего не замеряет """
+    profiler = current()
+    return profiler.stage(name) if profiler is not None else nullcontext()
+
+
+def iterate(items: Iterable, name: str = 'transform') -> Iterable:
+    profiler = current()
+    return profiler.iterate(items, name) if profiler is not None else items
+
+
+def count_batch(rows: int):
+    profiler = current()
+    if profiler is not None:
+        profiler.batch(rows)
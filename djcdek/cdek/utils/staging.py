@@ -0,0 +1,177 @@
+from typing import Iterable, Dict
+
+from django.apps.registry import Apps
+from django.db import connections, models, router
+
+from djcdek.cdek.utils import profiling
+from djcdek.exceptions import CDEKException
+
+
+# промежуточные модели не регистрируются в основном реестре приложений,
+# чтобы их не видели миграции и повторное создание не вызывало предупреждений
+staging_apps = Apps()
+_staging_models = dict()
+
+
+def staging_model(model):
+    """
+    Возвращает модель промежуточной таблицы с теми же колонками, что и у model.
+    Внешние ключи становятся обычными целочисленными колонками, первичный ключ - собственный.
+    Ограничения уникальности и индексы не копируются: дубликаты ключа должны дойти до StagingTable.validate.
+    """
+    if model in _staging_models:
+        return _staging_models[model]
+
+    meta = type('Meta', (), {
+        'apps': staging_apps,
+        'app_label': model._meta.app_label,
+        'db_table': model._meta.db_table + '_staging',
+    })
+    attrs = {'__module__': __name__, 'Meta': meta}
+
+    for field in model._meta.concrete_fields:
+        if field.primary_key:
+            continue
+        if field.is_relation:
+            attrs[field.attname] = models.IntegerField(null=True, db_column=field.column)
+        else:
+            name, path, args, kwargs = field.deconstruct()
+            kwargs.update(unique=False, db_index=False)
+            attrs[field.name] = field.__class__(*args, **kwargs)
+
+    _staging_models[model] = type(model.__name__ + 'Staging', (models.Model,), attrs)
+    return _staging_models[model]
+
+
+class StagingTable:
+    """
+    Промежуточная таблица для загрузки свежего справочника без блокировок основной таблицы.
+
+    Данные загружаются пакетами в отдельную таблицу, а затем публикуются в основную
+    по ключу key одной транзакцией: на PostgreSQL двумя множественными запросами
+    UPDATE ... FROM и INSERT ... SELECT, на остальных СУБД - пакетным копированием через ORM.
+    Идентификаторы существующих записей сохраняются, поэтому внешние ключи на них не ломаются.
+
+    using -- алиас базы данных (по умолчанию - база для записи model по роутерам)
+    """
+    def __init__(self, model, key: str = 'code', using: str = None, batch_size: int = 1000):
+        self.model = model
+        self.staging = staging_model(model)
+        self.key = key
+        self.using = using or router.db_for_write(model)
+        self.batch_size = batch_size
+
+    @property
+    def connection(self):
+        return connections[self.using]
+
+    @property
+    def columns(self) -> Dict[str, str]:
+        """ Соответствие имен атрибутов промежуточной модели колонкам таблицы """
+        return {
+            field.attname: field.column
+            for field in self.staging._meta.concrete_fields if not field.primary_key
+        }
+
+    def exists(self) -> bool:
+        return self.staging._meta.db_table in self.connection.introspection.table_names()
+
+    def create(self):
+        """ Пересоздает пустую промежуточную таблицу """
+        self.drop()
+        with self.connection.schema_editor() as editor:
+            editor.create_model(self.staging)
+
+    def drop(self):
+        if self.exists():
+            with self.connection.schema_editor() as editor:
+                editor.delete_model(self.staging)
+
+    def load(self, rows: Iterable[dict]) -> int:
+        """
+        Загружает записи в промежуточную таблицу
+
+        rows -- значения полей основной модели (для внешних ключей - по имени колонки, например city_id)
+        return количество загруженных записей
+        """
+        count = 0
+        batch = []
+
+        for row in rows:
+            batch.append(self.staging(**row))
+            if len(batch) >= self.batch_size:
+                self._write(batch)
+                count += len(batch)
+                batch = []
+
+        if batch:
+            self._write(batch)
+            count += len(batch)
+        return count
+
+    def _write(self, batch: list):
+        with profiling.stage('write'):
+            self.staging.objects.using(self.using).bulk_create(batch)
+        profiling.count_batch(len(batch))
+
+    def count(self) -> int:
+        return self.staging.objects.using(self.using).count()
+
+    def validate(self, min_count: float = 1):
+        """ Проверяет, что в промежуточной таблице достаточно записей для публикации """
+        count = self.count()
+        if count == 0 or count < min_count:
+            raise CDEKException(code='staging', message='Staging table %s has %s records, expected at least %d' % (
+                self.staging._meta.db_table, count, min_count))
+
+        duplicates = self.staging.objects.using(self.using).values(self.key) \
+            .annotate(total=models.Count('id')).filter(total__gt=1).count()
+        if duplicates:
+            raise CDEKException(code='staging', message='Staging table %s has %s duplicate keys' % (
+                self.staging._meta.db_table, duplicates))
+
+    def publish(self):
+        """
+        Переносит данные промежуточной таблицы в основную.
+        Вызывается внутри transaction.atomic, чтобы читатели видели либо старый, либо новый справочник.
+        """
+        if self.connection.vendor == 'postgresql':
+            self._publish_sql()
+        else:
+            self._publish_orm()
+
+    def _publish_sql(self):
+        qn = self.connection.ops.quote_name
+        live = qn(self.model._meta.db_table)
+        staging = qn(self.staging._meta.db_table)
+        key = qn(self.columns[self.key])
+        columns = [qn(column) for column in self.columns.values()]
+
+        with self.connection.cursor() as cursor:
+            cursor.execute('UPDATE %s SET %s FROM %s s WHERE %s.%s = s.%s' % (
+                live, ', '.join('%s = s.%s' % (column, column) for column in columns), staging, live, key, key))
+            cursor.execute('INSERT INTO %s (%s) SELECT %s FROM %s s WHERE NOT EXISTS '
+                           '(SELECT 1 FROM %s l WHERE l.%s = s.%s)' % (
+                live, ', '.join(columns), ', '.join('s.%s' % column for column in columns),
+                staging, live, key, key))
+
+    def _publish_orm(self):
+        manager = self.model._base_manager.using(self.using)
+        existing = dict(manager.values_list(self.key, 'id'))
+        fields = [name for name in self.columns if name != self.key]
+        queryset = self.staging.objects.using(self.using).order_by('id').values(*self.columns)
+
+        for start in range(0, self.count(), self.batch_size):
+            updated = []
+            created = []
+            for row in queryset[start:start + self.batch_size]:
+                instance = self.model(**row)
+                instance.id = existing.get(row[self.key])
+                if instance.id:
+                    updated.append(instance)
+                else:
+                    created.append(instance)
+            if updated:
+                manager.bulk_update(updated, fields)
+            if created:
+                manager.bulk_create(created)
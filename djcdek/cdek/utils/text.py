@@ -0,0 +1,9 @@
+import re
+
+
+_non_word = re.compile(r'[^\w]+')
+
+
+def normalize(text: str) -> str:
+    """ Приводит строку к виду для поиска: нижний регистр, ё -> е, без знаков препинания """
+    return _non_word.sub(' ', (text or '').lower().replace('ё', 'е')).strip()
@@ -1,10 +1,65 @@
 import logging
 from urllib.error import URLError
 
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Max
+
 from djcdek.cdek.models import *
-from djcdek.cdek.client import CDEKDjangoClient
+from djcdek.cdek.catalog import bump_catalog_version
+from djcdek.cdek.client import get_client
+from djcdek.cdek.routers import pin_primary
+from djcdek.cdek.search import rebuild_deliverypoint_search
+from djcdek.cdek.utils import profiling
+from djcdek.cdek.utils.staging import StagingTable
+from djcdek.cdek.utils.worktime import parse_work_time_list
+from djcdek.exceptions import CDEKException
+
+
+CITY_CHUNK = 900
+
+
+def next_generation(model) -> int:
+    """
+    Возвращает номер нового поколения синхронизации справочника model
+    """
+    current = model.all_objects.aggregate(generation=Max('generation'))['generation']
+    return (current or 0) + 1
+
+
+def sweep_stale(model, generation: int) -> int:
+    """
+    Деактивирует записи справочника model, не затронутые синхронизацией generation.
+    При CDEK_SYNC_DELETE_STALE = True записи удаляются.
+
+    Если пропасть должна большая доля записей, чем CDEK_SYNC_STALE_THRESHOLD (по умолчанию 0.1),
+    очистка прерывается исключением: скорее всего, выгрузка из CDEK была неполной.
+
+    return количество деактивированных (удаленных) записей
+    """
+    logger = logging.getLogger('cdek')
+    threshold = getattr(settings, 'CDEK_SYNC_STALE_THRESHOLD', 0.1)
+    delete = getattr(settings, 'CDEK_SYNC_DELETE_STALE', False)
+
+    stale = model.all_objects.active().stale(generation)
+    total = model.all_objects.active().count()
+    count = stale.count()
 
+    if total and count > total * threshold:
+        raise CDEKException(code='stalethreshold', message='%s of %s %s records are stale, sweep aborted' % (
+            count, total, model._meta.model_name))
 
+    if count:
+        if delete:
+            stale.delete()
+        else:
+            stale.update(is_active=False)
+        logger.info('Sweep %s stale %s records' % (count, model._meta.model_name))
+    return count
+
+
+@profiling.profiled('regions')
+@pin_primary()
 def update_regions():
     """
     Обновляет справочник регионов и стран из базы данных CDEK 
@@ -12,7 +67,7 @@ def update_regions():
     logger = logging.getLogger('cdek')
 
     logger.info('Update regions and countries')
-    client = CDEKDjangoClient()
+    client = get_client()
     page_size = 100 #размер страницы запроса
     current_page = 0
     
@@ -21,143 +76,346 @@ def update_regions():
         response = client.get_regions(size=page_size, page=current_page)
         logger.info('Get %s elements' % len(response))
         
-        for item in response:
-            if item.get('title'):
-                region = Region.objects.filter(title=item.get('region'), country__code=item.get('country_code')).first()
-                
-                if not region:
-                    country, _ = Country.objects.get_or_create(title=item.get('country'), code=item.get('country_code'))
-                    region = Region.objects.create(
-                        title=item.get('region'),
-                        country=country,
-                        kladr_region_code=item.get('kladr_region_code'),
-                        fias_region_guid=item.get('fias_region_guid'),
-                    )
-                    logger.info('Create %s region' % region.title)
+        with profiling.stage('write'):
+            for item in response:
+                if item.get('title'):
+                    region = Region.objects.filter(title=item.get('region'), country__code=item.get('country_code')).first()
                     
-                region.code=item.get('region_code')
-                region.kladr_region_code=item.get('kladr_region_code')
-                region.fias_region_guid=item.get('fias_region_guid')
-                region.save()
+                    if not region:
+                        country, _ = Country.objects.get_or_create(title=item.get('country'), code=item.get('country_code'))
+                        region = Region.objects.create(
+                            title=item.get('region'),
+                            country=country,
+                            kladr_region_code=item.get('kladr_region_code'),
+                            fias_region_guid=item.get('fias_region_guid'),
+                        )
+                        logger.info('Create %s region' % region.title)
+                        
+                    region.code=item.get('region_code')
+                    region.kladr_region_code=item.get('kladr_region_code')
+                    region.fias_region_guid=item.get('fias_region_guid')
+                    region.save()
+        if response:
+            profiling.count_batch(len(response))
         
         current_page += 1
 
         if len(response) == 0:
             break
 
+    bump_catalog_version()
 
-def update_cities(start_page: int = 0):
+
+def refresh_postal_codes(cities, batch_size: int = 5000):
     """
-    Обновляет справочник населенных пунктов из базы данных CDEK 
+    Пересобирает таблицу почтовых индексов PostalCode для населенных пунктов cities
+    по их полю postal_codes
     """
-    logger = logging.getLogger('cdek')
+    city_ids = []
+    batch = []
 
-    logger.info('Update city')
-    client = CDEKDjangoClient()
+    for city_id, postal_codes in cities.values_list('id', 'postal_codes').iterator():
+        city_ids.append(city_id)
+        batch.extend(PostalCode(code=code, city_id=city_id) for code in set((postal_codes or '').split(';')) if code)
+
+        if len(city_ids) >= batch_size:
+            _replace_postal_codes(city_ids, batch)
+            city_ids = []
+            batch = []
+
+    if city_ids:
+        _replace_postal_codes(city_ids, batch)
+
+
+def _replace_postal_codes(city_ids: list, postal_codes: list):
+    with profiling.stage('write'), transaction.atomic():
+        # не больше 999 параметров в запросе на старых сборках SQLite
+        for start in range(0, len(city_ids), CITY_CHUNK):
+            PostalCode.objects.filter(city_id__in=city_ids[start:start + CITY_CHUNK]).delete()
+        PostalCode.objects.bulk_create(postal_codes)
+
+
+def city_fields(item: dict) -> dict:
+    """
+    Преобразует элемент ответа get_cities в значения полей модели City (кроме региона)
+    """
+    fields = {
+        'title': item.get('city'),
+        'code': item.get('code'),
+        'fias_guid': item.get('fias_guid'),
+        'kladr_code': item.get('kladr_code'),
+        'postal_codes': ';'.join(item.get('postal_codes', [])) if item.get('postal_codes') else '',
+        'timezone': item.get('time_zone'),
+    }
+
+    try:
+        fields['longitude'] = float(item.get('longitude'))
+        fields['latitude'] = float(item.get('latitude'))
+    except (ValueError, TypeError):
+        pass
+
+    try:
+        fields['payment_limit'] = float(item.get('payment_limit'))
+    except (ValueError, TypeError):
+        pass
+
+    return fields
+
+
+def deliverypoint_fields(item: dict) -> dict:
+    """
+    Преобразует элемент ответа get_deliverypoints в значения полей модели DeliveryPoint (кроме города)
+    """
+    location = item.get('location') or {}
+    fields = {
+        'title': item.get('name'),
+        'code': item.get('code'),
+        'postal_code': location.get('postal_code'),
+        'address': location.get('address'),
+        'address_full': location.get('address_full'),
+        'address_comment': item.get('address_comment'),
+        'nearest_station': item.get('nearest_station'),
+        'work_time': item.get('work_time'),
+        'work_schedule': parse_work_time_list(item.get('work_time_list')),
+        'email': item.get('email'),
+        'phones': ', '.join([p['number'] for p in item.get('phones', [])]) if item.get('phones') else '',
+        'note': item.get('note'),
+        'type': item.get('type'),
+        'owner_code': item.get('owner_code'),
+        'take_only': bool(item.get('take_only')) if item.get('take_only') is not None else False,
+        'is_dressing_room': bool(item.get('is_dressing_room')) if item.get('is_dressing_room') is not None else False,
+        'have_cashless': bool(item.get('have_cashless')) if item.get('have_cashless') is not None else False,
+        'have_cash': bool(item.get('have_cash')) if item.get('have_cash') is not None else False,
+        'allowed_cod': bool(item.get('allowed_cod')) if item.get('allowed_cod') is not None else False,
+        'site': item.get('site'),
+    }
+
+    try:
+        fields['longitude'] = float(location.get('longitude'))
+        fields['latitude'] = float(location.get('latitude'))
+    except (ValueError, TypeError):
+        pass
+
+    for name in ('weight_min', 'weight_max'):
+        try:
+            fields[name] = float(item.get(name))
+        except (ValueError, TypeError):
+            fields[name] = None
+
+    # у постаматов ячейки разного размера, сохраняется наибольшая
+    cells = []
+    for cell in item.get('dimensions') or []:
+        try:
+            cells.append((float(cell['width']), float(cell['height']), float(cell['depth'])))
+        except (KeyError, ValueError, TypeError):
+            pass
+    width, height, depth = max(cells, key=lambda cell: cell[0] * cell[1] * cell[2]) if cells else (None, None, None)
+    fields['max_width'] = width
+    fields['max_height'] = height
+    fields['max_depth'] = depth
+
+    return fields
+
+
+def iter_city_pages(client, start_page: int = 0):
+    """
+    Постранично выгружает справочник населенных пунктов, повторяя запрос при сетевых ошибках
+    """
+    logger = logging.getLogger('cdek')
     page_size = 1000 #размер страницы запроса
     current_page = start_page
-    
+
     while True:
         logger.info('Page %s' % current_page)
-        
+
         retries = 0
-        
+
         while True:
             try:
                 response = client.get_cities(size=page_size, page=current_page)
                 break
             except URLError as exc:
                 retries += 1
-                
+
                 if retries > 5:
                     raise exc
-                
+
         logger.info('Get %s elements' % len(response))
-        
+
+        if len(response) == 0:
+            break
+
+        yield response
+        current_page += 1
+
+
+@profiling.profiled('cities')
+@pin_primary()
+def update_cities(start_page: int = 0, staged: bool = False):
+    """
+    Обновляет справочник населенных пунктов из базы данных CDEK 
+
+    start_page -- страница, с которой продолжить выгрузку
+    staged -- загрузить справочник в промежуточную таблицу и опубликовать одной транзакцией
+    """
+    logger = logging.getLogger('cdek')
+
+    logger.info('Update city')
+    client = get_client()
+    generation = next_generation(City)
+
+    if staged:
+        if start_page:
+            raise CDEKException(code='staged', message='Staged update requires a full run')
+        return _update_staged(City, profiling.iterate(_iter_staged_cities(client, generation)), generation,
+                              on_publish=lambda: refresh_postal_codes(City.all_objects.filter(generation=generation)))
+
+    for response in iter_city_pages(client, start_page):
+        city_ids = []
+
         for item in response:
             if item.get('city'):
-                city = City.objects.filter(code=item.get('code')).first()
-                
-                if not city:
-                    region = Region.objects.filter(title=item.get('region'), country__code=item.get('country_code')).first()
-                    city = City.objects.create(
-                        title=item.get('city'),
-                        code=item.get('code'),
-                        region=region,
-                    )
-                    logger.info('Create %s city' % city.title)
+                with profiling.stage('transform'):
+                    fields = city_fields(item)
+
+                with profiling.stage('write'):
+                    city = City.all_objects.filter(code=fields['code']).first()
                     
-                city.fias_guid=item.get('fias_guid')
-                city.kladr_code=item.get('kladr_code')
-                city.postal_codes = ';'.join(item.get('postal_codes', [])) if item.get('postal_codes') else ''
-                
-                try:
-                    city.longitude =float(item.get('longitude'))
-                    city.latitude =float(item.get('latitude'))
-                except (ValueError, TypeError):
-                    pass
-                
-                city.timezone = item.get('time_zone')
-                
-                try:
-                    city.payment_limit = float(item.get('payment_limit'))
-                except (ValueError, TypeError):
-                    pass
-                
-                city.save()
-        
-        current_page += 1
+                    if not city:
+                        region = Region.objects.filter(title=item.get('region'), country__code=item.get('country_code')).first()
+                        city = City.objects.create(
+                            title=fields['title'],
+                            code=fields['code'],
+                            region=region,
+                        )
+                        logger.info('Create %s city' % city.title)
 
-        if len(response) == 0:
-            break
+                    del fields['title']
+                    for name, value in fields.items():
+                        setattr(city, name, value)
+                    city.generation = generation
+                    city.is_active = True
+                    city.save()
+                    city_ids.append(city.id)
+
+        refresh_postal_codes(City.all_objects.filter(id__in=city_ids))
+        profiling.count_batch(len(city_ids))
 
-def update_pvz():
+    # при докачке с середины часть справочника не просмотрена, очищать нельзя
+    if start_page == 0:
+        with profiling.stage('write'):
+            sweep_stale(City, generation)
+    bump_catalog_version()
+
+
+@profiling.profiled('deliverypoints')
+@pin_primary()
+def update_pvz(staged: bool = False):
     """
     Обновляет справочник ПВЗ из базы данных CDEK 
+
+    staged -- загрузить справочник в промежуточную таблицу и опубликовать одной транзакцией
     """
     logger = logging.getLogger('cdek')
 
     logger.info('Update delivery points')
-    client = CDEKDjangoClient()
+    client = get_client()
     response = client.get_deliverypoints()
     logger.info('Get %s elements' % len(response))
-    
+    generation = next_generation(DeliveryPoint)
+
+    if staged:
+        return _update_staged(DeliveryPoint, profiling.iterate(_iter_staged_deliverypoints(response, generation)),
+                              generation, on_publish=_rebuild_search)
+
     for item in response:
         if item.get('name') and item.get('code'):
-            dp = DeliveryPoint.objects.filter(code=item.get('code')).first()
-            
-            if not dp:
-                dp = DeliveryPoint.objects.create(
-                    title=item.get('name'),
-                    code=item.get('code'),
-                )
-                logger.info('Create %s deliverypoint' % dp.title)
-            
-            dp.city = City.objects.filter(code=item.get('location').get('city_code')).first()
-            dp.postal_сode=item.get('location').get('postal_сode')
-            dp.address=item.get('location').get('address')
-            dp.address_full=item.get('location').get('address_full')
-            dp.address_comment=item.get('address_comment')
-            dp.nearest_station=item.get('nearest_station')
-            
-            try:
-                dp.longitude = float(item.get('location').get('longitude'))
-                dp.latitude = float(item.get('location').get('latitude'))
-            except (ValueError, TypeError, AttributeError):
-                pass
-            
-            dp.work_time=item.get('work_time')
-            dp.email=item.get('email')
-            dp.phones=', '.join([p['number'] for p in item.get('phones', [])]) if item.get('phones') else ''
-            dp.note=item.get('note')
-            dp.type=item.get('type')
-            dp.owner_сode=item.get('owner_сode')
-            dp.take_only = bool(item.get('take_only')) if item.get('take_only') is not None else False 
-            dp.is_dressing_room = bool(item.get('is_dressing_room')) if item.get('is_dressing_room') is not None else False
-            dp.have_cashless = bool(item.get('have_cashless')) if item.get('have_cashless') is not None else False
-            dp.have_cash = bool(item.get('have_cash')) if item.get('have_cash') is not None else False
-            dp.allowed_cod = bool(item.get('allowed_cod')) if item.get('allowed_cod') is not None else False
-            dp.site=item.get('site')
-            dp.save()
+            with profiling.stage('transform'):
+                fields = deliverypoint_fields(item)
+
+            with profiling.stage('write'):
+                dp = DeliveryPoint.all_objects.filter(code=fields['code']).first()
+                
+                if not dp:
+                    dp = DeliveryPoint.objects.create(
+                        title=fields['title'],
+                        code=fields['code'],
+                    )
+                    logger.info('Create %s deliverypoint' % dp.title)
+
+                del fields['title']
+                for name, value in fields.items():
+                    setattr(dp, name, value)
+                dp.city = City.objects.filter(code=(item.get('location') or {}).get('city_code')).first()
+                dp.generation = generation
+                dp.is_active = True
+                dp.save()
+            profiling.count_batch(1)
+
+    with profiling.stage('write'):
+        sweep_stale(DeliveryPoint, generation)
+        _rebuild_search()
+    bump_catalog_version()
+
+
+def _rebuild_search():
+    """ Перестраивает таблицу поиска ПВЗ, если она не отключена (CDEK_DELIVERYPOINT_SEARCH = False) """
+    if getattr(settings, 'CDEK_DELIVERYPOINT_SEARCH', True):
+        rebuild_deliverypoint_search()
+
+
+def _iter_staged_cities(client, generation: int):
+    regions = {
+        (title, country_code): pk
+        for pk, title, country_code in Region.objects.values_list('id', 'title', 'country__code')
+    }
+
+    for response in iter_city_pages(client):
+        for item in response:
+            if item.get('city'):
+                row = city_fields(item)
+                row['region_id'] = regions.get((item.get('region'), item.get('country_code')))
+                row['generation'] = generation
+                row['is_active'] = True
+                yield row
+
+
+def _iter_staged_deliverypoints(response: list, generation: int):
+    cities = dict(City.objects.values_list('code', 'id'))
+
+    for item in response:
+        if item.get('name') and item.get('code'):
+            row = deliverypoint_fields(item)
+            row['city_id'] = cities.get((item.get('location') or {}).get('city_code'))
+            row['generation'] = generation
+            row['is_active'] = True
+            yield row
+
+
+def _update_staged(model, rows, generation: int, on_publish=None) -> int:
+    """
+    Загружает rows в промежуточную таблицу model, проверяет их количество
+    и одной транзакцией публикует в основную таблицу, деактивируя устаревшие записи
+
+    on_publish -- функция, выполняемая в той же транзакции после публикации
+    """
+    logger = logging.getLogger('cdek')
+    threshold = getattr(settings, 'CDEK_SYNC_STALE_THRESHOLD', 0.1)
+    table = StagingTable(model)
+    table.create()
 
+    try:
+        count = table.load(rows)
+        logger.info('Load %s %s records into staging table' % (count, model._meta.model_name))
+        table.validate(min_count=model.all_objects.active().count() * (1 - threshold))
 
+        with profiling.stage('write'), transaction.atomic(using=table.using):
+            table.publish()
+            sweep_stale(model, generation)
+            if on_publish:
+                on_publish()
+        logger.info('Publish %s %s records' % (count, model._meta.model_name))
+    finally:
+        table.drop()
+    bump_catalog_version()
+    return count
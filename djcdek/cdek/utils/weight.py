@@ -0,0 +1,6 @@
+from django.db.models import Count, Q
+
+
+def deliverypoints_weight(queryset):
+    """ Вес населенного пункта - количество активных ПВЗ в нем """
+    return queryset.annotate(weight=Count('deliverypoints', filter=Q(deliverypoints__is_active=True)))
@@ -0,0 +1,85 @@
+import math
+from datetime import datetime
+from functools import lru_cache
+from typing import List, Optional
+
+from django.conf import settings
+from django.utils import timezone
+
+try:
+    from zoneinfo import ZoneInfo as _zone, ZoneInfoNotFoundError as _UnknownZone
+except ImportError:
+    from pytz import timezone as _zone, UnknownTimeZoneError as _UnknownZone
+
+
+SLOT_MINUTES = 15
+""" Длительность интервала расписания в минутах """
+
+SLOTS_PER_DAY = 24 * 60 // SLOT_MINUTES
+WEEK_SLOTS = 7 * SLOTS_PER_DAY
+
+
+@lru_cache(maxsize=None)
+def get_timezone(name: str = None):
+    """ Временная зона по имени (City.timezone), при пустом или неизвестном имени - TIME_ZONE проекта """
+    try:
+        return _zone(name or settings.TIME_ZONE)
+    except (_UnknownZone, ValueError):
+        return _zone(settings.TIME_ZONE)
+
+
+def _minutes(value: str) -> int:
+    hours, minutes = value.strip().split(':')[:2]
+    return int(hours) * 60 + int(minutes)
+
+
+def parse_work_time_list(items: List[dict]) -> Optional[str]:
+    """
+    Преобразует work_time_list из ответа API ([{'day': 1, 'time': '09:00/18:00'}, ...], день 1 - понедельник)
+    в недельное расписание: строку из WEEK_SLOTS символов '0'/'1' по SLOT_MINUTES минут с понедельника 00:00
+    по местному времени ПВЗ.
+
+    Интервал, заканчивающийся раньше начала (22:00/02:00), продолжается на следующий день.
+    return None, если расписание не передано или не разобрано
+    """
+    if not items:
+        return None
+
+    slots = bytearray(b'0' * WEEK_SLOTS)
+    parsed = False
+    for item in items:
+        try:
+            day = int(item['day']) - 1
+            start, end = (_minutes(value) for value in item['time'].split('/'))
+        except (KeyError, TypeError, ValueError, AttributeError):
+            continue
+        if not 0 <= day < 7:
+            continue
+        if end <= start:
+            end += 24 * 60
+        first = day * SLOTS_PER_DAY + start // SLOT_MINUTES
+        last = day * SLOTS_PER_DAY + math.ceil(end / SLOT_MINUTES)
+        for slot in range(first, last):
+            slots[slot % WEEK_SLOTS] = ord('1')
+        parsed = True
+
+    return slots.decode() if parsed else None
+
+
+def local_slot(dt: datetime, timezone_name: str = None) -> int:
+    """
+    Номер интервала недельного расписания для момента dt.
+    Время с временной зоной переводится в зону timezone_name, время без зоны считается местным.
+    """
+    if timezone.is_aware(dt):
+        dt = dt.astimezone(get_timezone(timezone_name))
+    return dt.weekday() * SLOTS_PER_DAY + (dt.hour * 60 + dt.minute) // SLOT_MINUTES
+
+
+def schedule_mask(schedule: Optional[str]) -> int:
+    """ Расписание в виде целого числа: бит N соответствует интервалу N """
+    return int(schedule[::-1], 2) if schedule else 0
+
+
+DAY_MASK = (1 << SLOTS_PER_DAY) - 1
+""" Маска интервалов одного дня, сдвигается на weekday * SLOTS_PER_DAY """
@@ -0,0 +1,195 @@
+import re
+from collections import namedtuple, Counter
+from typing import Dict, Iterable, List
+
+from djcdek.cdek.models import City, DeliveryPoint
+from djcdek.types import CDEKTariff, RegisterOrderRequest
+
+
+OrderError = namedtuple('OrderError', ['field', 'code', 'message'])
+""" Ошибка заказа: путь к полю (packages[0].items[1].amount), код и описание """
+
+TARIFF_MODES = {
+    CDEKTariff.STOCK_STOCK.value: ('stock', 'stock'),
+    CDEKTariff.STOCK_HOME.value: ('stock', 'door'),
+    CDEKTariff.HOME_STOCK.value: ('door', 'stock'),
+    CDEKTariff.HOME_HOME.value: ('door', 'door'),
+}
+""" Откуда и куда доставляет тариф: со склада/от двери, на склад/до двери """
+
+QUERY_CHUNK = 900
+""" Количество кодов в одном запросе к справочникам (ограничение SQLite на число параметров) """
+
+_phone_separators = re.compile(r'[\s()\-]')
+_phone = re.compile(r'^\+\d{10,15}$')
+
+
+def _chunks(values: list, size: int = QUERY_CHUNK) -> Iterable[list]:
+    for start in range(0, len(values), size):
+        yield values[start:start + size]
+
+
+def _value(obj, name: str):
+    return getattr(obj, name, None) if obj is not None else None
+
+
+class OrderValidator:
+    """
+    Проверка заказов до отправки в API CDEK.
+
+    Коды ПВЗ и населенных пунктов всех заказов пакета проверяются по справочникам
+    несколькими запросами на весь пакет, а не запросом на каждый заказ.
+    """
+    def __init__(self, requests: List[RegisterOrderRequest]):
+        self.requests = list(requests)
+        self.points = dict()
+        self.cities = set()
+
+    def load(self):
+        point_codes = set()
+        city_codes = set()
+        for request in self.requests:
+            point_codes.update(code for code in (request.delivery_point, request.shipment_point) if code)
+            city_codes.update(str(code) for code in (_value(request.from_location, 'code'),
+                                                      _value(request.to_location, 'code')) if code)
+
+        point_codes = sorted(point_codes)
+        for chunk in _chunks(point_codes):
+            self.points.update(
+                (row[0], row) for row in DeliveryPoint.objects.filter(code__in=chunk).values_list(
+                    'code', 'take_only', 'allowed_cod', 'weight_max'))
+        city_codes = sorted(city_codes)
+        for chunk in _chunks(city_codes):
+            self.cities.update(City.objects.filter(code__in=chunk).values_list('code', flat=True))
+
+    def validate(self) -> Dict[int, List[OrderError]]:
+        """ Ошибки заказов: номер заказа в пакете -> список ошибок (только для заказов с ошибками) """
+        self.load()
+        numbers = Counter(request.number for request in self.requests if request.number)
+        result = dict()
+        for index, request in enumerate(self.requests):
+            errors = self.validate_order(request)
+            if request.number and numbers[request.number] > 1:
+                errors.append(OrderError('number', 'duplicate', 'Order number %s is repeated in the batch' % request.number))
+            if errors:
+                result[index] = errors
+        return result
+
+    def validate_order(self, request: RegisterOrderRequest) -> List[OrderError]:
+        errors = []
+        # код тарифа может быть передан перечислением или строкой
+        try:
+            tariff_code = int(getattr(request.tariff_code, 'value', request.tariff_code))
+        except (TypeError, ValueError):
+            tariff_code = request.tariff_code
+        origin, destination = TARIFF_MODES.get(tariff_code, (None, None))
+
+        if origin == 'stock' and not request.shipment_point and not request.from_location:
+            errors.append(OrderError('shipment_point', 'required', 'Tariff %s requires shipment_point' % tariff_code))
+        if origin == 'door' and not request.from_location:
+            errors.append(OrderError('from_location', 'required', 'Tariff %s requires from_location' % tariff_code))
+        if destination == 'stock' and not request.delivery_point:
+            errors.append(OrderError('delivery_point', 'required', 'Tariff %s requires delivery_point' % tariff_code))
+        if destination == 'door' and not _value(request.to_location, 'address'):
+            errors.append(OrderError('to_location.address', 'required', 'Tariff %s requires to_location address' % tariff_code))
+
+        for name in ('from_location', 'to_location'):
+            code = _value(getattr(request, name), 'code')
+            if code and str(code) not in self.cities:
+                errors.append(OrderError('%s.code' % name, 'notfound', 'Unknown city code %s' % code))
+
+        if request.shipment_point:
+            point = self.points.get(request.shipment_point)
+            if point is None:
+                errors.append(OrderError('shipment_point', 'notfound', 'Unknown delivery point %s' % request.shipment_point))
+            elif point[1]:
+                errors.append(OrderError('shipment_point', 'takeonly', 'Delivery point %s does not accept parcels' % request.shipment_point))
+
+        if request.delivery_point:
+            errors.extend(self._validate_delivery_point(request))
+        errors.extend(self._validate_recipient(request))
+        errors.extend(self._validate_packages(request))
+        return errors
+
+    def _validate_delivery_point(self, request: RegisterOrderRequest) -> List[OrderError]:
+        point = self.points.get(request.delivery_point)
+        if point is None:
+            return [OrderError('delivery_point', 'notfound', 'Unknown delivery point %s' % request.delivery_point)]
+
+        errors = []
+        packages = request.packages or []
+        cod = any((_value(item.payment, 'value') or 0) > 0 for package in packages for item in package.items or [])
+        if cod and not point[2]:
+            errors.append(OrderError('delivery_point', 'cod', 'Delivery point %s does not accept cash on delivery' % request.delivery_point))
+        total_weight = sum(package.weight or 0 for package in packages)
+        if point[3] is not None and total_weight > point[3] * 1000:
+            errors.append(OrderError('delivery_point', 'weight', 'Delivery point %s accepts up to %s kg' % (request.delivery_point, point[3])))
+        return errors
+
+    def _validate_recipient(self, request: RegisterOrderRequest) -> List[OrderError]:
+        recipient = request.recipient
+        if recipient is None:
+            return [OrderError('recipient', 'required', 'Recipient is required')]
+
+        errors = []
+        if not recipient.name:
+            errors.append(OrderError('recipient.name', 'required', 'Recipient name is required'))
+        if not recipient.phones:
+            errors.append(OrderError('recipient.phones', 'required', 'Recipient phone is required'))
+        for i, phone in enumerate(recipient.phones or []):
+            number = _phone_separators.sub('', _value(phone, 'number') or '')
+            if not _phone.match(number):
+                errors.append(OrderError('recipient.phones[%s].number' % i, 'invalid',
+                                         'Phone must be in international format: +7XXXXXXXXXX'))
+        return errors
+
+    def _validate_packages(self, request: RegisterOrderRequest) -> List[OrderError]:
+        if not request.packages:
+            return [OrderError('packages', 'required', 'At least one package is required')]
+
+        errors = []
+        numbers = Counter(package.number for package in request.packages)
+        for i, package in enumerate(request.packages):
+            path = 'packages[%s]' % i
+            if not package.number:
+                errors.append(OrderError(path + '.number', 'required', 'Package number is required'))
+            elif numbers[package.number] > 1:
+                errors.append(OrderError(path + '.number', 'duplicate', 'Package number %s is repeated' % package.number))
+            if not package.weight or package.weight <= 0:
+                errors.append(OrderError(path + '.weight', 'required', 'Package weight must be positive'))
+
+            items_weight = 0
+            for j, item in enumerate(package.items or []):
+                item_path = '%s.items[%s]' % (path, j)
+                if not item.name:
+                    errors.append(OrderError(item_path + '.name', 'required', 'Item name is required'))
+                if not item.ware_key:
+                    errors.append(OrderError(item_path + '.ware_key', 'required', 'Item ware_key is required'))
+                if not item.amount or item.amount < 1:
+                    errors.append(OrderError(item_path + '.amount', 'invalid', 'Item amount must be at least 1'))
+                elif item.marking and item.amount > 1:
+                    errors.append(OrderError(item_path + '.amount', 'marking', 'Item with marking must have amount 1'))
+                if item.weight is None or item.weight <= 0:
+                    errors.append(OrderError(item_path + '.weight', 'required', 'Item weight must be positive'))
+                if item.cost is None or item.cost < 0:
+                    errors.append(OrderError(item_path + '.cost', 'invalid', 'Item cost must be non-negative'))
+                payment = _value(item.payment, 'value')
+                if payment is None or payment < 0:
+                    errors.append(OrderError(item_path + '.payment', 'invalid', 'Item payment must be non-negative'))
+                items_weight += (item.weight or 0) * (item.amount or 0)
+
+            if package.weight and items_weight > package.weight:
+                errors.append(OrderError(path + '.weight', 'weight',
+                                         'Package weight %s is less than items total %s' % (package.weight, items_weight)))
+
+        return errors
+
+
+def validate_orders(requests: List[RegisterOrderRequest]) -> Dict[int, List[OrderError]]:
+    """ Проверяет пакет заказов, возвращает ошибки по номеру заказа в пакете """
+    return OrderValidator(requests).validate()
+
+
+def validate_order(request: RegisterOrderRequest) -> List[OrderError]:
+    """ Проверяет заказ, возвращает список ошибок """
+    return validate_orders([request]).get(0, [])
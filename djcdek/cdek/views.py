@@ -0,0 +1,127 @@
+import json
+
+from django.conf import settings
+from django.http import HttpResponse, HttpResponseNotModified, JsonResponse, HttpResponseBadRequest, HttpResponseForbidden
+from django.utils.cache import patch_vary_headers
+from django.utils.crypto import constant_time_compare
+from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import require_GET, require_POST
+
+from djcdek.cdek.client import DEFAULT_ACCOUNT
+from djcdek.cdek.clusters import tile_clusterer
+from djcdek.cdek.payloads import city_deliverypoints_payload, region_cities_payload
+from djcdek.cdek.spatial import FILTER_FIELDS
+from djcdek.cdek.webhooks import receive_event
+
+
+BOOLEAN_FILTERS = ('take_only', 'is_dressing_room', 'have_cashless', 'have_cash', 'allowed_cod')
+
+
+def _deliverypoint_filters(params) -> dict:
+    """ Фильтры ПВЗ из параметров запроса """
+    filters = dict()
+    for name in FILTER_FIELDS:
+        value = params.get(name)
+        if value is None or value == '':
+            continue
+        if name in BOOLEAN_FILTERS:
+            filters[name] = value.lower() in ('1', 'true', 'yes')
+        elif name == 'city_id':
+            filters[name] = int(value)
+        else:
+            filters[name] = value
+    return filters
+
+
+@require_GET
+def deliverypoints_map(request):
+    """
+    ПВЗ в видимой области карты.
+
+    Параметры: bbox=south,west,north,east, zoom и необязательные фильтры ПВЗ (type, city_id, have_cash...).
+    На мелких масштабах точки объединяются в кластеры.
+    """
+    try:
+        south, west, north, east = [float(value) for value in request.GET['bbox'].split(',')]
+        zoom = int(request.GET['zoom'])
+        return JsonResponse(tile_clusterer.query(south, west, north, east, zoom, **_deliverypoint_filters(request.GET)))
+    except (KeyError, ValueError) as exc:
+        return HttpResponseBadRequest(str(exc))
+
+
+def _accepted_encodings(request) -> set:
+    """ Сжатия из Accept-Encoding, кроме явно запрещенных (q=0) """
+    encodings = set()
+    for part in request.META.get('HTTP_ACCEPT_ENCODING', '').split(','):
+        name, _, params = part.partition(';')
+        params = params.replace(' ', '')
+        try:
+            if params.startswith('q=') and float(params[2:]) == 0:
+                continue
+        except ValueError:
+            pass
+        encodings.add(name.strip().lower())
+    return encodings
+
+
+def _payload_response(request, payload: dict) -> HttpResponse:
+    """
+    Ответ из заранее сформированного payload: 304 при совпадении If-None-Match,
+    иначе тело в сжатии, которое поддерживает клиент
+    """
+    if_none_match = request.META.get('HTTP_IF_NONE_MATCH', '')
+    if if_none_match.strip() == '*' or payload['etag'] in [tag.strip() for tag in if_none_match.split(',')]:
+        response = HttpResponseNotModified()
+    else:
+        encodings = _accepted_encodings(request)
+        for encoding in ('br', 'gzip'):
+            if payload[encoding] is not None and encoding in encodings:
+                response = HttpResponse(payload[encoding], content_type='application/json')
+                response['Content-Encoding'] = encoding
+                break
+        else:
+            response = HttpResponse(payload['identity'], content_type='application/json')
+    response['ETag'] = payload['etag']
+    patch_vary_headers(response, ('Accept-Encoding', ))
+    return response
+
+
+@require_GET
+def region_cities(request, region_id: int):
+    """ Населенные пункты региона """
+    return _payload_response(request, region_cities_payload(region_id))
+
+
+@require_GET
+def city_deliverypoints(request, city_id: int):
+    """ ПВЗ населенного пункта """
+    return _payload_response(request, city_deliverypoints_payload(city_id))
+
+
+@csrf_exempt
+@require_POST
+def webhook(request):
+    """
+    Прием событий CDEK (статусы заказов, готовность печатных форм).
+    Обязательная настройка CDEK_WEBHOOK_TOKEN - секрет, который адрес подписки содержит в параметре token
+    (например, https://shop.example/cdek/webhook/?token=...). Без нее события не принимаются.
+    Параметр account - учетная запись из CDEK_ACCOUNTS, для которой оформлена подписка (по умолчанию default):
+    заказы, впервые появившиеся в событиях, отслеживаются от ее имени.
+    """
+    token = getattr(settings, 'CDEK_WEBHOOK_TOKEN', None)
+    if not token or not constant_time_compare(request.GET.get('token', ''), token):
+        return HttpResponseForbidden()
+
+    account = request.GET.get('account') or DEFAULT_ACCOUNT
+    if account != DEFAULT_ACCOUNT and account not in (getattr(settings, 'CDEK_ACCOUNTS', None) or {}):
+        return HttpResponseBadRequest('Unknown account')
+
+    try:
+        event = json.loads(request.body)
+    except ValueError:
+        return HttpResponseBadRequest('Invalid JSON')
+    if not isinstance(event, dict):
+        return HttpResponseBadRequest('Event must be an object')
+
+    receive_event(event, account)
+    return HttpResponse()
@@ -0,0 +1,114 @@
+import atexit
+import logging
+import threading
+from collections import OrderedDict, defaultdict
+from typing import List
+
+from django.conf import settings
+from django.db import connections
+
+from djcdek.cdek.client import DEFAULT_ACCOUNT
+from djcdek.cdek.models import Order
+from djcdek.cdek.signals import print_form_ready
+from djcdek.cdek.tracking import apply_statuses
+from djcdek.types import CDEKWebhookType
+
+
+def event_key(event: dict) -> tuple:
+    """ Ключ события для удаления повторов: CDEK может прислать одно событие несколько раз """
+    attributes = event.get('attributes') or {}
+    return event.get('type'), event.get('uuid'), attributes.get('code'), attributes.get('status_date_time') or attributes.get('url')
+
+
+def process_events(events: List[dict], account: str = None):
+    """
+    Сохраняет пакет событий: статусы заказов записываются в историю через tracking.apply_statuses
+    (с сигналом order_status_changed), о готовых печатных формах сообщает сигнал print_form_ready
+
+    account -- учетная запись CDEK, подписке которой принадлежат события
+    """
+    account = account or DEFAULT_ACCOUNT
+    statuses = defaultdict(list)
+    numbers = dict()
+    for event in events:
+        attributes = event.get('attributes') or {}
+        if event.get('type') == CDEKWebhookType.ORDER_STATUS.value and event.get('uuid'):
+            statuses[event['uuid']].append({
+                'code': attributes.get('code'),
+                'name': attributes.get('name') or '',
+                'date_time': attributes.get('status_date_time') or event.get('date_time'),
+                'city': attributes.get('city_name'),
+            })
+            numbers[event['uuid']] = attributes.get('number')
+        elif event.get('type') == CDEKWebhookType.PRINT_FORM.value:
+            print_form_ready.send(sender=None, uuid=event.get('uuid'), type=attributes.get('type'), url=attributes.get('url'))
+
+    if statuses:
+        # заказы, созданные не через register_orders, начинают отслеживаться с первого события
+        Order.objects.bulk_create([Order(uuid=uuid, number=numbers[uuid], account=account) for uuid in statuses],
+                                  ignore_conflicts=True)
+        orders = Order.objects.filter(uuid__in=list(statuses))
+        apply_statuses([(order, statuses[order.uuid]) for order in orders], polled=False)
+
+
+class WebhookBuffer:
+    """
+    Буфер входящих событий: запрос вебхука только кладет событие в буфер, запись в базу
+    выполняется пакетом - по накоплении CDEK_WEBHOOK_BATCH_SIZE событий или через
+    CDEK_WEBHOOK_FLUSH_INTERVAL секунд после первого события в фоновом потоке.
+
+    Буфер хранится в памяти процесса: при аварийном завершении процесса несохраненные события
+    теряются, их подхватит опрос статусов (tracking.poll_orders).
+    """
+    def __init__(self, batch_size: int = None, interval: float = None):
+        self.batch_size = batch_size or getattr(settings, 'CDEK_WEBHOOK_BATCH_SIZE', 100)
+        self.interval = interval or getattr(settings, 'CDEK_WEBHOOK_FLUSH_INTERVAL', 2.0)
+        self._events = OrderedDict()
+        self._lock = threading.Lock()
+        self._timer = None
+
+    def add(self, event: dict, account: str = None):
+        account = account or DEFAULT_ACCOUNT
+        with self._lock:
+            self._events[(account, ) + event_key(event)] = (account, event)
+            full = len(self._events) >= self.batch_size
+            if not full and self._timer is None:
+                self._timer = threading.Timer(self.interval, self._flush_background)
+                self._timer.daemon = True
+                self._timer.start()
+        if full:
+            self.flush()
+
+    def flush(self):
+        with self._lock:
+            events = list(self._events.values())
+            self._events.clear()
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+        by_account = defaultdict(list)
+        for account, event in events:
+            by_account[account].append(event)
+        for account, account_events in by_account.items():
+            process_events(account_events, account)
+
+    def _flush_background(self):
+        try:
+            self.flush()
+        except Exception:
+            logging.getLogger('cdek').exception('Webhook events flush failed')
+        finally:
+            # поток таймера не управляется Django: его соединения закрываются явно
+            connections.close_all()
+
+
+webhook_buffer = WebhookBuffer()
+atexit.register(webhook_buffer.flush)
+
+
+def receive_event(event: dict, account: str = None):
+    """ Принимает событие вебхука учетной записи account: в буфер или сразу в базу, если CDEK_WEBHOOK_BUFFER = False """
+    if getattr(settings, 'CDEK_WEBHOOK_BUFFER', True):
+        webhook_buffer.add(event, account)
+    else:
+        process_events([event], account)
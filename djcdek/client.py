@@ -1,12 +1,17 @@
 import logging
 import json
-from typing import List, Dict, Optional, Union
+import os
+import threading
+from contextlib import contextmanager
+from time import perf_counter
+from typing import Callable, List, Dict, Optional, Union
 from urllib.request import Request, urlopen
 from urllib.parse import urlencode
 from datetime import datetime
 
 from .exceptions import CDEKException
 from .serialize import CDEKSerializable, CDEKEncoder
+from .singleflight import SingleFlight
 from .types import *
 
 
@@ -15,11 +20,46 @@ APIV1_URL = 'http://api.cdek.ru/'
 API_URL_TEST = 'http://api.edu.cdek.ru/v2/'
 ACCESS_URL = 'oauth/token'
 
+COALESCED_POST_URLS = ('calculator/tariff', 'calculator/tarifflist')
+""" POST-запросы без побочных эффектов, которые можно объединять как GET """
+
 logger = logging.getLogger('cdek')
 
+_single_flight = SingleFlight()
+
+
+def _reset_single_flight():
+    global _single_flight
+    # запросы родительского процесса в дочернем никогда не завершатся
+    _single_flight = SingleFlight()
+
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_reset_single_flight)
+
+_timing = threading.local()
+
+
+@contextmanager
+def request_timing(callback: Callable[[str, float], None]):
+    """
+    Сообщает callback(stage, seconds) длительность запросов текущего потока:
+    stage = 'fetch' - ожидание и чтение ответа API, 'decode' - разбор JSON
+    """
+    previous = getattr(_timing, 'callback', None)
+    _timing.callback = callback
+    try:
+        yield
+    finally:
+        _timing.callback = previous
+
 
 class CDEKClient:
-    def __init__(self, client_id: str, client_secret: str, test: bool = False, account: str = None, secure_password: str = None):
+    def __init__(self, client_id: str, client_secret: str, test: bool = False, account: str = None, secure_password: str = None,
+                 coalesce: bool = True):
+        """
+        coalesce -- объединять одинаковые одновременные запросы на чтение в один запрос к API
+        """
         self.client_id = client_id
         self.client_secret = client_secret
         self.test = test
@@ -29,6 +69,9 @@ class CDEKClient:
 
         self.account = account
         self.secure_password = secure_password
+        self.coalesce = coalesce
+        # клиент используется из нескольких потоков, токен должен запрашиваться один раз
+        self._auth_lock = threading.Lock()
 
 
     def _get_api_url(self, version: str = '2') -> str:
@@ -80,9 +123,15 @@ class CDEKClient:
         logger.debug('EXECUTE: %s %s' % (method, request.full_url))
         logger.debug('HEADERS: %s' % request.header_items())
         logger.debug('DATA: %s' % data)
+        started = perf_counter()
         response = urlopen(request, timeout=10).read()
+        fetched = perf_counter()
         # print('RESPONSE: %s' % response)
         data = json.loads(response)
+        callback = getattr(_timing, 'callback', None)
+        if callback is not None:
+            callback('fetch', fetched - started)
+            callback('decode', perf_counter() - fetched)
         self._handle_errors(data)
         return data
 
@@ -107,7 +156,14 @@ class CDEKClient:
 
     def _execute_authorized(self, url: str, params: dict = None, data: dict = None, method: str='GET', content_type: str='application/json') -> dict:
         if not self._is_authorized():
-            self.auth()
+            with self._auth_lock:
+                if not self._is_authorized():
+                    self.auth()
+
+        if self.coalesce and (method == 'GET' or url in COALESCED_POST_URLS):
+            key = (self._get_api_url(), self.client_id, method, url,
+                   urlencode(sorted(params.items()), True) if params else '', data)
+            return _single_flight.do(key, lambda: self._execute_request(url, params, data, method, content_type))
         return self._execute_request(url, params, data, method, content_type)
 
     def get_regions(self, country_codes: List[str]=[], region_code: str = None, kladr_region_code: str = None,
@@ -225,7 +281,7 @@ class CDEKClient:
         data['to_location'] = to_location
         data['packages'] = packages        
         return self._execute_authorized(
-            'calculator/tarifflist', data=json.dumps(data), method='POST')
+            'calculator/tarifflist', data=json.dumps(data, cls=CDEKEncoder), method='POST')
 
     def get_tariff(self, tarif_code:CDEKTariff ,from_location: CDEKLocation, to_location: CDEKLocation, packages: CDEKPackage,
                    type: int = 1, services: List[CDEKService] = None, date: Union[datetime, str] = None) -> str:
@@ -262,6 +318,14 @@ class CDEKClient:
         """
         return self._execute_authorized('orders/' + uuid)
 
+    def order_info_by_number(self, number: str) -> dict:
+        """
+        Возвращает информацию о заказе по номеру заказа в ИС Клиента
+
+        number - номер заказа (RegisterOrderRequest.number)
+        """
+        return self._execute_authorized('orders', params={'im_number': number})
+
     def delete_order(self, uuid: str) -> dict:
         """ 
         Удаляет заказ в системе CDEK
@@ -376,6 +440,32 @@ class CDEKClient:
         except KeyError:
             return None
 
+    def add_webhook(self, url: str, type: CDEKWebhookType = CDEKWebhookType.ORDER_STATUS) -> str:
+        """
+        Подписывает url на события CDEK
+
+        url -- адрес, на который CDEK будет отправлять события
+        type -- тип событий
+        return идентификатор подписки
+        """
+        response = self._execute_authorized('webhooks', data=json.dumps({'url': url, 'type': type.value}), method='POST')
+        try:
+            return response['entity']['uuid']
+        except KeyError:
+            raise CDEKException(code='nouuid', message='No entity UUID')
+
+    def get_webhooks(self) -> List[dict]:
+        """ Возвращает список подписок на события """
+        return self._execute_authorized('webhooks')
+
+    def delete_webhook(self, uuid: str) -> dict:
+        """
+        Удаляет подписку на события
+
+        uuid -- идентификатор подписки
+        """
+        return self._execute_authorized('webhooks/' + uuid, method='DELETE')
+
     def get_delivery_price(self, request: CDEKDeliveryRequest) -> float:
         """
         DEPRECATED: Используй get_tariff
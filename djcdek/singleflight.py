@@ -0,0 +1,48 @@
+import copy
+import threading
+from typing import Callable, Hashable
+
+
+class _Call:
+    __slots__ = ('done', 'result', 'error')
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """
+    Объединение одинаковых одновременных запросов: пока запрос с ключом key выполняется,
+    остальные потоки с тем же ключом ждут его результат вместо собственного вызова.
+    Результат не кэшируется - следующий запрос после завершения выполняется заново.
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = dict()
+
+    def do(self, key: Hashable, func: Callable):
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            # ответ API - изменяемые словари и списки, у каждого вызывающего своя копия
+            return copy.deepcopy(call.result)
+
+        try:
+            call.result = func()
+        except BaseException as exc:
+            call.error = exc
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+        return call.result
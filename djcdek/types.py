@@ -21,6 +21,7 @@ __all_ = [
     'RegisterOrderRequest',
     'CDEKPrintStatus',
     'CDEKBarcodeFormat',
+    'CDEKWebhookType',
     'CDEKDeliveryGood',
     'CDEKDeliveryService',
     'CDEKDeliveryRequest',
@@ -361,6 +362,14 @@ class CDEKBarcodeFormat(enum.Enum):
     A6 = 'A6'
 
 
+class CDEKWebhookType(enum.Enum):
+    """ Типы событий, на которые можно подписаться """
+    ORDER_STATUS = 'ORDER_STATUS'
+    """ Изменение статуса заказа """
+    PRINT_FORM = 'PRINT_FORM'
+    """ Готовность печатной формы """
+
+
 class CDEKDeliveryGood(CDEKSerializable):
     """
     Товар доставки